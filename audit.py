@@ -0,0 +1,391 @@
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from enigma import ALPHABET, STEPPING_MODES, Enigma, Reflector, Rotor, load_config, step_positions
+from vectorized import double_step_rows, encode_indices
+
+# Наибольшее количество состояний роторов, для которого считаются период и статистика
+MAX_STATES = 1 << 22
+# Количество состояний роторов, обрабатываемых одним блоком
+BLOCK = 1 << 14
+
+
+def check_config(config):
+    """
+    Проверяет конфигурацию по правилам из README.
+
+    Ошибки - нарушения правил (проводка не перестановка, отражатель не симметричен,
+    зазор вне диапазона). Предупреждения - допустимые, но ослабляющие шифр
+    особенности: неподвижные буквы отражателя (буква шифруется сама в себя) и роторов.
+
+    Параметры:
+        config (dict): Конфигурация или ValueError, если ее не удалось прочитать
+            (см. _read_candidates).
+
+    Возвращает:
+        tuple: Списки ошибок и предупреждений.
+    """
+    if isinstance(config, ValueError):
+        return [str(config)], []
+    if not isinstance(config, dict):
+        return [f"Конфигурация должна быть объектом JSON, а не {type(config).__name__}."], []
+    errors = []
+    warnings = []
+    alphabet = config.get('alphabet', ALPHABET)
+    if not isinstance(alphabet, str) or not alphabet:
+        return [f"Алфавит должен быть непустой строкой, а не {alphabet!r}."], []
+    size = len(alphabet)
+    if len(set(alphabet)) != size:
+        errors.append("Буквы алфавита повторяются.")
+    stepping = config.get('stepping', 'legacy')
+    if stepping not in STEPPING_MODES:
+        errors.append(f"Неизвестные правила поворота роторов: {stepping}")
+    rotors = config.get('rotors')
+    if not isinstance(rotors, list) or not rotors:
+        errors.append("В конфигурации нет роторов.")
+        rotors = []
+    reflector = config.get('reflector')
+    if not isinstance(reflector, dict):
+        errors.append("В конфигурации нет отражателя.")
+        reflector = {}
+
+    for i, rotor in enumerate(rotors, 1):
+        wiring = _permutation(rotor.get('wiring') if isinstance(rotor, dict) else None, size,
+                              f"Ротор {i}", errors)
+        notch = rotor.get('notch') if isinstance(rotor, dict) else None
+        if not isinstance(notch, int) or not 0 <= notch < size:
+            errors.append(f"Ротор {i}: зазор {notch} вне диапазона от 0 до {size - 1}.")
+        if wiring is not None:
+            fixed = np.flatnonzero(wiring == np.arange(size))
+            if len(fixed):
+                warnings.append(f"Ротор {i}: проводка оставляет на месте буквы {_letters(fixed, alphabet)}.")
+
+    wiring = _permutation(reflector.get('wiring'), size, "Отражатель", errors)
+    if wiring is not None:
+        if not np.array_equal(wiring[wiring], np.arange(size)):
+            errors.append("Отражатель: соединения не парные (проводка не является инволюцией).")
+        fixed = np.flatnonzero(wiring == np.arange(size))
+        if len(fixed):
+            warnings.append(f"Отражатель оставляет на месте буквы {_letters(fixed, alphabet)}: "
+                            f"в каждом положении роторов {len(fixed)} букв шифруются сами в себя.")
+    return errors, warnings
+
+
+def _permutation(wiring, size, name, errors):
+    """
+    Проверяет, что проводка - перестановка чисел от 0 до size - 1.
+
+    Возвращает:
+        numpy.ndarray: Проводка или None, если она неверна (ошибка добавляется в errors).
+    """
+    if not isinstance(wiring, list) or not all(isinstance(value, int) for value in wiring):
+        errors.append(f"{name}: проводка должна быть списком целых чисел.")
+        return None
+    if len(wiring) != size:
+        errors.append(f"{name}: длина проводки {len(wiring)} не совпадает с длиной алфавита {size}.")
+        return None
+    wiring = np.asarray(wiring, dtype=np.intp)
+    if not np.array_equal(np.sort(wiring), np.arange(size)):
+        missing = np.setdiff1d(np.arange(size), wiring)
+        errors.append(f"{name}: проводка не является перестановкой (нет чисел {', '.join(map(str, missing))}).")
+        return None
+    return wiring
+
+
+def _letters(indices, alphabet):
+    return ', '.join(f"{alphabet[i]} ({i})" for i in indices)
+
+
+def state_digits(states, size, count):
+    """
+    Переводит номера состояний роторов в позиции роторов слева направо.
+
+    Параметры:
+        states (numpy.ndarray): Номера состояний (позиции в системе счисления по основанию size).
+
+        size (int): Количество позиций ротора.
+
+        count (int): Количество роторов.
+
+    Возвращает:
+        list: Массивы позиций роторов.
+    """
+    return [states // size ** (count - 1 - i) % size for i in range(count)]
+
+
+def stepping_cycles(enigma):
+    """
+    Находит циклы последовательности положений роторов по всем начальным положениям.
+
+    Функция перехода (одно нажатие) вычисляется сразу для всех size ** количество
+    роторов состояний. Состояния на циклах - образ многократного применения перехода;
+    цикл каждого состояния помечается наименьшим номером состояния на нем удвоением
+    шага (за log2 количества состояний операций над всем массивом).
+
+    Параметры:
+        enigma (Enigma): Машина Enigma.
+
+    Возвращает:
+        dict: Количество состояний, длины циклов и количество циклов каждой длины,
+            наибольший период и количество состояний вне циклов (например,
+            недостижимых при двойном шаге).
+    """
+    size = len(enigma.alphabet)
+    count = len(enigma.rotors)
+    notches = tuple(rotor.notch for rotor in enigma.rotors)
+    total = size ** count
+    states = np.arange(total, dtype=np.int64)
+    positions = state_digits(states, size, count)
+    if enigma.stepping == 'double_step':
+        double_step_rows(positions, notches, size)
+    else:
+        positions = list(step_positions(tuple(positions), notches, 1, size, enigma.stepping))
+    following = np.zeros(total, dtype=np.int64)
+    for position in positions:
+        following = following * size + position
+
+    # Состояния на циклах: образ перехода перестает уменьшаться
+    cyclic = np.ones(total, dtype=bool)
+    while True:
+        image = np.zeros(total, dtype=bool)
+        image[following[cyclic]] = True
+        if image.sum() == cyclic.sum():
+            break
+        cyclic = image
+
+    labels = states.copy()
+    jump = following.copy()
+    reach = 1
+    while reach < total:
+        labels = np.minimum(labels, labels[jump])
+        jump = jump[jump]
+        reach *= 2
+    lengths = np.bincount(labels[cyclic], minlength=total)
+    lengths = lengths[lengths > 0]
+    cycle_lengths, cycles = np.unique(lengths, return_counts=True)
+    return {
+        'states': total,
+        'cycles': {int(length): int(number) for length, number in zip(cycle_lengths, cycles)},
+        'period': int(cycle_lengths.max()),
+        'transient': int(total - cyclic.sum()),
+    }
+
+
+def composite_statistics(enigma, block=BLOCK):
+    """
+    Считает статистику составных перестановок по всем положениям роторов.
+
+    Перестановки вычисляются блоками положений с помощью vectorized.encode_indices
+    (без коммутационной панели; кольца лишь переименовывают положения и на статистику
+    по всем положениям не влияют).
+
+    Параметры:
+        enigma (Enigma): Машина Enigma.
+
+        block (int): Количество положений в блоке.
+
+    Возвращает:
+        dict: Количество самоотображений (буква шифруется сама в себя) всего и на одно
+            положение, доля положений с самоотображениями, статистика хи-квадрат частот
+            пар (открытая буква, шифрованная буква) относительно равномерного
+            распределения по парам разных букв, наименьшая и наибольшая частоты пар
+            относительно ожидаемой, количество пар разных букв, которые не встречаются,
+            и проверка того, что все перестановки - инволюции.
+
+    Исключения:
+        ValueError: Если статистика пар не определена (в алфавите одна буква или
+            каждая буква шифруется сама в себя).
+    """
+    size = len(enigma.alphabet)
+    count = len(enigma.rotors)
+    total = size ** count
+    letters = np.arange(size)[None, :]
+    pairs = np.zeros(size * size, dtype=np.int64)
+    self_maps = 0
+    states_with_self_maps = 0
+    involutions = True
+    for begin in range(0, total, block):
+        states = np.arange(begin, min(begin + block, total), dtype=np.int64)
+        positions = tuple(position[:, None] for position in state_digits(states, size, count))
+        permutations = encode_indices(enigma, letters, positions)
+        fixed = permutations == letters
+        self_maps += int(fixed.sum())
+        states_with_self_maps += int(fixed.any(axis=1).sum())
+        involutions &= bool((np.take_along_axis(permutations, permutations, axis=1) == letters).all())
+        pairs += np.bincount((letters * size + permutations).ravel(), minlength=size * size)
+
+    pairs = pairs.reshape(size, size)
+    off_diagonal = pairs[~np.eye(size, dtype=bool)]
+    if off_diagonal.size < 2 or self_maps == total * size:
+        raise ValueError("Статистика пар букв не определена: нет пар разных букв.")
+    expected = (total * size - self_maps) / off_diagonal.size
+    chi2 = float(((off_diagonal - expected) ** 2 / expected).sum())
+    return {
+        'self_maps': self_maps,
+        'self_maps_per_state': self_maps / total,
+        'states_with_self_maps': states_with_self_maps / total,
+        'pair_chi2': chi2 / (off_diagonal.size - 1),
+        'pair_min': float(off_diagonal.min() / expected),
+        'pair_max': float(off_diagonal.max() / expected),
+        'missing_pairs': int((off_diagonal == 0).sum()),
+        'involutions': involutions,
+    }
+
+
+def audit_config(config, name=None, max_states=MAX_STATES):
+    """
+    Проверяет конфигурацию и считает период поворота роторов и статистику составных
+    перестановок.
+
+    Период и статистика не считаются, если в конфигурации есть ошибки или количество
+    положений роторов больше max_states.
+
+    Параметры:
+        config (dict): Конфигурация.
+
+        name (str): Имя конфигурации в отчете.
+
+        max_states (int): Наибольшее количество положений роторов.
+
+    Возвращает:
+        dict: Отчет: имя, ошибки, предупреждения, период ("stepping") и статистика
+            ("composite") или None.
+    """
+    errors, warnings = check_config(config)
+    report = {'name': name, 'errors': errors, 'warnings': warnings, 'stepping': None, 'composite': None}
+    if errors:
+        return report
+    alphabet = config.get('alphabet', ALPHABET)
+    if len(alphabet) ** len(config['rotors']) > max_states:
+        warnings.append(f"Положений роторов больше {max_states}: период и статистика не вычислялись.")
+        return report
+    rotors = [Rotor(rotor['wiring'], rotor['notch']) for rotor in config['rotors']]
+    enigma = Enigma(rotors, Reflector(config['reflector']['wiring']), {}, alphabet, config.get('stepping', 'legacy'))
+    report['stepping'] = stepping_cycles(enigma)
+    try:
+        report['composite'] = composite_statistics(enigma)
+    except ValueError as e:
+        errors.append(str(e))
+        return report
+    if report['composite']['self_maps']:
+        warnings.append(f"Буква шифруется сама в себя в {report['composite']['states_with_self_maps']:.0%} "
+                        f"положений роторов.")
+    if report['stepping']['period'] < report['stepping']['states']:
+        warnings.append(f"Период поворота роторов {report['stepping']['period']} меньше количества положений "
+                        f"{report['stepping']['states']}.")
+    return report
+
+
+def _audit(item):
+    """
+    Проверяет одну конфигурацию в рабочем процессе.
+
+    Непредвиденная ошибка попадает в отчет, чтобы не прерывать проверку остальных.
+    """
+    name, config, max_states = item
+    try:
+        return audit_config(config, name, max_states)
+    except Exception as e:
+        return {'name': name, 'errors': [f"Конфигурация не проверена: {e!r}"], 'warnings': [],
+                'stepping': None, 'composite': None}
+
+
+def audit_configs(configs, workers=None, max_states=MAX_STATES):
+    """
+    Проверяет набор конфигураций на пуле процессов.
+
+    Параметры:
+        configs (iterable): Пары из имени и конфигурации.
+
+        workers (int): Количество процессов; 1 - проверять в текущем процессе.
+
+        max_states (int): Наибольшее количество положений роторов (см. audit_config).
+
+    Возвращает:
+        generator: Отчеты в порядке конфигураций.
+    """
+    items = ((name, config, max_states) for name, config in configs)
+    if workers == 1:
+        yield from map(_audit, items)
+        return
+    with ProcessPoolExecutor(workers) as executor:
+        yield from executor.map(_audit, items, chunksize=4)
+
+
+def _read_candidates(path):
+    """
+    Читает конфигурации из файла JSON Lines (одна конфигурация на строку).
+
+    Вместо строки, которая не разбирается как JSON, возвращается ValueError с
+    описанием, чтобы она попала в отчет как ошибка и не прерывала проверку остальных.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            if line.strip():
+                try:
+                    config = json.loads(line)
+                except ValueError as e:
+                    config = ValueError(f"Строка не является JSON: {e}")
+                yield f"{path}:{number}", config
+
+
+def format_report(report):
+    """
+    Форматирует отчет о конфигурации для вывода.
+    """
+    lines = [f"{report['name']}: ошибок {len(report['errors'])}, предупреждений {len(report['warnings'])}"]
+    lines += [f"  ошибка: {error}" for error in report['errors']]
+    lines += [f"  предупреждение: {warning}" for warning in report['warnings']]
+    stepping = report['stepping']
+    if stepping is not None:
+        cycles = ', '.join(f"{length} x {number}" for length, number in sorted(stepping['cycles'].items()))
+        lines.append(f"  период: {stepping['period']} из {stepping['states']} положений; циклы: {cycles}; "
+                     f"вне циклов: {stepping['transient']}")
+    composite = report['composite']
+    if composite is not None:
+        lines.append(f"  самоотображений на положение: {composite['self_maps_per_state']:.2f}; "
+                     f"пары букв: хи-квадрат/ст. св. {composite['pair_chi2']:.2f}, "
+                     f"частоты {composite['pair_min']:.2f}..{composite['pair_max']:.2f} от ожидаемой, "
+                     f"не встречаются {composite['missing_pairs']}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    """
+    Точка входа подкоманды audit: проверка конфигураций.
+
+    Параметры:
+        argv (list): Аргументы командной строки без имени подкоманды.
+    """
+    parser = argparse.ArgumentParser(prog='main.py audit', description='Validate and measure Enigma configurations')
+    parser.add_argument('configs', help='Configuration files', nargs='*')
+    parser.add_argument('--candidates', help='JSON Lines file with one configuration per line')
+    parser.add_argument('--workers', help='Worker processes', type=int, default=os.cpu_count())
+    parser.add_argument('--max-states', help='Skip period and statistics above this many rotor states', type=int,
+                        default=MAX_STATES)
+    parser.add_argument('--json', help='Print reports as JSON Lines', action='store_true')
+    args = parser.parse_args(argv)
+    if not args.configs and not args.candidates:
+        args.configs = ['config.json']
+
+    def configs():
+        for path in args.configs:
+            yield path, load_config(path)
+        if args.candidates:
+            yield from _read_candidates(args.candidates)
+
+    failed = 0
+    try:
+        for report in audit_configs(configs(), args.workers, args.max_states):
+            failed += bool(report['errors'])
+            print(json.dumps(report, ensure_ascii=False) if args.json else format_report(report), flush=True)
+    except (OSError, ValueError) as e:
+        print(f"Ошибка: {e}")
+        sys.exit(1)
+    if failed:
+        sys.exit(1)
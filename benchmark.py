@@ -0,0 +1,281 @@
+import argparse
+import codecs
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import enigma_codec
+from compiled_config import load_config_cached
+from enigma import ALPHABET, create_enigma, load_config
+
+SIZES = {'1K': 1 << 10, '1M': 1 << 20, '100M': 100 << 20}
+
+
+def _encode_scalar(enigma, text):
+    return enigma.encode_text(text)
+
+
+def _encode_batch(enigma, text):
+    return enigma.encode_text(text, batch=True)
+
+
+def _encode_parallel(enigma, text, encoder=None):
+    # С готовым пулом (см. run_benchmarks) запуск процессов не входит в замер
+    if encoder is not None:
+        return encoder.encode_text(text)
+    return enigma.encode_text(text, workers=os.cpu_count())
+
+
+# Движки encode_text; scalar - эталон, с которым сравниваются остальные
+ENGINES = {
+    'scalar': _encode_scalar,
+    'batch': _encode_batch,
+    'parallel': _encode_parallel,
+}
+
+
+def make_text(size, seed=0):
+    """
+    Генерирует воспроизводимый текст из букв алфавита, пробелов и знаков препинания.
+
+    Параметры:
+        size (int): Длина текста в символах.
+
+        seed (int): Начальное значение генератора случайных чисел.
+
+    Возвращает:
+        str: Текст.
+    """
+    rng = random.Random(seed)
+    symbols = ALPHABET * 3 + '    .,'
+    return ''.join(rng.choices(symbols, k=size))
+
+
+def measure(func, repeat=3, memory=True):
+    """
+    Измеряет лучшее время выполнения функции и пик выделенной памяти.
+
+    Пик памяти измеряется отдельным запуском под tracemalloc, чтобы трассировка
+    не влияла на замер времени.
+
+    Параметры:
+        func (callable): Измеряемая функция без аргументов.
+
+        repeat (int): Количество запусков для замера времени.
+
+        memory (bool): Измерять пик памяти.
+
+    Возвращает:
+        dict: Время в секундах ("seconds") и пик памяти в байтах ("peak_bytes").
+    """
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    result = {'seconds': best}
+    if memory:
+        tracemalloc.start()
+        try:
+            func()
+            result['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def run_benchmarks(config_file='config.json', sizes=('1K', '1M'), engines=('scalar', 'batch'), memory=True):
+    """
+    Запускает набор замеров.
+
+    Параметры:
+        config_file (str): Путь к файлу конфигурации.
+
+        sizes (tuple): Размеры текста для encode_text (ключи SIZES).
+
+        engines (tuple): Движки encode_text (ключи ENGINES).
+
+        memory (bool): Измерять пик памяти.
+
+    Возвращает:
+        dict: Результаты по именам замеров; пропускная способность в "per_second".
+    """
+    config = load_config(config_file)
+    enigma = create_enigma(config, 'АБВ', ['АБ', 'ВГ'])
+    results = {}
+
+    def record(name, func, units, repeat=3):
+        result = measure(func, repeat, memory)
+        result['per_second'] = units / result['seconds'] if result['seconds'] else float('inf')
+        results[name] = result
+        return result
+
+    calls = 100000
+    rotor = enigma.rotors[0]
+    record('rotor_forward', lambda: [rotor.forward(i % 33) for i in range(calls)], calls)
+    record('rotor_backward', lambda: [rotor.backward(i % 33) for i in range(calls)], calls)
+    chars = make_text(calls)
+    record('encode_char', lambda: [enigma.encode_char(c) for c in chars], calls)
+    # Много коротких сообщений: доля накладных расходов на вызов encode_text
+    messages = [chars[i:i + 40] for i in range(0, calls, 40)]
+    record('encode_text_short', lambda: [enigma.encode_text(m) for m in messages], calls)
+    # Те же сообщения через инкрементальный шифратор кодека (состояние переносится между вызовами)
+    enigma_codec.register('enigma-benchmark', enigma)
+    encoder = codecs.getincrementalencoder('enigma-benchmark')()
+    record('codec_encode_short', lambda: [encoder.encode(m) for m in messages], calls)
+    enigma_codec.unregister('enigma-benchmark')
+    if 'batch' in engines:
+        # Те же сообщения, каждое со своими позициями роторов, одним проходом NumPy
+        from vectorized import encode_messages
+        rng = random.Random(0)
+        starts = [[rng.randrange(len(enigma.alphabet)) for _ in enigma.rotors] for _ in messages]
+        record('encode_messages_short', lambda: encode_messages(enigma, messages, starts), calls)
+
+    from main import validate_text
+    plain = make_text(SIZES['1M']).replace('.', ' ').replace(',', ' ')
+    record('validate_text[1M]', lambda: validate_text(plain, ALPHABET), len(plain))
+
+    record('create_enigma', lambda: [create_enigma(config, 'АБВ', ['АБ']) for _ in range(100)], 100)
+    record('load_config', lambda: [load_config(config_file) for _ in range(100)], 100)
+    load_config_cached(config_file)
+    record('load_config_cached+create_enigma',
+           lambda: [create_enigma(load_config_cached(config_file), 'АБВ', ['АБ']) for _ in range(100)], 100)
+
+    functions = dict(ENGINES)
+    encoder = None
+    if 'parallel' in engines:
+        # Запуск пула процессов замеряется отдельно от кодирования
+        from parallel import ParallelEncoder
+        started = time.perf_counter()
+        encoder = ParallelEncoder(enigma, os.cpu_count())
+        encoder.start()
+        elapsed = time.perf_counter() - started
+        results['parallel_startup'] = {'seconds': elapsed, 'per_second': 1 / elapsed}
+        functions['parallel'] = lambda enigma, text: _encode_parallel(enigma, text, encoder)
+    try:
+        for size_name in sizes:
+            text = make_text(SIZES[size_name])
+            repeat = 3 if len(text) <= SIZES['1M'] else 1
+            enigma.set_rotor_positions('АБВ')
+            reference = functions['scalar'](enigma, text) if len(text) <= SIZES['1M'] else None
+            for engine in engines:
+                def run(engine=engine):
+                    enigma.set_rotor_positions('АБВ')
+                    return functions[engine](enigma, text)
+                result = record(f'encode_text[{engine},{size_name}]', run, len(text), repeat)
+                if reference is not None and run() != reference:
+                    raise AssertionError(f"Движок {engine} дает результат, отличный от scalar")
+                scalar = results.get(f'encode_text[scalar,{size_name}]')
+                if scalar is not None:
+                    result['speedup'] = scalar['seconds'] / result['seconds']
+    finally:
+        if encoder is not None:
+            encoder.close()
+
+    # Кодирование файлов через mmap: пик памяти не зависит от размера файла
+    from mapped import encode_file
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'input.txt')
+        target = os.path.join(directory, 'output.txt')
+        for size_name in sizes:
+            with open(source, 'w', encoding='utf-8') as f:
+                f.write(make_text(SIZES[size_name]))
+            repeat = 3 if SIZES[size_name] <= SIZES['1M'] else 1
+            for engine in ('scalar', 'batch'):
+                if engine in engines:
+                    record(f'encode_file[{engine},{size_name}]',
+                           lambda engine=engine: encode_file(enigma, source, target, batch=engine == 'batch'),
+                           SIZES[size_name], repeat)
+
+    cli = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py'),
+           '--config', config_file, '--positions', 'АБВ', '--plugboard', 'АБ', '--text', 'ПРИВЕТ МИР']
+    record('cli_latency', lambda: subprocess.run(cli, check=True, capture_output=True), 1, repeat=5)
+    results['cli_latency'].pop('peak_bytes', None)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Сравнивает результаты с базовыми и возвращает список регрессий.
+
+    Параметры:
+        results (dict): Текущие результаты.
+
+        baseline (dict): Базовые результаты.
+
+        tolerance (float): Допустимое относительное снижение пропускной способности.
+
+    Возвращает:
+        list: Описания регрессий.
+    """
+    regressions = []
+    for name, base in baseline.items():
+        current = results.get(name)
+        if current is None:
+            continue
+        if current['per_second'] < base['per_second'] * (1 - tolerance):
+            regressions.append(f"{name}: {current['per_second']:.1f}/с против {base['per_second']:.1f}/с в базовом замере")
+    return regressions
+
+
+def main(argv=None):
+    """
+    Запускает замеры, сохраняет результаты и сравнивает их с базовыми.
+
+    Параметры:
+        argv (list): Аргументы командной строки.
+    """
+    parser = argparse.ArgumentParser(description='Enigma benchmark suite')
+    parser.add_argument('--config', help='Path to configuration file', default='config.json')
+    parser.add_argument('--sizes', help='Comma-separated text sizes: ' + ','.join(SIZES), default='1K,1M')
+    parser.add_argument('--engines', help='Comma-separated engines: ' + ','.join(ENGINES), default='scalar,batch')
+    parser.add_argument('--output', help='Write results to this JSON file', default='benchmark_results.json')
+    parser.add_argument('--baseline', help='Compare against this JSON file and fail on regressions')
+    parser.add_argument('--save-baseline', help='Also write results as a new baseline to this file')
+    parser.add_argument('--tolerance', help='Allowed relative throughput drop', type=float, default=0.2)
+    parser.add_argument('--no-memory', help='Skip tracemalloc peak memory measurement', action='store_true')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.config, args.sizes.split(','), args.engines.split(','), not args.no_memory)
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+
+    for name, result in results.items():
+        line = f"{name:32} {result['per_second']:>16.1f}/с {result['seconds'] * 1000:>12.3f} мс"
+        if 'peak_bytes' in result:
+            line += f" {result['peak_bytes'] / 1024:>12.1f} КБ"
+        if 'speedup' in result:
+            line += f" x{result['speedup']:.2f}"
+        print(line)
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("Обнаружены регрессии производительности:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
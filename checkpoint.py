@@ -0,0 +1,117 @@
+import json
+import os
+import time
+
+from compiled_config import config_hash
+
+VERSION = 1
+
+
+def file_hash(path):
+    """
+    Вычисляет хэш файла конфигурации (см. compiled_config.config_hash).
+
+    Параметры:
+        path (str): Путь к файлу.
+
+    Возвращает:
+        str: SHA-256 содержимого в шестнадцатеричном виде.
+    """
+    with open(path, 'rb') as f:
+        return config_hash(f.read()).hex()
+
+
+def load_checkpoint(path, expected_hash=None):
+    """
+    Читает контрольную точку.
+
+    Параметры:
+        path (str): Путь к файлу контрольной точки.
+
+        expected_hash (str): Хэш текущей конфигурации; None - не проверять.
+
+    Возвращает:
+        dict: Контрольная точка: version, config_hash, machine (см. Enigma.snapshot),
+            characters, input_offset, output_offset.
+
+    Исключения:
+        ValueError: Если файл имеет другой формат или записан для другой конфигурации.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    if not isinstance(state, dict) or state.get('version') != VERSION:
+        raise ValueError(f"Файл {path} не является контрольной точкой.")
+    if expected_hash is not None and state['config_hash'] != expected_hash:
+        raise ValueError("Контрольная точка записана для другой конфигурации.")
+    return state
+
+
+class Checkpointer:
+    """
+    Периодически сохраняет состояние потокового шифрования.
+
+    Контрольная точка записывается не чаще одного раза в interval секунд и только
+    после того, как закодированные данные сброшены на диск (fsync), поэтому при
+    продолжении вывод можно обрезать до записанного смещения, а ввод - продолжить с
+    первого незакодированного байта. Файл заменяется атомарно.
+
+    Атрибуты:
+        path (str): Путь к файлу контрольной точки.
+
+        enigma (Enigma): Машина, состояние которой сохраняется.
+
+        config_hash (str): Хэш файла конфигурации.
+
+        target: Двоичный поток вывода.
+
+        interval (float): Минимальный интервал между записями в секундах.
+
+        base (dict): Смещения, с которых продолжено шифрование (input_offset,
+            output_offset, characters).
+    """
+
+    def __init__(self, path, enigma, config_hash, target, interval=5.0, base=None):
+        self.path = path
+        self.enigma = enigma
+        self.config_hash = config_hash
+        self.target = target
+        self.interval = interval
+        self.base = base or {'input_offset': 0, 'output_offset': 0, 'characters': 0}
+        self._saved = time.monotonic()
+
+    def update(self, consumed, written, characters):
+        """
+        Сообщает о записанной части и при необходимости сохраняет контрольную точку.
+
+        Параметры:
+            consumed (int): Закодированные байты ввода от начала текущего запуска.
+
+            written (int): Записанные байты вывода от начала текущего запуска.
+
+            characters (int): Обработанные символы от начала текущего запуска.
+        """
+        now = time.monotonic()
+        if now - self._saved >= self.interval:
+            self.save(consumed, written, characters)
+            self._saved = now
+
+    def save(self, consumed, written, characters):
+        """
+        Сохраняет контрольную точку (параметры см. update).
+        """
+        self.target.flush()
+        os.fsync(self.target.fileno())
+        state = {
+            'version': VERSION,
+            'config_hash': self.config_hash,
+            'machine': self.enigma.snapshot(),
+            'characters': self.base['characters'] + characters,
+            'input_offset': self.base['input_offset'] + consumed,
+            'output_offset': self.base['output_offset'] + written,
+        }
+        temporary = f'{self.path}.{os.getpid()}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.path)
@@ -0,0 +1,183 @@
+import hashlib
+import mmap
+import os
+import struct
+
+from enigma import ALPHABET, STEPPING_MODES, Rotor, load_config
+
+MAGIC = b'ENCC'
+VERSION = 2
+# Заголовок: сигнатура, версия, количество роторов, длина алфавита, SHA-256 исходного JSON,
+# номер правил поворота в STEPPING_MODES, длина алфавита в байтах UTF-8
+HEADER = struct.Struct('<4sHHH32sBH')
+NOTCH = struct.Struct('<h')
+SUFFIX = '.enigmac'
+
+
+def config_hash(data):
+    """
+    Вычисляет хэш содержимого файла конфигурации.
+
+    Параметры:
+        data (bytes): Содержимое файла config.json.
+
+    Возвращает:
+        bytes: SHA-256 содержимого.
+    """
+    return hashlib.sha256(data).digest()
+
+
+def compile_config(config, digest):
+    """
+    Преобразует конфигурацию в компактный двоичный формат.
+
+    Для каждого ротора записываются зазор, проводка, обратная проводка и таблицы
+    прямого и обратного прохода для всех смещений (см. enigma._rotor_tables), затем
+    проводка отражателя и алфавит в UTF-8.
+
+    Параметры:
+        config (dict): Конфигурация из JSON.
+
+        digest (bytes): SHA-256 исходного JSON.
+
+    Возвращает:
+        bytes: Скомпилированная конфигурация.
+    """
+    rotors = [Rotor(r['wiring'], r['notch']) for r in config['rotors']]
+    size = len(config['reflector']['wiring'])
+    alphabet = config.get('alphabet', ALPHABET).encode('utf-8')
+    stepping = STEPPING_MODES.index(config.get('stepping', 'legacy'))
+    parts = [HEADER.pack(MAGIC, VERSION, len(rotors), size, digest, stepping, len(alphabet))]
+    for rotor in rotors:
+        parts.append(NOTCH.pack(rotor.notch))
+        parts.append(bytes(rotor.wiring))
+        parts.append(bytes(rotor._inverse))
+        parts.extend(rotor._forward)
+        parts.extend(rotor._backward)
+    parts.append(bytes(config['reflector']['wiring']))
+    parts.append(alphabet)
+    return b''.join(parts)
+
+
+def read_compiled(buffer, digest=None):
+    """
+    Читает скомпилированную конфигурацию без копирования данных.
+
+    Проводки и таблицы возвращаются как срезы memoryview исходного буфера.
+
+    Параметры:
+        buffer: Буфер со скомпилированной конфигурацией (например, mmap).
+
+        digest (bytes): Ожидаемый SHA-256 исходного JSON; None - не проверять.
+
+    Возвращает:
+        dict: Конфигурация в формате load_config с дополнительными ключами
+            'inverse' и 'tables' у роторов и 'hash' у конфигурации (ключи 'alphabet'
+            и 'stepping' присутствуют всегда),
+            или None, если буфер устарел или имеет другой формат.
+    """
+    view = memoryview(buffer)
+    if len(view) < HEADER.size:
+        return None
+    magic, version, count, size, stored, stepping, alphabet_size = HEADER.unpack_from(view)
+    if magic != MAGIC or version != VERSION or (digest is not None and stored != digest):
+        return None
+
+    rotor_size = NOTCH.size + 2 * size + 2 * size * size
+    if len(view) != HEADER.size + count * rotor_size + size + alphabet_size or stepping >= len(STEPPING_MODES):
+        return None
+
+    rotors = []
+    offset = HEADER.size
+    for _ in range(count):
+        notch, = NOTCH.unpack_from(view, offset)
+        offset += NOTCH.size
+        wiring = view[offset:offset + size]
+        inverse = view[offset + size:offset + 2 * size]
+        offset += 2 * size
+        forward = tuple(view[offset + i * size:offset + (i + 1) * size] for i in range(size))
+        offset += size * size
+        backward = tuple(view[offset + i * size:offset + (i + 1) * size] for i in range(size))
+        offset += size * size
+        rotors.append({'wiring': wiring, 'notch': notch, 'inverse': inverse, 'tables': (forward, backward)})
+    reflector = view[offset:offset + size]
+    alphabet = str(view[offset + size:], 'utf-8')
+    return {'rotors': rotors, 'reflector': {'wiring': reflector}, 'alphabet': alphabet,
+            'stepping': STEPPING_MODES[stepping], 'hash': stored.hex()}
+
+
+def write_cache(path, write):
+    """
+    Атомарно записывает файл кэша через временный файл рядом с ним.
+
+    Ошибки записи не считаются ошибкой: кэш - только оптимизация, каталог может быть
+    недоступен для записи.
+
+    Параметры:
+        path (str): Путь к файлу кэша (каталог создается при необходимости).
+
+        write (callable): Функция, записывающая содержимое в открытый двоичный файл.
+
+    Возвращает:
+        bool: True, если кэш записан.
+    """
+    temporary = f'{path}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(temporary, 'wb') as f:
+            write(f)
+        os.replace(temporary, path)
+    except OSError:
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+        return False
+    return True
+
+
+def load_config_cached(config_file, cache_file=None):
+    """
+    Загружает конфигурацию через скомпилированный кэш.
+
+    Источником истины остается JSON: при каждом запуске сравнивается SHA-256 его
+    содержимого с хэшем в кэше, и при расхождении (или отсутствии кэша) конфигурация
+    разбирается из JSON и кэш перезаписывается. Актуальный кэш отображается в память
+    через mmap без разбора JSON и построения таблиц роторов.
+
+    Параметры:
+        config_file (str): Путь к файлу конфигурации.
+
+        cache_file (str): Путь к файлу кэша; по умолчанию рядом с config_file.
+
+    Возвращает:
+        dict: Конфигурация (см. read_compiled) или конфигурация из JSON, если ее
+            нельзя представить в кэше.
+    """
+    if cache_file is None:
+        cache_file = config_file + SUFFIX
+    try:
+        with open(config_file, 'rb') as f:
+            digest = config_hash(f.read())
+    except FileNotFoundError:
+        return load_config(config_file)
+
+    try:
+        with open(cache_file, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        config = read_compiled(mapped, digest)
+        if config is not None:
+            return config
+    except (OSError, ValueError):
+        pass
+
+    config = load_config(config_file)
+    try:
+        data = compile_config(config, digest)
+    except (KeyError, TypeError, ValueError):
+        # Ошибку в конфигурации сообщит create_enigma
+        return config
+    write_cache(cache_file, lambda f: f.write(data))
+    compiled = read_compiled(data)
+    # Несогласованные размеры проводок кэш не представляет; ошибку сообщит create_enigma
+    return config if compiled is None else compiled
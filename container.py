@@ -0,0 +1,266 @@
+import argparse
+import codecs
+import os
+import struct
+import sys
+from bisect import bisect_left, bisect_right
+from collections import deque
+from itertools import accumulate
+
+from compiled_config import config_hash
+from enigma import create_enigma, load_config
+from parallel import ParallelEncoder
+
+MAGIC = b'ENGC'
+VERSION = 1
+CHUNK_SIZE = 1 << 20
+# Заголовок: сигнатура, версия, SHA-256 файла конфигурации, размер части в байтах
+HEADER = struct.Struct('<4sH32sI')
+# Запись индекса: смещение части в файле, длина шифротекста и расшифрованного текста
+# в байтах, количество букв алфавита в части
+ENTRY = struct.Struct('<QIII')
+# Окончание файла: смещение индекса, количество частей, сигнатура
+FOOTER = struct.Struct('<QI4s')
+
+
+def write_container(enigma, source, target, digest, chunk_size=CHUNK_SIZE, batch=False):
+    """
+    Шифрует поток UTF-8 в контейнер из частей фиксированного размера с индексом.
+
+    Контейнер состоит из заголовка, частей шифротекста (каждая - законченный текст
+    UTF-8), индекса и окончания со смещением индекса. Позиции роторов в файл не
+    записываются: начало любой части восстанавливается по ключу и количеству букв
+    до нее (см. Enigma.seek), поэтому расшифровка не повторяет предыдущие шаги.
+
+    Параметры:
+        enigma (Enigma): Машина Enigma в начальном положении ключа.
+
+        source: Двоичный поток открытого текста.
+
+        target: Двоичный поток для записи контейнера.
+
+        digest (bytes): SHA-256 файла конфигурации (см. compiled_config.config_hash).
+
+        chunk_size (int): Количество байтов открытого текста в части.
+
+        batch (bool): Использовать векторизованный движок NumPy.
+
+    Возвращает:
+        int: Количество частей.
+    """
+    letters = dict.fromkeys(map(ord, enigma.alphabet))
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    target.write(HEADER.pack(MAGIC, VERSION, digest, chunk_size))
+    offset = HEADER.size
+    index = []
+    while True:
+        chunk = source.read(chunk_size)
+        text = decoder.decode(chunk, final=not chunk)
+        if text:
+            # Расшифровка возвращает текст в верхнем регистре, его длина хранится в индексе
+            upper = text.upper()
+            data = enigma.encode_text(upper, batch=batch).encode('utf-8')
+            target.write(data)
+            index.append(ENTRY.pack(offset, len(data), len(upper.encode('utf-8')),
+                                    len(upper) - len(upper.translate(letters))))
+            offset += len(data)
+        if not chunk:
+            break
+    target.write(b''.join(index))
+    target.write(FOOTER.pack(offset, len(index), MAGIC))
+    return len(index)
+
+
+class Container:
+    """
+    Контейнер шифротекста, открытый для расшифровки произвольных диапазонов.
+
+    Атрибуты:
+        path (str): Путь к файлу контейнера.
+
+        config_hash (bytes): SHA-256 файла конфигурации, с которым записан контейнер.
+
+        chunk_size (int): Размер части открытого текста в байтах.
+
+        chunks (list): Записи индекса: смещение, длина шифротекста, длина расшифрованного
+            текста, количество букв.
+
+        plain_starts (list): Смещения частей в расшифрованном тексте; последний элемент -
+            его длина.
+
+        letter_starts (list): Количество букв перед каждой частью.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            header = f.read(HEADER.size)
+            size = os.fstat(f.fileno()).st_size
+            if len(header) < HEADER.size or size < HEADER.size + FOOTER.size:
+                raise ValueError(f"Файл {path} не является контейнером шифротекста.")
+            magic, version, self.config_hash, self.chunk_size = HEADER.unpack(header)
+            f.seek(size - FOOTER.size)
+            index_offset, count, footer_magic = FOOTER.unpack(f.read(FOOTER.size))
+            if magic != MAGIC or footer_magic != MAGIC or version != VERSION \
+                    or index_offset + count * ENTRY.size != size - FOOTER.size:
+                raise ValueError(f"Файл {path} не является контейнером шифротекста.")
+            f.seek(index_offset)
+            self.chunks = list(ENTRY.iter_unpack(f.read(count * ENTRY.size)))
+        self.plain_starts = list(accumulate((entry[2] for entry in self.chunks), initial=0))
+        self.letter_starts = list(accumulate((entry[3] for entry in self.chunks), initial=0))
+
+    @property
+    def plain_size(self):
+        return self.plain_starts[-1]
+
+    def check(self, digest):
+        """
+        Проверяет, что контейнер записан с той же конфигурацией.
+
+        Параметры:
+            digest (bytes): SHA-256 текущего файла конфигурации.
+
+        Исключения:
+            ValueError: Если хэши не совпадают.
+        """
+        if digest != self.config_hash:
+            raise ValueError("Контейнер записан для другой конфигурации.")
+
+    def iter_range(self, enigma, start=0, end=None, workers=None, batch=False):
+        """
+        Расшифровывает диапазон байтов расшифрованного текста по частям.
+
+        Читаются только части, пересекающие диапазон; позиции роторов для каждой части
+        вычисляются по количеству букв до нее. Роторы машины остаются в положении после
+        последней прочитанной части.
+
+        Параметры:
+            enigma (Enigma): Машина Enigma с позициями ключа (set_rotor_positions).
+
+            start (int): Начало диапазона в байтах.
+
+            end (int): Конец диапазона (не включая); None - до конца текста.
+
+            workers (int): Количество процессов для параллельной расшифровки частей;
+                None - расшифровывать в текущем процессе.
+
+            batch (bool): Использовать векторизованный движок NumPy.
+
+        Возвращает:
+            generator: Байты UTF-8 расшифрованного диапазона по частям; границы диапазона
+                могут разрывать многобайтовый символ.
+        """
+        end = self.plain_size if end is None else min(end, self.plain_size)
+        if start >= end:
+            return
+        first = bisect_right(self.plain_starts, start) - 1
+        last = bisect_left(self.plain_starts, end)
+        with open(self.path, 'rb') as f:
+            texts = (self._read_chunk(f, i) for i in range(first, last))
+            if workers is None:
+                decrypted = (self._decrypt(enigma, i, text, batch) for i, text in zip(range(first, last), texts))
+            else:
+                decrypted = self._decrypt_parallel(enigma, range(first, last), texts, workers, batch)
+            for i, data in enumerate(decrypted, first):
+                begin = max(start - self.plain_starts[i], 0)
+                yield data[begin:end - self.plain_starts[i]]
+
+    def decrypt_range(self, enigma, start=0, end=None, workers=None, batch=False):
+        """
+        Расшифровывает диапазон байтов целиком (параметры см. iter_range).
+
+        Возвращает:
+            bytes: Расшифрованный диапазон в UTF-8.
+        """
+        return b''.join(self.iter_range(enigma, start, end, workers, batch))
+
+    def _read_chunk(self, f, i):
+        offset, length, _, _ = self.chunks[i]
+        f.seek(offset)
+        return f.read(length).decode('utf-8')
+
+    def _decrypt(self, enigma, i, text, batch):
+        enigma.seek(self.letter_starts[i])
+        return enigma.encode_text(text, batch=batch).encode('utf-8')
+
+    def _decrypt_parallel(self, enigma, indices, texts, workers, batch):
+        """
+        Расшифровывает части на пуле процессов, сохраняя порядок; одновременно в работе
+        не больше двух частей на процесс.
+        """
+        with ParallelEncoder(enigma, workers) as encoder:
+            pending = deque()
+            for i, text in zip(indices, texts):
+                enigma.seek(self.letter_starts[i])
+                positions = tuple(rotor.position for rotor in enigma.rotors)
+                pending.append(encoder.submit(positions, text, batch))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result().encode('utf-8')
+            while pending:
+                yield pending.popleft().result().encode('utf-8')
+        enigma.seek(self.letter_starts[indices[-1] + 1])
+
+
+def _parse_range(value):
+    """
+    Разбирает диапазон байтов вида "START:END" (любая граница может быть опущена).
+    """
+    start, _, end = value.partition(':')
+    return int(start) if start else 0, int(end) if end else None
+
+
+def main(argv=None):
+    """
+    Точка входа подкоманды container: запись контейнера и расшифровка диапазонов.
+
+    Параметры:
+        argv (list): Аргументы командной строки без имени подкоманды.
+    """
+    parser = argparse.ArgumentParser(prog='main.py container', description='Indexed chunked ciphertext container')
+    actions = parser.add_subparsers(dest='action', required=True)
+    pack = actions.add_parser('pack', help='Encrypt a UTF-8 file into a container')
+    unpack = actions.add_parser('unpack', help='Decrypt a byte range of a container')
+    for action in (pack, unpack):
+        action.add_argument('--config', help='Path to configuration file', default='config.json')
+        action.add_argument('--positions', help='Rotor positions (one letter per rotor)', required=True)
+        action.add_argument('--plugboard', help='Plugboard settings (pairs of letters)', default='')
+        action.add_argument('--batch', help='Use the vectorized NumPy engine', action='store_true')
+    pack.add_argument('--input', help='Plaintext file ("-" for stdin)', default='-')
+    pack.add_argument('--output', help='Container file ("-" for stdout)', required=True)
+    pack.add_argument('--chunk-size', help='Plaintext bytes per chunk', type=int, default=CHUNK_SIZE)
+    unpack.add_argument('--input', help='Container file', required=True)
+    unpack.add_argument('--output', help='Output file ("-" for stdout)', default='-')
+    unpack.add_argument('--range', help='Byte range of the decrypted text, START:END', type=_parse_range,
+                        default=(0, None))
+    unpack.add_argument('--workers', help='Decrypt chunks in parallel on N processes', type=int)
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    with open(args.config, 'rb') as f:
+        digest = config_hash(f.read())
+    try:
+        enigma = create_enigma(config, args.positions.upper(), args.plugboard.upper().split())
+        if args.action == 'pack':
+            source = sys.stdin.buffer if args.input == '-' else open(args.input, 'rb')
+            target = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+            try:
+                write_container(enigma, source, target, digest, args.chunk_size, args.batch)
+            finally:
+                if source is not sys.stdin.buffer:
+                    source.close()
+                if target is not sys.stdout.buffer:
+                    target.close()
+            return
+
+        container = Container(args.input)
+        container.check(digest)
+        target = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+        try:
+            for data in container.iter_range(enigma, *args.range, workers=args.workers, batch=args.batch):
+                target.write(data)
+        finally:
+            if target is not sys.stdout.buffer:
+                target.close()
+    except (OSError, ValueError) as e:
+        print(f"Ошибка: {e}")
+        sys.exit(1)
@@ -0,0 +1,430 @@
+import argparse
+import itertools
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from enigma import ALPHABET, Reflector, Rotor, load_config, step_positions
+from vectorized import letter_lookup, rotor_tables
+
+# Частоты букв русского языка, %
+RUSSIAN_FREQUENCIES = {
+    'О': 10.97, 'Е': 8.45, 'А': 8.01, 'И': 7.35, 'Н': 6.70, 'Т': 6.26, 'С': 5.47, 'Р': 4.73,
+    'В': 4.54, 'Л': 4.40, 'К': 3.49, 'М': 3.21, 'Д': 2.98, 'П': 2.81, 'У': 2.62, 'Я': 2.01,
+    'Ы': 1.90, 'Ь': 1.74, 'Г': 1.70, 'З': 1.65, 'Б': 1.59, 'Ч': 1.44, 'Й': 1.21, 'Х': 0.97,
+    'Ж': 0.94, 'Ш': 0.73, 'Ю': 0.64, 'Ц': 0.48, 'Щ': 0.36, 'Э': 0.32, 'Ф': 0.26, 'Ъ': 0.04,
+    'Ё': 0.04,
+}
+
+# Индекс совпадений осмысленного русского текста
+RUSSIAN_IC = 0.0553
+
+
+class NgramScorer:
+    """
+    Оценка текста по логарифмам вероятностей n-грамм.
+
+    Без файла используются встроенные частоты букв (n = 1). Файл n-грамм содержит
+    строки вида "NGRAM COUNT"; неизвестные n-граммы получают вероятность 0.01 / total.
+
+    Атрибуты:
+        n (int): Длина n-граммы.
+
+        table (numpy.ndarray): Логарифмы вероятностей по номеру n-граммы.
+    """
+
+    def __init__(self, ngram_file=None, alphabet=ALPHABET):
+        size = len(alphabet)
+        if ngram_file is None:
+            counts = {letter: RUSSIAN_FREQUENCIES.get(letter, 0.0) for letter in alphabet}
+        else:
+            counts = {}
+            with open(ngram_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) == 2:
+                        counts[parts[0].upper()] = float(parts[1])
+        self.n = len(next(iter(counts)))
+        total = sum(counts.values())
+        self.table = np.full(size ** self.n, math.log10(0.01 / total))
+        for ngram, count in counts.items():
+            if count > 0 and len(ngram) == self.n and all(c in alphabet for c in ngram):
+                index = 0
+                for char in ngram:
+                    index = index * size + alphabet.index(char)
+                self.table[index] = math.log10(count / total)
+        self.size = size
+
+    def score(self, chars):
+        """
+        Оценивает тексты.
+
+        Параметры:
+            chars (numpy.ndarray): Индексы букв, строка на каждый текст.
+
+        Возвращает:
+            numpy.ndarray: Оценки (чем больше, тем правдоподобнее).
+        """
+        width = chars.shape[-1] - self.n + 1
+        index = np.zeros(chars.shape[:-1] + (width,), dtype=np.intp)
+        for i in range(self.n):
+            index = index * self.size + chars[..., i:i + width]
+        return self.table[index].sum(axis=-1)
+
+
+class IndexOfCoincidenceScorer:
+    """
+    Оценка текста по близости индекса совпадений к русскому тексту.
+    """
+
+    n = 1
+
+    def __init__(self, alphabet=ALPHABET):
+        self.size = len(alphabet)
+
+    def score(self, chars):
+        """
+        Оценивает тексты.
+
+        Параметры:
+            chars (numpy.ndarray): Индексы букв, строка на каждый текст.
+
+        Возвращает:
+            numpy.ndarray: Оценки (чем больше, тем правдоподобнее).
+        """
+        rows, length = chars.shape
+        flat = (np.arange(rows)[:, None] * self.size + chars).ravel()
+        counts = np.bincount(flat, minlength=rows * self.size).reshape(rows, self.size)
+        ic = (counts * (counts - 1)).sum(axis=1) / max(1, length * (length - 1))
+        return -np.abs(ic - RUSSIAN_IC)
+
+
+class Cracker:
+    """
+    Поиск ключа машины Enigma по шифротексту.
+
+    Все 33³ начальных положения роторов перебираются векторно: позиции роторов для
+    каждого кандидата и каждой буквы вычисляются аналитически (step_positions), а
+    расшифровка выполняется операциями NumPy над таблицами роторов без создания
+    объектов Enigma. Кандидаты оцениваются по известному фрагменту открытого текста
+    (crib) или статистически (n-граммы, индекс совпадений). Коммутационная панель
+    подбирается восхождением к вершине для лучших кандидатов.
+
+    Поддерживаются конфигурации из трех роторов с русским алфавитом и правилами
+    поворота legacy или odometer.
+
+    Атрибуты:
+        rotors (list): Роторы конфигурации.
+
+        reflector (numpy.ndarray): Проводка отражателя.
+
+        scorer: Оценщик текста (NgramScorer или IndexOfCoincidenceScorer).
+    """
+
+    def __init__(self, config, scorer=None):
+        if len(config['rotors']) != 3 or config.get('alphabet', ALPHABET) != ALPHABET:
+            raise ValueError("Поиск ключа поддерживает только три ротора и русский алфавит.")
+        self.stepping = config.get('stepping', 'legacy')
+        if self.stepping not in ('legacy', 'odometer'):
+            raise ValueError(f"Поиск ключа не поддерживает правила поворота {self.stepping}.")
+        self.rotors = [Rotor(r['wiring'], r['notch']) for r in config['rotors']]
+        self.reflector = np.asarray(Reflector(config['reflector']['wiring']).wiring, dtype=np.intp)
+        self.tables = [rotor_tables(rotor) for rotor in self.rotors]
+        self.notches = tuple(rotor.notch for rotor in self.rotors)
+        self.size = len(ALPHABET)
+        self.scorer = scorer or NgramScorer()
+
+    def letters(self, text):
+        """
+        Переводит текст в индексы букв, отбрасывая символы вне алфавита.
+
+        Параметры:
+            text (str): Текст.
+
+        Возвращает:
+            numpy.ndarray: Индексы букв.
+        """
+        codes = np.frombuffer(text.upper().encode('utf-32-le'), dtype=np.uint32)
+        lookup = letter_lookup(ALPHABET)
+        codes = codes[codes < len(lookup)]
+        indices = lookup[codes]
+        return indices[indices >= 0].astype(np.intp)
+
+    def plugboard_matrix(self, plugboard_pairs=()):
+        """
+        Строит перестановку коммутационной панели по парам индексов.
+
+        Параметры:
+            plugboard_pairs (list): Пары индексов букв.
+
+        Возвращает:
+            numpy.ndarray: Перестановка формы (1, size).
+        """
+        plug = np.arange(self.size, dtype=np.intp)
+        for a, b in plugboard_pairs:
+            plug[a], plug[b] = b, a
+        return plug[None, :]
+
+    def decrypt(self, letters, starts, rings, steps, plugs):
+        """
+        Расшифровывает буквы для набора кандидатов.
+
+        Параметры:
+            letters (numpy.ndarray): Индексы букв шифротекста формы (L,).
+
+            starts (tuple): Начальные позиции роторов (числа или массивы формы (C, 1)).
+
+            rings (tuple): Настройки колец.
+
+            steps (numpy.ndarray): Номера нажатий для каждой буквы формы (L,).
+
+            plugs (numpy.ndarray): Перестановки коммутационной панели формы (P, size).
+
+        Возвращает:
+            numpy.ndarray: Индексы расшифрованных букв формы (max(C, P), L).
+        """
+        size = self.size
+        positions = step_positions(starts, self.notches, steps[None, :], size, self.stepping)
+        offsets = [(pos - ring) % size for pos, ring in zip(positions, rings)]
+        chars = np.take_along_axis(plugs, np.broadcast_to(letters, (plugs.shape[0], len(letters))), axis=1)
+        for (forward, _), offset in zip(reversed(self.tables), reversed(offsets)):
+            chars = forward[offset, chars]
+        chars = self.reflector[chars]
+        for (_, backward), offset in zip(self.tables, offsets):
+            chars = backward[offset, chars]
+        return np.take_along_axis(plugs, chars.astype(np.intp), axis=1)
+
+    def search_left(self, left, ciphertext, rings, crib=None, crib_offset=0, max_mismatches=0,
+                    top=10, plugboard_pairs=(), prune=0.05):
+        """
+        Перебирает все положения среднего и правого роторов при фиксированном левом.
+
+        С известным фрагментом буквы фрагмента проверяются порциями, и кандидаты с
+        количеством несовпадений больше max_mismatches отбрасываются сразу. При
+        статистической оценке кандидаты сначала оцениваются по первой четверти текста,
+        и полностью расшифровывается только доля prune лучших.
+
+        Параметры:
+            left (int): Позиция левого ротора.
+
+            ciphertext (str): Шифротекст.
+
+            rings (tuple): Настройки колец.
+
+            crib (str): Известный фрагмент открытого текста.
+
+            crib_offset (int): Номер буквы шифротекста, с которой начинается фрагмент.
+
+            max_mismatches (int): Допустимое количество несовпадений с фрагментом.
+
+            top (int): Количество лучших кандидатов.
+
+            plugboard_pairs (list): Известные пары коммутационной панели (индексы букв).
+
+            prune (float): Доля кандидатов, остающихся после предварительной оценки.
+
+        Возвращает:
+            list: Кортежи (оценка, позиции роторов).
+        """
+        size = self.size
+        letters = self.letters(ciphertext)
+        plugs = self.plugboard_matrix(plugboard_pairs)
+        middle, right = np.divmod(np.arange(size * size), size)
+        steps = np.arange(1, len(letters) + 1)
+
+        if crib:
+            expected = self.letters(crib)
+            mismatches = np.zeros(len(middle), dtype=np.intp)
+            for start in range(0, len(expected), 4):
+                window = slice(crib_offset + start, min(crib_offset + start + 4, crib_offset + len(expected)))
+                plain = self.decrypt(letters[window], (left, middle[:, None], right[:, None]), rings,
+                                     steps[window], plugs)
+                mismatches += (plain != expected[start:start + plain.shape[1]]).sum(axis=1)
+                keep = mismatches <= max_mismatches
+                middle, right, mismatches = middle[keep], right[keep], mismatches[keep]
+                if not len(middle):
+                    return []
+            scores = -mismatches.astype(float)
+        else:
+            prefix = max(self.scorer.n, len(letters) // 4)
+            if prune < 1 and prefix < len(letters):
+                plain = self.decrypt(letters[:prefix], (left, middle[:, None], right[:, None]), rings,
+                                     steps[:prefix], plugs)
+                keep = np.argsort(-self.scorer.score(plain))[:max(top, int(len(middle) * prune))]
+                middle, right = middle[keep], right[keep]
+            plain = self.decrypt(letters, (left, middle[:, None], right[:, None]), rings, steps, plugs)
+            scores = self.scorer.score(plain)
+
+        best = np.argsort(-scores, kind='stable')[:top]
+        return [(float(scores[i]), (left, int(middle[i]), int(right[i]))) for i in best]
+
+    def hill_climb_plugboard(self, ciphertext, positions, rings, max_pairs=10, plugboard_pairs=()):
+        """
+        Подбирает пары коммутационной панели жадным восхождением по оценке текста.
+
+        На каждом шаге все возможные новые пары оцениваются одной векторной расшифровкой,
+        лучшая пара добавляется, пока оценка растет.
+
+        Параметры:
+            ciphertext (str): Шифротекст.
+
+            positions (tuple): Начальные позиции роторов.
+
+            rings (tuple): Настройки колец.
+
+            max_pairs (int): Максимальное количество пар.
+
+            plugboard_pairs (list): Начальные пары (индексы букв).
+
+        Возвращает:
+            tuple: Пары, оценка и расшифрованный текст.
+        """
+        letters = self.letters(ciphertext)
+        steps = np.arange(1, len(letters) + 1)
+        pairs = list(plugboard_pairs)
+        plain = self.decrypt(letters, positions, rings, steps, self.plugboard_matrix(pairs))
+        score = float(self.scorer.score(plain)[0])
+
+        while len(pairs) < max_pairs:
+            used = {letter for pair in pairs for letter in pair}
+            free = [i for i in range(self.size) if i not in used]
+            candidates = list(itertools.combinations(free, 2))
+            if not candidates:
+                break
+            plugs = np.concatenate([self.plugboard_matrix(pairs + [pair]) for pair in candidates])
+            scores = self.scorer.score(self.decrypt(letters, positions, rings, steps, plugs))
+            best = int(np.argmax(scores))
+            if scores[best] <= score:
+                break
+            pairs.append(candidates[best])
+            score = float(scores[best])
+
+        plain = self.decrypt(letters, positions, rings, steps, self.plugboard_matrix(pairs))[0]
+        return pairs, score, ''.join(ALPHABET[i] for i in plain)
+
+
+_worker_cracker = None
+
+
+def _init_worker(config, ngram_file, use_ic):
+    """
+    Создает Cracker в рабочем процессе.
+    """
+    global _worker_cracker
+    scorer = IndexOfCoincidenceScorer() if use_ic else NgramScorer(ngram_file)
+    _worker_cracker = Cracker(config, scorer)
+
+
+def _search_task(left, rings, kwargs):
+    """
+    Выполняет перебор для одного положения левого ротора в рабочем процессе.
+    """
+    return [(score, positions, rings) for score, positions in _worker_cracker.search_left(left, rings=rings, **kwargs)]
+
+
+def crack(config, ciphertext, crib=None, crib_offset=0, max_mismatches=0, top=10, rings=None,
+          search_rings=(), plugboard_pairs=(), ngram_file=None, use_ic=False, workers=None):
+    """
+    Ищет начальные позиции роторов (и, при необходимости, кольца) на пуле процессов.
+
+    Задачи делятся по положению левого ротора и комбинациям перебираемых колец.
+
+    Параметры:
+        config (dict): Конфигурация машины.
+
+        ciphertext (str): Шифротекст.
+
+        crib (str): Известный фрагмент открытого текста.
+
+        crib_offset (int): Номер буквы шифротекста, с которой начинается фрагмент.
+
+        max_mismatches (int): Допустимое количество несовпадений с фрагментом.
+
+        top (int): Количество лучших кандидатов.
+
+        rings (tuple): Настройки колец; None - нулевые.
+
+        search_rings (tuple): Номера роторов, кольца которых нужно перебрать.
+
+        plugboard_pairs (list): Известные пары коммутационной панели (индексы букв).
+
+        ngram_file (str): Файл n-грамм для статистической оценки.
+
+        use_ic (bool): Оценивать по индексу совпадений.
+
+        workers (int): Количество процессов; None - по числу ядер.
+
+    Возвращает:
+        list: Кортежи (оценка, позиции роторов, кольца), лучшие первыми.
+    """
+    size = len(ALPHABET)
+    rings = tuple(rings or (0,) * len(config['rotors']))
+    ring_options = []
+    for values in itertools.product(range(size), repeat=len(search_rings)):
+        option = list(rings)
+        for rotor_index, value in zip(search_rings, values):
+            option[rotor_index] = value
+        ring_options.append(tuple(option))
+
+    kwargs = {'ciphertext': ciphertext, 'crib': crib, 'crib_offset': crib_offset,
+              'max_mismatches': max_mismatches, 'top': top, 'plugboard_pairs': plugboard_pairs}
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(config, ngram_file, use_ic)) as executor:
+        futures = [executor.submit(_search_task, left, option, kwargs)
+                   for option in ring_options for left in range(size)]
+        results = [result for future in futures for result in future.result()]
+    results.sort(key=lambda result: -result[0])
+    return results[:top]
+
+
+def main(argv=None):
+    """
+    Точка входа подкоманды crack: поиск ключа по шифротексту.
+
+    Параметры:
+        argv (list): Аргументы командной строки без имени подкоманды.
+    """
+    parser = argparse.ArgumentParser(prog='main.py crack', description='Recover Enigma rotor positions from ciphertext')
+    parser.add_argument('--config', help='Path to configuration file', default='config.json')
+    parser.add_argument('--text', help='Ciphertext (default: read from stdin)')
+    parser.add_argument('--crib', help='Known plaintext fragment')
+    parser.add_argument('--crib-offset', help='Letter offset of the crib in the ciphertext', type=int, default=0)
+    parser.add_argument('--max-mismatches', help='Allowed crib mismatches', type=int, default=0)
+    parser.add_argument('--ngrams', help='N-gram statistics file ("NGRAM COUNT" per line)')
+    parser.add_argument('--ic', help='Score by index of coincidence', action='store_true')
+    parser.add_argument('--rings', help='Known ring settings (comma-separated)')
+    parser.add_argument('--search-rings', help='Rotor indices whose rings are searched (comma-separated)', default='')
+    parser.add_argument('--plugboard', help='Known plugboard pairs', default='')
+    parser.add_argument('--plugboard-pairs', help='Hill-climb up to N extra plugboard pairs', type=int, default=0)
+    parser.add_argument('--top', help='Number of candidates to print', type=int, default=5)
+    parser.add_argument('--workers', help='Worker processes', type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    ciphertext = args.text if args.text is not None else sys.stdin.read()
+    rings = tuple(int(r) for r in args.rings.split(',')) if args.rings else None
+    search_rings = tuple(int(i) for i in args.search_rings.split(',') if i)
+    known_pairs = [(ALPHABET.index(a), ALPHABET.index(b)) for a, b in args.plugboard.upper().split()]
+
+    scorer = IndexOfCoincidenceScorer() if args.ic else NgramScorer(args.ngrams)
+    try:
+        cracker = Cracker(config, scorer)
+    except ValueError as e:
+        print(f"Ошибка: {e}")
+        sys.exit(1)
+    results = crack(config, ciphertext, args.crib, args.crib_offset, args.max_mismatches, args.top, rings,
+                    search_rings, known_pairs, args.ngrams, args.ic, args.workers)
+    candidates = []
+    for _, positions, candidate_rings in results:
+        pairs, score, plaintext = cracker.hill_climb_plugboard(ciphertext, positions, candidate_rings,
+                                                               len(known_pairs) + args.plugboard_pairs, known_pairs)
+        candidates.append((score, positions, candidate_rings, pairs, plaintext))
+    if not (args.crib or args.ic):
+        # После подбора панели кандидаты упорядочиваются по новой оценке
+        candidates.sort(key=lambda candidate: -candidate[0])
+    for score, positions, candidate_rings, pairs, plaintext in candidates:
+        print(f"{score:12.3f} позиции={''.join(ALPHABET[p] for p in positions)} "
+              f"кольца={','.join(map(str, candidate_rings))} "
+              f"панель={' '.join(ALPHABET[a] + ALPHABET[b] for a, b in pairs)} текст={plaintext[:60]}")
@@ -1,5 +1,58 @@
+import codecs
+import functools
 import json
 import sys
+import time
+from array import array
+
+from instrumentation import HOOKS, emit
+
+ALPHABET = 'АБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ'
+
+# Правила поворота роторов:
+#   legacy      - правила исходной машины: предпоследний и последний роторы поворачиваются
+#                 на каждом символе, перенос с последнего ротора на предпоследний зазор не проверяет;
+#   odometer    - как счетчик: поворачивается последний ротор, остальные - при переносе;
+#   double_step - как в Enigma I: ротор поворачивается вместе с соседом слева, когда
+#                 его собственный поворот приходится на зазор (двойной шаг среднего ротора).
+STEPPING_MODES = ('legacy', 'odometer', 'double_step')
+
+# Кодировка, в которой str.encode дает массив кодов символов array('I') без преобразования
+UTF32 = 'utf-32-le' if sys.byteorder == 'little' else 'utf-32-be'
+
+# Количество проводок, для которых хранятся построенные таблицы роторов (см. _rotor_tables)
+TABLES_CACHE_SIZE = 256
+
+
+@functools.lru_cache(maxsize=TABLES_CACHE_SIZE)
+def _rotor_tables(wiring):
+    """
+    Строит обратную проводку и таблицы прямого и обратного прохода для всех смещений ротора.
+
+    Строка таблицы с номером shift соответствует (position - ring_setting) % size,
+    а от ring_setting сами таблицы не зависят. При установке кольца строки
+    переставляются по позиции ротора (см. Rotor.ring_setting), поэтому при кодировании
+    весь проход сводится к одному обращению по индексу без деления по модулю.
+    Одинаковая проводка встречается во многих машинах, а построение таблиц на чистом
+    Python дорогое, поэтому таблицы последних проводок кэшируются.
+
+    Параметры:
+        wiring (tuple): Проводка ротора.
+
+    Возвращает:
+        tuple: Обратная проводка, таблицы прямого и обратного прохода (bytes).
+    """
+    size = len(wiring)
+    inverse = [0] * size
+    for i, contact in enumerate(wiring):
+        inverse[contact] = i
+    forward = []
+    backward = []
+    for shift in range(size):
+        forward.append(bytes((wiring[(i + shift) % size] - shift) % size for i in range(size)))
+        backward.append(bytes((inverse[(i + shift) % size] - shift) % size for i in range(size)))
+    return inverse, tuple(forward), tuple(backward)
+
 
 class Rotor:
     """
@@ -8,18 +61,69 @@ class Rotor:
     Атрибуты:
         wiring (list): Список, представляющий проводку ротора.
 
+        size (int): Количество позиций ротора (длина алфавита).
+
         notch (int): Позиция, на которой ротор вызывает вращение следующего ротора.
 
         position (int): Текущая позиция ротора.
 
-        ring_setting (int): Настройка кольца ротора.
+        ring_setting (int): Настройка кольца ротора (приводится по модулю size).
     """
 
-    def __init__(self, wiring, notch):
-        self.wiring = wiring
+    __slots__ = ('notch', 'position', 'size', '_ring_setting', '_wiring', '_inverse', '_forward', '_backward',
+                 '_shifted_forward', '_shifted_backward')
+
+    def __init__(self, wiring, notch, inverse=None, tables=None):
         self.notch = notch
         self.position = 0
-        self.ring_setting = 0
+        self._ring_setting = 0
+        if tables is None:
+            self.wiring = wiring
+        else:
+            # Готовые таблицы (например, из скомпилированной конфигурации)
+            self._wiring = wiring
+            self._inverse = inverse
+            self._forward, self._backward = tables
+            self.size = len(wiring)
+            self.ring_setting = 0
+
+    @property
+    def wiring(self):
+        return self._wiring
+
+    @wiring.setter
+    def wiring(self, wiring):
+        self._wiring = wiring
+        self.size = len(wiring)
+        self._inverse, self._forward, self._backward = _rotor_tables(tuple(wiring))
+        self.ring_setting = self._ring_setting
+
+    @property
+    def ring_setting(self):
+        return self._ring_setting
+
+    @ring_setting.setter
+    def ring_setting(self, ring_setting):
+        # Кольцо вне диапазона эквивалентно кольцу по модулю size. Строки таблиц
+        # переставляются так, чтобы строка с номером position соответствовала
+        # смещению (position - ring_setting) % size
+        self._ring_setting = ring_setting % self.size
+        split = self.size - self._ring_setting
+        self._shifted_forward = self._forward[split:] + self._forward[:split]
+        self._shifted_backward = self._backward[split:] + self._backward[:split]
+
+    def __getstate__(self):
+        state = {name: getattr(self, name) for name in self.__slots__}
+        # Срезы memoryview скомпилированной конфигурации не сериализуются pickle
+        if isinstance(self._wiring, memoryview):
+            state['_wiring'] = bytes(self._wiring)
+            state['_inverse'] = bytes(self._inverse)
+            state['_forward'] = tuple(bytes(row) for row in self._forward)
+            state['_backward'] = tuple(bytes(row) for row in self._backward)
+            split = self.size - self._ring_setting
+            state['_shifted_forward'] = state['_forward'][split:] + state['_forward'][:split]
+            state['_shifted_backward'] = state['_backward'][split:] + state['_backward'][:split]
+        return None, state
 
     def forward(self, char_idx):
         """
@@ -31,11 +135,7 @@ class Rotor:
         Возвращает:
             int: Индекс символа после прохождения через ротор.
         """
-        shift = self.position - self.ring_setting
-        contact = (char_idx + shift) % 33
-        contact = self.wiring[contact]
-        contact = (contact - shift) % 33
-        return contact
+        return self._shifted_forward[self.position][char_idx]
 
     def backward(self, char_idx):
         """
@@ -47,11 +147,7 @@ class Rotor:
         Возвращает:
             int: Индекс символа после прохождения через ротор.
         """
-        shift = self.position - self.ring_setting
-        contact = (char_idx + shift) % 33
-        contact = self.wiring.index(contact)
-        contact = (contact - shift) % 33
-        return contact
+        return self._shifted_backward[self.position][char_idx]
 
     def rotate(self):
         """
@@ -60,9 +156,171 @@ class Rotor:
         Возвращает:
             bool: True, если ротор достиг позиции зазора (notch), иначе False.
         """
-        self.position = (self.position + 1) % 33
+        self.position = (self.position + 1) % self.size
         return self.position == self.notch
 
+    def engaged(self):
+        """
+        Проверяет, приведет ли следующий поворот ротора на позицию зазора.
+
+        Возвращает:
+            bool: True, если следующий поворот вызовет перенос.
+        """
+        return (self.position + 1) % self.size == self.notch
+
+
+def carries(start, notch, steps, size=33):
+    """
+    Считает, сколько раз ротор встанет на позицию зазора за steps поворотов.
+
+    Работает как с целыми числами, так и с массивами NumPy.
+
+    Параметры:
+        start (int): Начальная позиция ротора.
+
+        notch (int): Позиция зазора.
+
+        steps (int): Количество поворотов ротора.
+
+        size (int): Количество позиций ротора.
+
+    Возвращает:
+        int: Количество переносов на соседний ротор.
+    """
+    if not 0 <= notch < size:
+        return steps * 0
+    first = (notch - start - 1) % size + 1
+    return (steps + size - first) // size
+
+
+def step_positions(positions, notches, steps, size=33, stepping='legacy'):
+    """
+    Вычисляет позиции роторов после steps нажатий без пошагового моделирования.
+
+    Параметры:
+        positions (tuple): Позиции роторов слева направо.
+
+        notches (tuple): Позиции зазоров роторов.
+
+        steps (int): Количество нажатий (может быть массивом NumPy).
+
+        size (int): Количество позиций ротора.
+
+        stepping (str): Правила поворота (см. STEPPING_MODES).
+
+    Возвращает:
+        tuple: Позиции роторов слева направо.
+    """
+    increments = rotor_rotations(positions, notches, steps, size, stepping)
+    return tuple((position + increment) % size for position, increment in zip(positions, increments))
+
+
+def rotor_rotations(positions, notches, steps, size=33, stepping='legacy'):
+    """
+    Считает, сколько раз повернется каждый ротор за steps нажатий, без пошагового моделирования.
+
+    Для правил legacy и odometer количества вычисляются за O(1) (количество роторов
+    фиксировано) и работают с массивами NumPy. В правилах legacy, повторяющих исходную
+    машину, предпоследний ротор поворачивается на каждом символе (этот поворот может
+    повернуть ротор слева) и дополнительно при срабатывании зазора последнего ротора
+    (этот поворот перенос дальше не вызывает); остальные роторы поворачиваются при
+    переносе. Для double_step (только целые числа) моделируются лишь нажатия, на которых
+    поворачивается не только последний ротор, - O(steps / size).
+
+    Параметры:
+        positions (tuple): Позиции роторов слева направо.
+
+        notches (tuple): Позиции зазоров роторов.
+
+        steps (int): Количество нажатий (может быть массивом NumPy).
+
+        size (int): Количество позиций ротора.
+
+        stepping (str): Правила поворота (см. STEPPING_MODES).
+
+    Возвращает:
+        tuple: Количество поворотов каждого ротора слева направо.
+    """
+    if stepping == 'double_step':
+        return _double_step_rotations(positions, notches, steps, size)
+    last = len(positions) - 1
+    increments = [0] * len(positions)
+    increments[last] = steps
+    if stepping == 'legacy' and last >= 1:
+        right, middle = positions[last], positions[last - 1]
+        right_notch, middle_notch = notches[last], notches[last - 1]
+        increments[last - 1] = steps + carries(right, right_notch, steps, size)
+        # Переносы последнего ротора до последнего нажатия: дополнительные повороты
+        # предпоследнего ротора, на которых зазор не проверяется.
+        skipped = carries(right, right_notch, steps - 1 + (steps == 0), size)
+        checked = carries(middle, middle_notch, steps + skipped, size)
+        if 0 <= middle_notch < size and 0 <= right_notch < size:
+            first_carry = (right_notch - right - 1) % size + 1
+            residue = (middle_notch - middle - first_carry - 1) % size
+            checked = checked - (skipped - residue + size - 1) // size
+        if last >= 2:
+            increments[last - 2] = checked
+        start = last - 2
+    elif stepping in ('legacy', 'odometer'):
+        start = last
+    else:
+        raise ValueError(f"Неизвестные правила поворота роторов: {stepping}")
+    for i in range(start, 0, -1):
+        increments[i - 1] = carries(positions[i], notches[i], increments[i], size)
+    return tuple(increments)
+
+
+def double_step_once(positions, notches, size):
+    """
+    Поворачивает роторы на одно нажатие по правилам double_step.
+
+    Последний ротор поворачивается всегда. Ротор (кроме первого), следующий поворот
+    которого приходится на зазор, поворачивается сам и поворачивает ротор слева.
+    Решение для всех роторов принимается по позициям до нажатия.
+
+    Параметры:
+        positions (list): Позиции роторов слева направо (изменяются на месте).
+
+        notches (tuple): Позиции зазоров роторов.
+
+        size (int): Количество позиций ротора.
+    """
+    last = len(positions) - 1
+    engaged_right = False
+    for i in range(last, -1, -1):
+        engaged = i > 0 and (positions[i] + 1) % size == notches[i]
+        if i == last or engaged or engaged_right:
+            positions[i] = (positions[i] + 1) % size
+        engaged_right = engaged
+
+
+def _double_step_rotations(positions, notches, steps, size):
+    """
+    Считает повороты роторов за steps нажатий по правилам double_step.
+
+    Пока ни один ротор не готов к переносу, поворачивается только последний, поэтому
+    такие участки пропускаются целиком.
+    """
+    positions = list(positions)
+    increments = [0] * len(positions)
+    last = len(positions) - 1
+    while steps > 0:
+        middle_engaged = any((positions[i] + 1) % size == notches[i] for i in range(1, last))
+        quiet = (notches[last] - 1 - positions[last]) % size if last > 0 else steps
+        if not middle_engaged and quiet > 0:
+            jump = min(quiet, steps)
+            positions[last] = (positions[last] + jump) % size
+            increments[last] += jump
+            steps -= jump
+        else:
+            before = tuple(positions)
+            double_step_once(positions, notches, size)
+            for i, (old, new) in enumerate(zip(before, positions)):
+                if old != new:
+                    increments[i] += 1
+            steps -= 1
+    return tuple(increments)
+
 
 class Reflector:
     """
@@ -72,9 +330,16 @@ class Reflector:
         wiring (list): Список, представляющий проводку отражателя.
     """
 
+    __slots__ = ('wiring',)
+
     def __init__(self, wiring):
         self.wiring = wiring
 
+    def __getstate__(self):
+        if isinstance(self.wiring, memoryview):
+            return None, {'wiring': bytes(self.wiring)}
+        return None, {'wiring': self.wiring}
+
     def reflect(self, char_idx):
         """
         Отражает сигнал.
@@ -97,80 +362,364 @@ class Enigma:
 
         reflector (Reflector): Объект отражателя.
 
-        plugboard (dict): Настройки коммутационной панели.
+        plugboard (dict): Настройки коммутационной панели. Изменения словаря на месте
+            вступают в силу при следующем вызове set_rotor_positions или encode_text.
 
         alphabet (str): Алфавит, используемый в машине.
+
+        stepping (str): Правила поворота роторов (см. STEPPING_MODES).
     """
 
-    def __init__(self, rotors, reflector, plugboard):
+    __slots__ = ('_rotors', '_reversed_rotors', 'reflector', 'stepping', '_alphabet', '_index', '_lookup',
+                 '_codes', '_plugboard', '_plug', '_origin')
+
+    def __init__(self, rotors, reflector, plugboard, alphabet=ALPHABET, stepping='legacy'):
+        if stepping not in STEPPING_MODES:
+            raise ValueError(f"Неизвестные правила поворота роторов: {stepping}")
         self.rotors = rotors
         self.reflector = reflector
+        self.alphabet = alphabet
         self.plugboard = plugboard
-        self.alphabet = 'АБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ'
+        self.stepping = stepping
+        self._origin = tuple(rotor.position for rotor in rotors)
+
+    @property
+    def rotors(self):
+        return self._rotors
+
+    @rotors.setter
+    def rotors(self, rotors):
+        self._rotors = rotors
+        # Порядок прямого прохода, чтобы не создавать reversed() на каждом символе
+        self._reversed_rotors = tuple(reversed(rotors))
+
+    @property
+    def alphabet(self):
+        return self._alphabet
+
+    @alphabet.setter
+    def alphabet(self, alphabet):
+        # Таблицы символ -> индекс и код символа -> индекс (-1 для символов вне алфавита)
+        # заменяют поиск по строке алфавита на каждом символе
+        self._alphabet = alphabet
+        self._index = {char: i for i, char in enumerate(alphabet)}
+        lookup = [-1] * (max(map(ord, alphabet), default=-1) + 1)
+        for i, char in enumerate(alphabet):
+            lookup[ord(char)] = i
+        self._lookup = lookup
+        self._codes = tuple(map(ord, alphabet))
+
+    @property
+    def plugboard(self):
+        return self._plugboard
+
+    @plugboard.setter
+    def plugboard(self, plugboard):
+        self._plugboard = plugboard
+        self._sync_plugboard()
+
+    def _sync_plugboard(self):
+        """
+        Переносит коммутационную панель в плотную таблицу: индекс -> индекс после панели.
+        """
+        plug = list(range(len(self._alphabet)))
+        for a, b in self._plugboard.items():
+            plug[a] = b
+        self._plug = plug
 
     def set_rotor_positions(self, positions):
         """
         Устанавливает начальные позиции роторов.
 
         Параметры:
-            positions (str): Строка из трех букв, представляющая начальные позиции роторов.
+            positions (str): Строка, по одной букве на ротор, представляющая начальные позиции роторов.
         """
         for rotor, pos in zip(self.rotors, positions):
             rotor.position = self.alphabet.index(pos)
+        self._origin = tuple(rotor.position for rotor in self.rotors)
+        self._sync_plugboard()
 
-    def encode_char(self, char):
+    def stepped_positions(self, steps):
         """
-        Кодирует один символ.
+        Вычисляет позиции роторов после steps букв алфавита, не поворачивая роторы.
 
         Параметры:
-            char (str): Символ для кодирования.
+            steps (int): Количество букв.
 
         Возвращает:
-            str: Закодированный символ.
+            tuple: Позиции роторов.
         """
-        if char not in self.alphabet:
-            return char
+        positions = tuple(rotor.position for rotor in self.rotors)
+        notches = tuple(rotor.notch for rotor in self.rotors)
+        return step_positions(positions, notches, steps, len(self.alphabet), self.stepping)
 
-        # Применяем коммутационную панель
-        char_idx = self.alphabet.index(char)
-        if char_idx in self.plugboard:
-            char_idx = self.plugboard[char_idx]
+    def advance(self, steps):
+        """
+        Поворачивает роторы так, как если бы было закодировано steps букв алфавита.
 
-        # Вращение роторов
-        if self.rotors[1].rotate():
-            self.rotors[0].rotate()
-        if self.rotors[2].rotate():
-            self.rotors[1].rotate()
+        Позиции вычисляются без пошагового моделирования (см. step_positions).
 
-        # Прямой проход через роторы
-        for rotor in reversed(self.rotors):
-            char_idx = rotor.forward(char_idx)
+        Параметры:
+            steps (int): Количество букв.
+        """
+        for rotor, position in zip(self.rotors, self.stepped_positions(steps)):
+            rotor.position = position
+
+    def seek(self, offset):
+        """
+        Устанавливает роторы в положение после offset букв от позиций, заданных set_rotor_positions.
+
+        Параметры:
+            offset (int): Количество букв от начала сообщения.
+        """
+        for rotor, position in zip(self.rotors, self._origin):
+            rotor.position = position
+        self.advance(offset)
+
+    def snapshot(self):
+        """
+        Возвращает состояние машины, достаточное для продолжения кодирования.
+
+        Возвращает:
+            dict: Начальные и текущие позиции роторов (буквами), кольца и пары
+                коммутационной панели; сериализуется в JSON.
+        """
+        alphabet = self.alphabet
+        return {
+            'origin': ''.join(alphabet[position] for position in self._origin),
+            'positions': ''.join(alphabet[rotor.position] for rotor in self.rotors),
+            'rings': [rotor.ring_setting for rotor in self.rotors],
+            'plugboard': [alphabet[a] + alphabet[b] for a, b in sorted(self.plugboard.items()) if a < b],
+        }
+
+    def restore(self, state):
+        """
+        Восстанавливает состояние, полученное snapshot.
+
+        Параметры:
+            state (dict): Состояние машины.
+
+        Исключения:
+            ValueError: Если состояние не соответствует алфавиту или количеству роторов.
+        """
+        if len(state['positions']) != len(self.rotors) or len(state['origin']) != len(self.rotors):
+            raise ValueError(f"Состояние записано для другого количества роторов: {state['positions']}")
+        self.plugboard = build_plugboard(state['plugboard'], self.alphabet)
+        self.set_ring_settings(state['rings'])
+        self.set_rotor_positions(state['origin'])
+        for rotor, letter in zip(self.rotors, state['positions']):
+            rotor.position = self.alphabet.index(letter)
+
+    def set_ring_settings(self, ring_settings):
+        """
+        Устанавливает настройки колец роторов.
+
+        Параметры:
+            ring_settings (list): Настройки колец роторов (по одному числу на ротор).
+        """
+        for rotor, ring_setting in zip(self.rotors, ring_settings):
+            rotor.ring_setting = ring_setting
+
+    def _encode_index(self, char_idx):
+        """
+        Пропускает индекс символа через коммутационную панель, роторы и отражатель без поворота роторов.
+
+        Параметры:
+            char_idx (int): Индекс символа.
 
-        # Отражатель
-        char_idx = self.reflector.reflect(char_idx)
+        Возвращает:
+            int: Индекс закодированного символа.
+        """
+        plug = self._plug
+
+        # Коммутационная панель, прямой проход через роторы, отражатель
+        char_idx = plug[char_idx]
+        for rotor in self._reversed_rotors:
+            char_idx = rotor._shifted_forward[rotor.position][char_idx]
+        char_idx = self.reflector.wiring[char_idx]
+
+        # Обратный проход через роторы и снова коммутационная панель
+        for rotor in self._rotors:
+            char_idx = rotor._shifted_backward[rotor.position][char_idx]
+        return plug[char_idx]
+
+    def _step(self):
+        """
+        Поворачивает роторы на одно нажатие по правилам self.stepping.
+        """
+        rotors = self.rotors
+        last = len(rotors) - 1
+        if self.stepping == 'legacy':
+            # Предпоследний ротор поворачивается на каждом символе и переносит поворот влево,
+            # перенос с последнего ротора поворачивает предпоследний без проверки зазора
+            i = last - 1
+            if i < 0:
+                rotors[0].rotate()
+                return
+            while rotors[i].rotate() and i > 0:
+                i -= 1
+            if rotors[last].rotate():
+                rotors[last - 1].rotate()
+        elif self.stepping == 'odometer':
+            i = last
+            while rotors[i].rotate() and i > 0:
+                i -= 1
+        else:
+            engaged_right = False
+            for i in range(last, -1, -1):
+                rotor = rotors[i]
+                engaged = i > 0 and rotor.engaged()
+                if i == last or engaged or engaged_right:
+                    rotor.rotate()
+                engaged_right = engaged
 
-        # Обратный проход через роторы
-        for rotor in self.rotors:
-            char_idx = rotor.backward(char_idx)
+    def encode_char(self, char):
+        """
+        Кодирует один символ.
+
+        Параметры:
+            char (str): Символ для кодирования.
+
+        Возвращает:
+            str: Закодированный символ.
+        """
+        char_idx = self._index.get(char)
+        if char_idx is None:
+            return char
 
-        # Снова применяем коммутационную панель
-        if char_idx in self.plugboard:
-            char_idx = self.plugboard[char_idx]
+        self._step()
 
-        return self.alphabet[char_idx]
+        return self._alphabet[self._encode_index(char_idx)]
 
-    def encode_text(self, text):
+    def encode_text(self, text, batch=False, workers=None):
         """
         Кодирует текст.
 
+        Коды символов записываются в массив, и закодированные буквы заменяются в нем
+        на месте, без создания объектов для каждого символа. Если зарегистрированы
+        обработчики события "encode" (см. instrumentation), после вызова им передаются
+        длительность и количество символов.
+
         Параметры:
             text (str): Текст для кодирования.
 
+            batch (bool): Использовать векторизованный движок NumPy (модуль vectorized).
+
+            workers (int): Количество процессов для параллельного кодирования (модуль parallel);
+                None - кодировать в текущем процессе.
+
         Возвращает:
             str: Закодированный текст.
         """
-        text = text.upper()
-        return ''.join(self.encode_char(c) for c in text)
+        # При workers событие отправляет ParallelEncoder.encode_text
+        if workers is not None or 'encode' not in HOOKS:
+            return self._encode_text(text, batch, workers)
+        start = tuple(rotor.position for rotor in self._rotors)
+        started = time.perf_counter()
+        result = self._encode_text(text, batch, workers)
+        seconds = time.perf_counter() - started
+        upper = text.upper()
+        letters = len(upper) - len(upper.translate(dict.fromkeys(self._codes)))
+        emit('encode', enigma=self, start=start, characters=len(text), letters=letters, seconds=seconds)
+        return result
+
+    def _encode_text(self, text, batch, workers):
+        """
+        Кодирует текст (см. encode_text).
+        """
+        if workers is not None:
+            from parallel import encode_text_parallel
+            return encode_text_parallel(self, text, workers, batch=batch)
+        if batch:
+            from vectorized import encode_text as encode_text_batch
+            return encode_text_batch(self, text)
+        self._sync_plugboard()
+
+        buffer = array('I', text.upper().encode(UTF32, 'surrogatepass'))
+        self._encode_codes(buffer)
+        return buffer.tobytes().decode(UTF32, 'surrogatepass')
+
+    def _encode_codes(self, buffer):
+        """
+        Кодирует на месте массив кодов символов в верхнем регистре.
+
+        Параметры:
+            buffer (array.array): Коды символов (тип 'I'); коды вне алфавита не изменяются.
+        """
+        lookup = self._lookup
+        limit = len(lookup)
+        codes = self._codes
+        plug = self._plug
+        rotors = self._rotors
+        reversed_rotors = self._reversed_rotors
+        reflector = self.reflector.wiring
+        step = self._step
+        for i, code in enumerate(buffer):
+            if code >= limit:
+                continue
+            char_idx = lookup[code]
+            if char_idx < 0:
+                continue
+            step()
+            char_idx = plug[char_idx]
+            for rotor in reversed_rotors:
+                char_idx = rotor._shifted_forward[rotor.position][char_idx]
+            char_idx = reflector[char_idx]
+            for rotor in rotors:
+                char_idx = rotor._shifted_backward[rotor.position][char_idx]
+            buffer[i] = codes[plug[char_idx]]
+
+
+def encode_stream(enigma, source, target, chunk_size=65536, batch=False, normalizer=None, checkpoint=None):
+    """
+    Кодирует поток байтов UTF-8 по частям с ограниченным расходом памяти.
+
+    Состояние роторов переносится между частями, многобайтовые символы на границе
+    частей декодируются инкрементально. Символы вне алфавита остаются без изменений,
+    если не задан normalizer.
+
+    Параметры:
+        enigma (Enigma): Машина Enigma.
+
+        source: Двоичный поток для чтения.
+
+        target: Двоичный поток для записи.
+
+        chunk_size (int): Размер читаемой части в байтах.
+
+        batch (bool): Использовать векторизованный движок NumPy.
+
+        normalizer (validation.Normalizer): Проверка и нормализация частей перед кодированием.
+
+        checkpoint (checkpoint.Checkpointer): Получает после каждой записанной части количество
+            прочитанных и записанных байтов и обработанных символов от начала вызова.
+
+    Возвращает:
+        int: Количество обработанных символов.
+
+    Исключения:
+        ValueError: Если normalizer отклонил символ.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    processed = 0
+    consumed = written = 0
+    while True:
+        chunk = source.read(chunk_size)
+        consumed += len(chunk)
+        text = decoder.decode(chunk, final=not chunk)
+        if text:
+            processed += len(text)
+            if normalizer is not None:
+                text = normalizer.feed(text)
+            data = enigma.encode_text(text, batch=batch).encode('utf-8')
+            target.write(data)
+            target.flush()
+            written += len(data)
+            if checkpoint is not None:
+                # Байты незавершенного символа еще не закодированы
+                checkpoint.update(consumed - len(decoder.getstate()[0]), written, processed)
+        if not chunk:
+            return processed
 
 
 def load_config(config_file):
@@ -199,10 +748,48 @@ def load_config(config_file):
         sys.exit(1)
 
 
+def build_plugboard(plugboard_settings, alphabet=ALPHABET):
+    """
+    Преобразует пары букв в словарь коммутационной панели.
+
+    Параметры:
+        plugboard_settings (list): Пары букв (например, ['АБ', 'ВГ']).
+
+        alphabet (str): Алфавит машины.
+
+    Возвращает:
+        dict: Соответствие индексов букв.
+
+    Исключения:
+        ValueError: Если пара содержит недопустимые буквы, состоит не из двух букв,
+            соединяет букву саму с собой или использует букву из другой пары (такую
+            панель нельзя обратить, и текст не расшифровывается).
+    """
+    plugboard = {}
+    for pair in plugboard_settings:
+        if len(pair) != 2:
+            raise ValueError(f"Неверная пара в настройках коммутационной панели: {pair}")
+        a, b = pair
+        if a not in alphabet or b not in alphabet:
+            raise ValueError(f"Недопустимые буквы в паре: {pair}")
+        if a == b:
+            raise ValueError(f"Буквы в паре не могут быть одинаковыми: {pair}")
+        a_idx = alphabet.index(a)
+        b_idx = alphabet.index(b)
+        if a_idx in plugboard or b_idx in plugboard:
+            raise ValueError(f"Буква уже используется в другой паре: {pair}")
+        plugboard[a_idx] = b_idx
+        plugboard[b_idx] = a_idx
+    return plugboard
+
+
 def create_enigma(config, rotor_positions, plugboard_settings):
     """
     Создает объект Enigma на основе конфигурации.
 
+    Необязательные ключи конфигурации: "alphabet" (алфавит, по умолчанию русский из
+    33 букв) и "stepping" (правила поворота роторов, см. STEPPING_MODES).
+
     Параметры:
         config (dict): Конфигурация.
 
@@ -217,27 +804,26 @@ def create_enigma(config, rotor_positions, plugboard_settings):
         KeyError: Если в конфигурации отсутствуют необходимые ключи.
         ValueError: Если настройки коммутационной панели или начальные позиции роторов неверны.
     """
+    alphabet = config.get('alphabet', ALPHABET)
     try:
-        rotors = [Rotor(r['wiring'], r['notch']) for r in config['rotors']]
+        rotors = [Rotor(r['wiring'], r['notch'], r.get('inverse'), r.get('tables')) for r in config['rotors']]
         reflector = Reflector(config['reflector']['wiring'])
     except KeyError as e:
         print(f"Ошибка отсутствует ключ {e} в конфигурации.")
         sys.exit(1)
 
     # Преобразуем настройки коммутационной панели
-    plugboard = {}
     try:
-        for pair in plugboard_settings:
-            a, b = pair
-            a_idx = 'АБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ'.index(a)
-            b_idx = 'АБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ'.index(b)
-            plugboard[a_idx] = b_idx
-            plugboard[b_idx] = a_idx
+        plugboard = build_plugboard(plugboard_settings, alphabet)
     except ValueError as e:
         print(f"Ошибка: неверные настройки коммуникационной панели. {e}")
         sys.exit(1)
 
-    enigma = Enigma(rotors, reflector, plugboard)
+    try:
+        enigma = Enigma(rotors, reflector, plugboard, alphabet, config.get('stepping', 'legacy'))
+    except ValueError as e:
+        print(f"Ошибка: {e}")
+        sys.exit(1)
     try:
         enigma.set_rotor_positions(rotor_positions)
     except ValueError as e:
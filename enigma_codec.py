@@ -0,0 +1,292 @@
+import codecs
+import copy
+import threading
+from array import array
+
+from enigma import UTF32
+
+# Зарегистрированные ключи по нормализованным именам кодеков
+_KEYS = {}
+_registered = False
+
+
+def normalize_name(name):
+    """
+    Нормализует имя кодека так же, как codecs.lookup перед вызовом функций поиска.
+
+    Параметры:
+        name (str): Имя кодека.
+
+    Возвращает:
+        str: Имя в нижнем регистре с "_" вместо пробелов и дефисов.
+    """
+    return name.lower().replace(' ', '_').replace('-', '_')
+
+
+class _Session:
+    """
+    Состояние кодирования одного потока: количество букв от начала ключа и копия машины.
+
+    Если для ключа построен периодический поток перестановок (см. keystream.Keystream),
+    буква кодируется одной выборкой из таблицы по номеру нажатия, без поворота роторов
+    и прохода через проводку. Иначе текст кодируется циклом Enigma.encode_text без
+    проверок коммутационной панели и кэша перестановок при каждом вызове: машина
+    сессии закрыта, и ее настройки не меняются.
+    """
+
+    __slots__ = ('enigma', 'letters', 'table', 'length', '_letters')
+
+    def __init__(self, key):
+        self.enigma = copy.deepcopy(key.prototype)
+        self.letters = 0
+        self.table = key.table
+        self.length = key.length
+        self._letters = dict.fromkeys(map(ord, key.prototype.alphabet))
+
+    def encode(self, text):
+        upper = text.upper()
+        buffer = array('I', upper.encode(UTF32, 'surrogatepass'))
+        if self.table is None:
+            self.enigma._encode_codes(buffer)
+            self.letters += len(upper) - len(upper.translate(self._letters))
+            return buffer.tobytes().decode(UTF32, 'surrogatepass')
+
+        enigma = self.enigma
+        lookup = enigma._lookup
+        limit = len(lookup)
+        codes = enigma._codes
+        table = self.table
+        size = len(codes)
+        end = self.length * size
+        letters = self.letters
+        offset = letters % self.length * size
+        for i, code in enumerate(buffer):
+            if code >= limit:
+                continue
+            char_idx = lookup[code]
+            if char_idx < 0:
+                continue
+            buffer[i] = codes[table[offset + char_idx]]
+            letters += 1
+            offset += size
+            if offset == end:
+                offset = 0
+        self.letters = letters
+        return buffer.tobytes().decode(UTF32, 'surrogatepass')
+
+    def seek(self, letters):
+        if self.table is None:
+            self.enigma.seek(letters)
+        self.letters = letters
+
+
+class _Key:
+    """
+    Ключ, зарегистрированный как кодек: образец машины, поток перестановок и общая
+    сессия для функций encode/decode без состояния.
+    """
+
+    def __init__(self, enigma, keystream=True):
+        prototype = copy.deepcopy(enigma)
+        # Текущие позиции роторов становятся началом сообщения (см. Enigma.seek)
+        prototype.set_rotor_positions(''.join(prototype.alphabet[rotor.position] for rotor in prototype.rotors))
+        self.prototype = prototype
+        self.table = None
+        self.length = 0
+        if keystream:
+            self._build_keystream()
+        self.lock = threading.Lock()
+        self._session = _Session(self)
+
+    def _build_keystream(self):
+        try:
+            from keystream import Keystream
+        except ImportError:
+            # Без NumPy буквы кодируются машиной
+            return
+        keystream = Keystream.build(self.prototype)
+        if keystream.periodic:
+            self.table = keystream.permutations.tobytes()
+            self.length = keystream.length
+
+    def session(self):
+        return _Session(self)
+
+    def encode(self, input, errors='strict'):
+        with self.lock:
+            self._session.seek(0)
+            return self._session.encode(input).encode('utf-8', errors), len(input)
+
+    def decode(self, input, errors='strict'):
+        text = codecs.utf_8_decode(input, errors, True)[0]
+        with self.lock:
+            self._session.seek(0)
+            return self._session.encode(text), len(input)
+
+
+class IncrementalEncoder(codecs.IncrementalEncoder):
+    """
+    Инкрементальный шифратор: состояние роторов переносится между вызовами encode.
+
+    Состояние (getstate/setstate) - количество букв алфавита от начала ключа.
+    """
+
+    key = None
+
+    def __init__(self, errors='strict'):
+        super().__init__(errors)
+        self._session = self.key.session()
+
+    def encode(self, input, final=False):
+        return self._session.encode(input).encode('utf-8', self.errors)
+
+    def reset(self):
+        self._session.seek(0)
+
+    def getstate(self):
+        return self._session.letters
+
+    def setstate(self, state):
+        self._session.seek(state)
+
+
+class IncrementalDecoder(codecs.BufferedIncrementalDecoder):
+    """
+    Инкрементальный дешифратор: незавершенные последовательности UTF-8 и состояние
+    роторов переносятся между вызовами decode.
+
+    Состояние (getstate/setstate) - пара из неразобранных байтов и количества букв
+    алфавита от начала ключа.
+    """
+
+    key = None
+
+    def __init__(self, errors='strict'):
+        super().__init__(errors)
+        self._session = self.key.session()
+
+    def _buffer_decode(self, input, errors, final):
+        text, consumed = codecs.utf_8_decode(input, errors, final)
+        return self._session.encode(text), consumed
+
+    def reset(self):
+        super().reset()
+        self._session.seek(0)
+
+    def getstate(self):
+        return self.buffer, self._session.letters
+
+    def setstate(self, state):
+        self.buffer, letters = state
+        self._session.seek(letters)
+
+
+class StreamWriter(codecs.StreamWriter):
+    """
+    Потоковый шифратор с состоянием роторов между вызовами write.
+    """
+
+    key = None
+
+    def __init__(self, stream, errors='strict'):
+        super().__init__(stream, errors)
+        self._session = self.key.session()
+
+    def encode(self, input, errors='strict'):
+        return self._session.encode(input).encode('utf-8', errors), len(input)
+
+    def reset(self):
+        super().reset()
+        self._session.seek(0)
+
+
+class StreamReader(codecs.StreamReader):
+    """
+    Потоковый дешифратор с состоянием роторов между вызовами read.
+    """
+
+    key = None
+
+    def __init__(self, stream, errors='strict'):
+        super().__init__(stream, errors)
+        self._session = self.key.session()
+
+    def decode(self, input, errors='strict'):
+        text, consumed = codecs.utf_8_decode(input, errors, False)
+        return self._session.encode(text), consumed
+
+    def reset(self):
+        super().reset()
+        self._session.seek(0)
+
+
+def _codec_info(name, key):
+    """
+    Создает описание кодека с классами, привязанными к ключу.
+    """
+    namespace = {'key': key}
+    return codecs.CodecInfo(
+        name=name,
+        encode=key.encode,
+        decode=key.decode,
+        incrementalencoder=type('IncrementalEncoder', (IncrementalEncoder,), namespace),
+        incrementaldecoder=type('IncrementalDecoder', (IncrementalDecoder,), namespace),
+        streamwriter=type('StreamWriter', (StreamWriter,), namespace),
+        streamreader=type('StreamReader', (StreamReader,), namespace),
+    )
+
+
+def _search(name):
+    key = _KEYS.get(name)
+    return None if key is None else _codec_info(name, key)
+
+
+def _refresh():
+    """
+    Регистрирует функцию поиска и сбрасывает кэш codecs.lookup (Python 3.10+), чтобы
+    изменения регистрации вступили в силу.
+    """
+    global _registered
+    if _registered and hasattr(codecs, 'unregister'):
+        codecs.unregister(_search)
+        _registered = False
+    if not _registered:
+        codecs.register(_search)
+        _registered = True
+
+
+def register(name, enigma, keystream=True):
+    """
+    Регистрирует ключ машины Enigma как кодек.
+
+    Текст шифруется в байты UTF-8 (encode) и расшифровывается из них (decode);
+    каждое сообщение начинается с позиций роторов, которые машина имела при
+    регистрации. Кодек можно использовать в open(..., encoding=name),
+    io.TextIOWrapper, codecs.iterencode и т. п. Шифратор и дешифратор с состоянием
+    работают с собственной копией машины, поэтому машину после регистрации можно
+    менять.
+
+    Если установлен NumPy и правила поворота периодические, при регистрации один раз
+    строится поток перестановок ключа (см. keystream.Keystream), и короткие сообщения
+    кодируются выборкой из него.
+
+    Параметры:
+        name (str): Имя кодека.
+
+        enigma (Enigma): Машина Enigma в начальном положении ключа.
+
+        keystream (bool): Строить поток перестановок.
+    """
+    _KEYS[normalize_name(name)] = _Key(enigma, keystream)
+    _refresh()
+
+
+def unregister(name):
+    """
+    Удаляет кодек, зарегистрированный register.
+
+    Параметры:
+        name (str): Имя кодека.
+    """
+    if _KEYS.pop(normalize_name(name), None) is not None:
+        _refresh()
@@ -0,0 +1,148 @@
+import time
+from contextlib import contextmanager
+
+# Зарегистрированные обработчики по событиям:
+#   phase  - завершена фаза работы: name (str), seconds (float);
+#   encode - выполнен вызов Enigma.encode_text: enigma, start (позиции роторов до вызова),
+#            characters (длина текста), letters (количество букв алфавита), seconds (float).
+# Пока обработчиков нет, кодирование не выполняет никакой дополнительной работы.
+HOOKS = {}
+
+
+def register_hook(event, callback):
+    """
+    Регистрирует обработчик события.
+
+    Параметры:
+        event (str): Имя события ("phase" или "encode").
+
+        callback (callable): Функция, принимающая поля события как именованные аргументы.
+    """
+    HOOKS.setdefault(event, []).append(callback)
+
+
+def unregister_hook(event, callback):
+    """
+    Удаляет обработчик события.
+
+    Параметры:
+        event (str): Имя события.
+
+        callback (callable): Ранее зарегистрированный обработчик.
+    """
+    callbacks = HOOKS.get(event, [])
+    if callback in callbacks:
+        callbacks.remove(callback)
+    if not callbacks:
+        HOOKS.pop(event, None)
+
+
+def emit(event, **fields):
+    """
+    Вызывает обработчики события.
+
+    Параметры:
+        event (str): Имя события.
+
+        fields: Поля события.
+    """
+    for callback in HOOKS.get(event, ()):
+        callback(**fields)
+
+
+@contextmanager
+def phase(name):
+    """
+    Измеряет длительность блока и сообщает ее событием "phase".
+
+    Параметры:
+        name (str): Имя фазы.
+    """
+    if 'phase' not in HOOKS:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        emit('phase', name=name, seconds=time.perf_counter() - started)
+
+
+class Metrics:
+    """
+    Сборщик метрик работы: длительности фаз, количество символов, поворотов роторов
+    и переносов, пропускная способность.
+
+    Повороты роторов и переносы на соседние роторы вычисляются аналитически по
+    начальным позициям и количеству букв каждого вызова encode_text (см.
+    enigma.rotor_rotations), поэтому кодирование отдельных символов не замедляется.
+
+    Атрибуты:
+        phases (dict): Суммарная длительность фаз в секундах.
+
+        counters (dict): Счетчики: encode_calls, characters, letters, rotor_steps (все
+            повороты роторов), notch_carries (повороты, вызванные зазорами), encode_seconds.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.counters = dict.fromkeys(
+            ('encode_calls', 'characters', 'letters', 'rotor_steps', 'notch_carries', 'encode_seconds'), 0)
+
+    def __enter__(self):
+        self.attach()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.detach()
+
+    def attach(self):
+        """
+        Подписывает сборщик на события.
+        """
+        register_hook('phase', self.on_phase)
+        register_hook('encode', self.on_encode)
+
+    def detach(self):
+        """
+        Отписывает сборщик от событий.
+        """
+        unregister_hook('phase', self.on_phase)
+        unregister_hook('encode', self.on_encode)
+
+    def on_phase(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def on_encode(self, enigma, start, characters, letters, seconds):
+        from enigma import rotor_rotations
+
+        size = len(enigma.alphabet)
+        notches = tuple(rotor.notch for rotor in enigma.rotors)
+        rotations = rotor_rotations(start, notches, letters, size, enigma.stepping)
+        counters = self.counters
+        counters['encode_calls'] += 1
+        counters['characters'] += characters
+        counters['letters'] += letters
+        counters['rotor_steps'] += sum(rotations)
+        # Переносы - повороты, вызванные зазорами, а не самим нажатием; по правилам
+        # legacy нажатие поворачивает два последних ротора, по остальным - один
+        driven = 2 if enigma.stepping == 'legacy' and len(rotations) > 1 else 1
+        counters['notch_carries'] += sum(rotations) - driven * letters
+        counters['encode_seconds'] += seconds
+
+    def to_dict(self):
+        """
+        Возвращает метрики в виде словаря для JSON.
+
+        Возвращает:
+            dict: Фазы, счетчики и пропускная способность кодирования.
+        """
+        seconds = self.counters['encode_seconds']
+        return {
+            'phases': dict(self.phases),
+            'counters': dict(self.counters),
+            'throughput': {
+                'characters_per_second': self.counters['characters'] / seconds if seconds else 0.0,
+                'letters_per_second': self.counters['letters'] / seconds if seconds else 0.0,
+            },
+        }
@@ -0,0 +1,311 @@
+import argparse
+import json
+import sys
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from enigma import ALPHABET, build_plugboard, create_enigma, load_config
+
+_worker_runner = None
+
+
+class JobRunner:
+    """
+    Выполняет задания шифрования на заранее собранной машине Enigma.
+
+    Роторы и отражатель создаются один раз по конфигурации, для каждого задания
+    меняются только позиции роторов, кольца и коммутационная панель.
+
+    Формат задания (одна строка JSON):
+        {"id": ..., "positions": "АБВ", "plugboard": "АБ ВГ", "rings": [0, 0, 0], "text": "..."}
+
+    Вместо "id" и "text" принимаются поля "request_id" и "body", поэтому файлы
+    вида requests.jsonl обрабатываются без преобразования. Отсутствующие в задании
+    positions, plugboard и rings берутся из значений по умолчанию.
+
+    С каталогом keystream_dir задания кодируются выборкой из потоков перестановок
+    ключей (см. keystream.Keystream), что выгодно, когда одним ключом шифруется много
+    сообщений. Потоки последних ключей хранятся в памяти, файлы в каталоге разделяются
+    между процессами и запусками.
+
+    Атрибуты:
+        enigma (Enigma): Машина Enigma, переиспользуемая между заданиями.
+
+        defaults (dict): Значения полей задания по умолчанию.
+    """
+
+    # Количество потоков перестановок, хранимых в памяти
+    KEYSTREAMS = 16
+    # Наибольшая длина сообщения, шифруемого вместе с другими (см. run_lines)
+    SHORT = 1024
+
+    def __init__(self, config, defaults=None, batch=False, keystream_dir=None):
+        alphabet = config.get('alphabet', ALPHABET)
+        self.enigma = create_enigma(config, alphabet[0] * len(config['rotors']), [])
+        self.defaults = defaults or {}
+        self.batch = batch
+        self.keystream_dir = keystream_dir
+        self._keystreams = OrderedDict()
+
+    def run(self, job):
+        """
+        Выполняет одно задание.
+
+        Параметры:
+            job (dict): Задание.
+
+        Возвращает:
+            str: Зашифрованный текст.
+
+        Исключения:
+            ValueError: Если позиции роторов, кольца или коммутационная панель неверны.
+            KeyError: Если в задании нет текста или позиций роторов.
+        """
+        return self._encode(*self._key(job))
+
+    def _key(self, job):
+        """
+        Разбирает ключ и текст задания (исключения см. run).
+
+        Возвращает:
+            tuple: Индексы позиций роторов, кольца, коммутационная панель и текст.
+        """
+        enigma = self.enigma
+        positions = job.get('positions', self.defaults.get('positions'))
+        if positions is None:
+            raise KeyError('positions')
+        positions = positions.upper()
+        if len(positions) != len(enigma.rotors):
+            raise ValueError(f"Необходимо указать {len(enigma.rotors)} начальные позиции роторов.")
+
+        plugboard = job.get('plugboard', self.defaults.get('plugboard', ''))
+        if isinstance(plugboard, str):
+            plugboard = plugboard.split()
+        text = job['text'] if 'text' in job else job['body']
+
+        plugboard = build_plugboard([pair.upper() for pair in plugboard], enigma.alphabet)
+        rings = tuple(job.get('rings', self.defaults.get('rings', [0] * len(enigma.rotors))))
+        if len(rings) != len(enigma.rotors) or not all(
+                isinstance(ring, int) and 0 <= ring < len(enigma.alphabet) for ring in rings):
+            raise ValueError(f"Необходимо указать {len(enigma.rotors)} настройки колец роторов "
+                             f"от 0 до {len(enigma.alphabet) - 1}.")
+        return tuple(map(enigma.alphabet.index, positions)), rings, plugboard, text
+
+    def _encode(self, positions, rings, plugboard, text):
+        """
+        Шифрует текст на машине, настроенной на ключ задания.
+        """
+        enigma = self.enigma
+        enigma.plugboard = plugboard
+        enigma.set_ring_settings(rings)
+        enigma.set_rotor_positions(''.join(enigma.alphabet[position] for position in positions))
+        if self.keystream_dir is not None:
+            keystream = self._keystream()
+            if keystream.covers(len(text)):
+                return keystream.encode_text(text)
+        return enigma.encode_text(text, batch=self.batch)
+
+    def _keystream(self):
+        """
+        Возвращает поток перестановок для текущего ключа машины.
+        """
+        from keystream import DEFAULT_LENGTH, key_digest, keystream_cached
+        enigma = self.enigma
+        length = min(len(enigma.alphabet) ** len(enigma.rotors), DEFAULT_LENGTH)
+        digest = key_digest(enigma, length)
+        keystream = self._keystreams.get(digest)
+        if keystream is None:
+            keystream = keystream_cached(enigma, self.keystream_dir, length)
+            self._keystreams[digest] = keystream
+            if len(self._keystreams) > self.KEYSTREAMS:
+                self._keystreams.popitem(last=False)
+        else:
+            self._keystreams.move_to_end(digest)
+        return keystream
+
+    def run_line(self, line):
+        """
+        Выполняет задание, записанное строкой JSON, и возвращает строку JSON с результатом.
+
+        Ошибки задания не прерывают обработку и возвращаются в поле "error".
+
+        Параметры:
+            line (str): Строка с заданием.
+
+        Возвращает:
+            str: Строка JSON с полями "id" и "result" или "error".
+        """
+        return json.dumps(self._respond(line, self.run), ensure_ascii=False)
+
+    def _respond(self, line, action):
+        """
+        Разбирает строку задания и применяет к нему action; ошибки задания
+        записываются в поле "error".
+
+        Возвращает:
+            dict: Ответ с полями "id" и "result" или "error".
+        """
+        job_id = None
+        try:
+            job = json.loads(line)
+            job_id = job.get('id', job.get('request_id'))
+            return {'id': job_id, 'result': action(job)}
+        except KeyError as e:
+            return {'id': job_id, 'error': f"Отсутствует поле {e} в задании."}
+        except (ValueError, TypeError, AttributeError) as e:
+            return {'id': job_id, 'error': str(e)}
+
+    def run_lines(self, lines):
+        """
+        Выполняет пакет заданий.
+
+        С векторизованным движком (batch) и без потоков перестановок короткие
+        сообщения пакета шифруются вместе, каждое своим ключом, одним проходом
+        vectorized.encode_messages; длинные сообщения шифруются по одному.
+
+        Параметры:
+            lines (list): Строки с заданиями.
+
+        Возвращает:
+            list: Строки с результатами.
+        """
+        if not self.batch or self.keystream_dir is not None:
+            return [self.run_line(line) for line in lines]
+
+        enigma = self.enigma
+        responses = [self._respond(line, self._key) for line in lines]
+        short = []
+        for response in responses:
+            if 'result' not in response:
+                continue
+            positions, rings, plugboard, text = response['result']
+            if isinstance(text, str) and len(text) <= self.SHORT:
+                short.append(response)
+            else:
+                try:
+                    response['result'] = self._encode(positions, rings, plugboard, text)
+                except (ValueError, TypeError, AttributeError) as e:
+                    del response['result']
+                    response['error'] = str(e)
+        if short:
+            from vectorized import encode_messages, plugboard_rows
+            positions, rings, plugboards, texts = zip(*(response['result'] for response in short))
+            plugboards = plugboard_rows(plugboards, len(enigma.alphabet))
+            for response, text in zip(short, encode_messages(enigma, texts, positions, plugboards, rings)):
+                response['result'] = text
+        return [json.dumps(response, ensure_ascii=False) for response in responses]
+
+
+def _init_worker(config, defaults, batch, keystream_dir):
+    """
+    Создает JobRunner в рабочем процессе.
+    """
+    global _worker_runner
+    _worker_runner = JobRunner(config, defaults, batch, keystream_dir)
+
+
+def _run_lines(lines):
+    """
+    Выполняет пакет заданий в рабочем процессе.
+    """
+    return _worker_runner.run_lines(lines)
+
+
+def _batches(source, batch_size):
+    """
+    Группирует непустые строки входного потока в пакеты.
+    """
+    batch = []
+    for line in source:
+        if line.strip():
+            batch.append(line)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def run_jobs(config, source, target, workers=1, defaults=None, batch=False, batch_size=256, keystream_dir=None):
+    """
+    Читает задания JSON Lines из source и пишет результаты в target в том же порядке.
+
+    При workers > 1 пакеты заданий распределяются по пулу процессов, при этом в
+    обработке одновременно находится не более 2 * workers пакетов.
+
+    Параметры:
+        config (dict): Конфигурация машины.
+
+        source: Текстовый поток с заданиями.
+
+        target: Текстовый поток для результатов.
+
+        workers (int): Количество процессов.
+
+        defaults (dict): Значения полей задания по умолчанию.
+
+        batch (bool): Использовать векторизованный движок NumPy.
+
+        batch_size (int): Количество заданий в пакете, передаваемом процессу.
+
+        keystream_dir (str): Каталог кэша потоков перестановок; None - не использовать.
+
+    Возвращает:
+        int: Количество выполненных заданий.
+    """
+    count = 0
+    if workers <= 1:
+        runner = JobRunner(config, defaults, batch, keystream_dir)
+        for lines in _batches(source, batch_size):
+            for result in runner.run_lines(lines):
+                target.write(result + '\n')
+            count += len(lines)
+        return count
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(config, defaults, batch, keystream_dir)) as executor:
+        pending = deque()
+        for lines in _batches(source, batch_size):
+            pending.append(executor.submit(_run_lines, lines))
+            if len(pending) >= 2 * workers:
+                results = pending.popleft().result()
+                target.write(''.join(result + '\n' for result in results))
+                count += len(results)
+        while pending:
+            results = pending.popleft().result()
+            target.write(''.join(result + '\n' for result in results))
+            count += len(results)
+    return count
+
+
+def main(argv=None):
+    """
+    Точка входа подкоманды jobs: пакетное шифрование заданий JSON Lines.
+
+    Параметры:
+        argv (list): Аргументы командной строки без имени подкоманды.
+    """
+    parser = argparse.ArgumentParser(prog='main.py jobs', description='Encode JSON Lines jobs in one process')
+    parser.add_argument('--config', help='Path to configuration file', default='config.json')
+    parser.add_argument('--input', help='JSON Lines file with jobs ("-" for stdin)', default='-')
+    parser.add_argument('--output', help='JSON Lines file for results ("-" for stdout)', default='-')
+    parser.add_argument('--workers', help='Number of worker processes', type=int, default=1)
+    parser.add_argument('--positions', help='Default rotor positions for jobs without "positions"')
+    parser.add_argument('--plugboard', help='Default plugboard for jobs without "plugboard"', default='')
+    parser.add_argument('--batch', help='Use the vectorized NumPy engine', action='store_true')
+    parser.add_argument('--keystream', help='Cache per-key permutation streams in this directory', metavar='DIR')
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    defaults = {'plugboard': args.plugboard}
+    if args.positions:
+        defaults['positions'] = args.positions
+
+    source = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8')
+    target = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        run_jobs(config, source, target, args.workers, defaults, args.batch, keystream_dir=args.keystream)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
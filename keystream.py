@@ -0,0 +1,227 @@
+import hashlib
+import os
+
+import numpy as np
+
+from compiled_config import write_cache
+from enigma import UTF32
+from vectorized import encode_indices, letter_lookup, rotor_positions
+
+# Длина потока по умолчанию: период трех роторов русского алфавита (33³ нажатий)
+DEFAULT_LENGTH = 33 ** 3
+# Количество нажатий, перестановки которых вычисляются за одну операцию NumPy
+BLOCK = 4096
+SUFFIX = '.npy'
+
+
+def key_digest(enigma, length):
+    """
+    Вычисляет отпечаток ключа: конфигурации, колец, начальных позиций и коммутационной панели.
+
+    Параметры:
+        enigma (Enigma): Машина Enigma в начальном положении ключа.
+
+        length (int): Длина потока перестановок.
+
+    Возвращает:
+        str: SHA-256 ключа в шестнадцатеричном виде.
+    """
+    key = (enigma.alphabet, enigma.stepping, length,
+           tuple((bytes(rotor.wiring), rotor.notch, rotor.ring_setting, rotor.position) for rotor in enigma.rotors),
+           bytes(enigma.reflector.wiring),
+           tuple(sorted(enigma.plugboard.items())))
+    return hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+
+
+class Keystream:
+    """
+    Поток составных перестановок машины Enigma для одного ключа.
+
+    При фиксированных конфигурации, кольцах, коммутационной панели и начальных
+    позициях роторов перестановка, которой кодируется k-я буква сообщения, не зависит
+    от текста. Поток хранит эти перестановки подряд (по длине алфавита байт на
+    нажатие), и кодирование сообщения сводится к одной выборке NumPy по номеру
+    нажатия и индексу буквы. Если через length нажатий роторы возвращаются в начальное
+    положение (правила legacy и odometer при length = size ** количество роторов),
+    поток считается периодическим и применим к сообщениям любой длины.
+
+    Поток можно сохранить в файл .npy и открыть через mmap: рабочие процессы,
+    получившие такой поток, открывают тот же файл и разделяют страницы в памяти.
+
+    Атрибуты:
+        alphabet (str): Алфавит машины.
+
+        permutations (numpy.ndarray): Перестановки формы (length, size), строка k -
+            перестановка для (k + 1)-го нажатия.
+
+        periodic (bool): Поток повторяется с периодом length.
+
+        path (str): Файл, отображенный в память, или None.
+    """
+
+    def __init__(self, alphabet, permutations, periodic, path=None):
+        self.alphabet = alphabet
+        self.permutations = permutations
+        self.periodic = periodic
+        self.path = path
+        self._lookup = letter_lookup(alphabet)
+        self._codes = np.frombuffer(alphabet.encode(UTF32), dtype=np.uint32)
+
+    @property
+    def length(self):
+        return len(self.permutations)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if self.path is not None:
+            # Процесс-получатель заново отображает файл вместо копирования перестановок
+            state['permutations'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.permutations is None:
+            self.permutations = np.load(self.path, mmap_mode='r')
+
+    @classmethod
+    def build(cls, enigma, length=None):
+        """
+        Вычисляет поток перестановок от текущего положения роторов.
+
+        Роторы машины не поворачиваются.
+
+        Параметры:
+            enigma (Enigma): Машина Enigma в начальном положении ключа.
+
+            length (int): Количество нажатий; по умолчанию size ** количество роторов,
+                но не больше DEFAULT_LENGTH.
+
+        Возвращает:
+            Keystream: Поток перестановок.
+        """
+        size = len(enigma.alphabet)
+        if length is None:
+            length = min(size ** len(enigma.rotors), DEFAULT_LENGTH)
+        start = tuple(rotor.position for rotor in enigma.rotors)
+        positions = rotor_positions(enigma, np.arange(1, length + 1))
+        letters = np.arange(size)[None, :]
+        permutations = np.empty((length, size), dtype=np.uint8)
+        for begin in range(0, length, BLOCK):
+            block = tuple(pos[begin:begin + BLOCK, None] for pos in positions)
+            permutations[begin:begin + BLOCK] = encode_indices(enigma, letters, block)
+        return cls(enigma.alphabet, permutations, enigma.stepped_positions(length) == start)
+
+    @classmethod
+    def load(cls, enigma, path):
+        """
+        Открывает сохраненный поток через mmap.
+
+        Параметры:
+            enigma (Enigma): Машина Enigma, для ключа которой был построен поток.
+
+            path (str): Путь к файлу .npy.
+
+        Возвращает:
+            Keystream: Поток перестановок.
+
+        Исключения:
+            ValueError: Если файл не соответствует алфавиту машины.
+        """
+        permutations = np.load(path, mmap_mode='r')
+        size = len(enigma.alphabet)
+        if permutations.dtype != np.uint8 or permutations.ndim != 2 or permutations.shape[1] != size:
+            raise ValueError(f"Файл {path} не является потоком перестановок для алфавита из {size} букв.")
+        start = tuple(rotor.position for rotor in enigma.rotors)
+        return cls(enigma.alphabet, permutations, enigma.stepped_positions(len(permutations)) == start, path)
+
+    def write(self, f):
+        """
+        Записывает поток в открытый двоичный файл в формате .npy.
+
+        Параметры:
+            f: Файл, открытый для записи.
+        """
+        np.save(f, np.ascontiguousarray(self.permutations))
+
+    def covers(self, letters, offset=0):
+        """
+        Проверяет, достаточно ли потока для сообщения.
+
+        Параметры:
+            letters (int): Количество букв сообщения.
+
+            offset (int): Номер первой буквы от начала ключа.
+
+        Возвращает:
+            bool: True, если поток периодический или содержит все нужные нажатия.
+        """
+        return self.periodic or offset + letters <= self.length
+
+    def encode_text(self, text, offset=0):
+        """
+        Кодирует текст выборкой из потока перестановок.
+
+        Результат совпадает с Enigma.encode_text машины, установленной в начальное
+        положение ключа и продвинутой на offset букв. Символы вне алфавита остаются без
+        изменений и не расходуют поток.
+
+        Параметры:
+            text (str): Текст для кодирования.
+
+            offset (int): Количество букв, уже закодированных этим ключом.
+
+        Возвращает:
+            str: Закодированный текст.
+
+        Исключения:
+            ValueError: Если поток непериодический и короче сообщения.
+        """
+        text = text.upper()
+        codes = np.frombuffer(text.encode(UTF32, 'surrogatepass'), dtype=np.uint32)
+        indices = np.full(codes.shape, -1, dtype=np.int16)
+        in_range = codes < len(self._lookup)
+        indices[in_range] = self._lookup[codes[in_range]]
+        mask = indices >= 0
+        letters = indices[mask].astype(np.intp)
+        if not len(letters):
+            return text
+        if not self.covers(len(letters), offset):
+            raise ValueError(f"Поток перестановок длиной {self.length} короче сообщения.")
+
+        steps = np.arange(offset, offset + len(letters)) % self.length
+        result = codes.copy()
+        result[mask] = self._codes[self.permutations[steps, letters]]
+        return result.tobytes().decode(UTF32, 'surrogatepass')
+
+
+def keystream_cached(enigma, directory, length=None):
+    """
+    Возвращает поток перестановок ключа, используя файлы в каталоге как кэш.
+
+    Файл называется по отпечатку ключа (см. key_digest), поэтому разные ключи и
+    конфигурации не пересекаются. Существующий файл открывается через mmap, иначе
+    поток вычисляется и сохраняется. Ошибки записи не прерывают работу.
+
+    Параметры:
+        enigma (Enigma): Машина Enigma в начальном положении ключа.
+
+        directory (str): Каталог кэша.
+
+        length (int): Количество нажатий (см. Keystream.build).
+
+    Возвращает:
+        Keystream: Поток перестановок.
+    """
+    size = len(enigma.alphabet)
+    if length is None:
+        length = min(size ** len(enigma.rotors), DEFAULT_LENGTH)
+    path = os.path.join(directory, key_digest(enigma, length) + SUFFIX)
+    try:
+        return Keystream.load(enigma, path)
+    except (OSError, ValueError):
+        pass
+
+    keystream = Keystream.build(enigma, length)
+    if not write_cache(path, keystream.write):
+        return keystream
+    return Keystream.load(enigma, path)
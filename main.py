@@ -1,20 +1,26 @@
 import argparse
+import json
+import os
+import string
 import sys
-from enigma import load_config, create_enigma
+from enigma import ALPHABET, load_config, create_enigma, encode_stream
 
-def validate_rotor_positions(positions, alphabet):
+def validate_rotor_positions(positions, alphabet, count=3):
     """ Проверяет корректность начальных позиций роторов.
 
         Параметры:
-            positions (list): Список начальных позиций роторов (должен содержать три элемента).
+            positions (list): Список начальных позиций роторов (должен содержать count элементов).
 
             alphabet (str): Строка, представляющая допустимый алфавит.
 
+            count (int): Количество роторов.
+
         Исключения:
-            ValueError: Если количество позиций не равно 3 или если какая-либо из позиций недопустима.
+            ValueError: Если количество позиций не равно count или если какая-либо из позиций недопустима.
         """
-    if len(positions) != 3:
-        raise ValueError("Необходимо указать три начальные позиции роторов.")
+    if len(positions) != count:
+        raise ValueError("Необходимо указать три начальные позиции роторов." if count == 3
+                         else f"Необходимо указать {count} начальные позиции роторов.")
     for pos in positions:
         if pos not in alphabet:
             raise ValueError(f"Недопустимая позиция ротора: {pos}")
@@ -43,59 +49,254 @@ def validate_plugboard_settings(plugboard_settings, alphabet):
             raise ValueError(f"Буква уже используется в другой паре: {pair}")
         used_letters.update(pair)
 
-def validate_text(text, alphabet):
+def validate_text(text, alphabet, unknown='reject'):
     """ Проверяет корректность текста на наличие недопустимых символов.
 
+        Проверка выполняется одним проходом регулярного выражения (см. validation.Normalizer).
+
         Параметры:
             text (str): Строка с текстом, который необходимо проверить.
 
             alphabet (str): Строка, представляющая допустимый алфавит.
 
+            unknown (str): Политика для недопустимых символов: reject, strip или pass.
+
+        Возвращает:
+            str: Текст, из которого при политике strip удалены недопустимые символы.
+
         Исключения:
-            ValueError: Если в тексте присутствуют символы, не входящие в допустимый алфавит, кроме пробелов.
+            ValueError: Если при политике reject в тексте присутствуют символы, не входящие
+                в допустимый алфавит, кроме пробелов.
+        """
+    from validation import Normalizer
+    normalized, first = Normalizer(alphabet, unknown, upper=False).normalize(text)
+    if first is not None and unknown == 'reject':
+        raise ValueError(f"Недопустимый символ в тексте: {text[first]}")
+    return normalized
+
+def open_binary(path, mode):
+    """ Открывает файл в двоичном режиме, "-" означает стандартный ввод или вывод.
+
+        Параметры:
+            path (str): Путь к файлу или "-".
+
+            mode (str): Режим открытия ('rb' или 'wb').
+
+        Возвращает:
+            file: Двоичный поток.
+        """
+    if path == '-':
+        stream = sys.stdin.buffer if 'r' in mode else sys.stdout.buffer
+        return open(stream.fileno(), mode, closefd=False)
+    return open(path, mode)
+
+def run_subcommand(name, argv):
+    """ Запускает подкоманду из отдельного модуля.
+
+        Параметры:
+            name (str): Имя подкоманды.
+
+            argv (list): Аргументы командной строки подкоманды.
         """
-    for char in text:
-        if char not in alphabet and char != ' ':
-            raise ValueError(f"Недопустимый символ в тексте: {char}")
+    if name == 'jobs':
+        from jobs import main as subcommand
+    elif name == 'serve':
+        from server import main as subcommand
+    elif name == 'crack':
+        from cracker import main as subcommand
+    elif name == 'container':
+        from container import main as subcommand
+    elif name == 'tree':
+        from tree import main as subcommand
+    elif name == 'audit':
+        from audit import main as subcommand
+    subcommand(argv)
+
+SUBCOMMANDS = ('jobs', 'serve', 'crack', 'container', 'tree', 'audit')
 
 def main():
     """
     Основная функция для запуска программы.
     """
+    if len(sys.argv) > 1 and sys.argv[1] in SUBCOMMANDS:
+        run_subcommand(sys.argv[1], sys.argv[2:])
+        return
+
+    from validation import POLICIES
     parser = argparse.ArgumentParser(description='Russian Enigma Machine')
     parser.add_argument('--config', help='Path to configuration file', default='config.json')
-    parser.add_argument('--positions', help='Rotor positions (3 letters)')
+    parser.add_argument('--positions', help='Rotor positions (one letter per rotor)')
     parser.add_argument('--plugboard', help='Plugboard settings (pairs of letters)')
     parser.add_argument('--text', help='Text to encode/decode')
+    parser.add_argument('--input', help='File to encode/decode in chunks ("-" for stdin)')
+    parser.add_argument('--output', help='Output file for --input ("-" for stdout)', default='-')
+    parser.add_argument('--chunk-size', help='Read size in bytes for --input', type=int, default=65536)
+    parser.add_argument('--batch', help='Use the vectorized NumPy engine', action='store_true')
+    parser.add_argument('--workers', help='Encode in parallel on N processes', type=int)
+    parser.add_argument('--no-config-cache', help='Always parse the JSON config, do not use the compiled cache', action='store_true')
+    parser.add_argument('--unknown', help='Characters outside the alphabet: reject (default for --text), '
+                                          'strip, or pass (default for --input)', choices=POLICIES)
+    parser.add_argument('--mmap', help='Encode the --input file through mmap into the --output file', action='store_true')
+    parser.add_argument('--in-place', help='With --mmap, overwrite the --input file instead of writing --output',
+                        action='store_true')
+    parser.add_argument('--checkpoint', help='Periodically save stream progress to this file (--input mode)', metavar='FILE')
+    parser.add_argument('--checkpoint-interval', help='Seconds between checkpoints', type=float, default=5.0)
+    parser.add_argument('--resume', help='Continue an interrupted --input run from --checkpoint', action='store_true')
+    parser.add_argument('--profile', help='Write cProfile statistics (pstats format) to this file', metavar='FILE')
+    parser.add_argument('--metrics', help='Write phase timings and counters as JSON ("-" for stderr)', metavar='FILE')
 
     args = parser.parse_args()
 
+    metrics = None
+    if args.metrics:
+        from instrumentation import Metrics
+        metrics = Metrics()
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+    if metrics is not None:
+        metrics.attach()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        run(args)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+        if metrics is not None:
+            metrics.detach()
+            report = json.dumps(metrics.to_dict(), ensure_ascii=False, indent=2)
+            if args.metrics == '-':
+                print(report, file=sys.stderr)
+            else:
+                with open(args.metrics, 'w', encoding='utf-8') as f:
+                    f.write(report + '\n')
+
+
+def run(args):
+    """
+    Шифрует текст или поток по аргументам командной строки либо в текстовом интерфейсе.
+
+    Фазы работы (load_config, validate, create_enigma, encode) сообщаются событиями
+    instrumentation.phase.
+
+    Параметры:
+        args (argparse.Namespace): Разобранные аргументы командной строки.
+    """
+    from instrumentation import phase
     if len(sys.argv) == 1:
         # Текстовый интерфейс
         config_file = input("Введите путь к файлу конфигурации: ")
-        positions = input("Введите начальные позиции роторов (3 буквы): ").upper()
+        positions = input("Введите начальные позиции роторов (по букве на ротор): ").upper()
         plugboard = input("Введите настройки коммутационной панели (пары букв через пробел): ").upper().split()
         text = input("Введите текст для шифрования: ").upper()
     else:
         # Командная строка
         config_file = args.config
-        positions = args.positions.upper()
-        plugboard = args.plugboard.upper().split()
-        text = args.text.upper()
+        positions = (args.positions or '').upper()
+        plugboard = (args.plugboard or '').upper().split()
+        text = None if args.input else args.text.upper()
+
+    if args.mmap or args.in_place:
+        output = args.input if args.in_place else args.output
+        if text is not None or '-' in (args.input, output) or not args.mmap \
+                or args.workers or args.checkpoint or args.unknown not in (None, 'pass'):
+            print("Ошибка: --mmap требует файлов --input и --output (или --in-place) "
+                  "и несовместим с --workers, --checkpoint и --unknown reject/strip.")
+            sys.exit(1)
+
+    state = None
+    if args.checkpoint or args.resume:
+        if text is not None or '-' in (args.input, args.output) or not args.checkpoint:
+            print("Ошибка: контрольные точки требуют --checkpoint и файлов --input и --output.")
+            sys.exit(1)
+        from checkpoint import Checkpointer, file_hash, load_checkpoint
+        if args.resume:
+            try:
+                state = load_checkpoint(args.checkpoint, file_hash(config_file))
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Ошибка: не удалось прочитать контрольную точку. {e}")
+                sys.exit(1)
+            # Ключ берется из контрольной точки
+            positions = state['machine']['origin']
+            plugboard = state['machine']['plugboard']
 
-    alphabet = 'АБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ'
+    with phase('load_config'):
+        if len(sys.argv) == 1 or args.no_config_cache:
+            config = load_config(config_file)
+        else:
+            from compiled_config import load_config_cached
+            config = load_config_cached(config_file)
+    alphabet = config.get('alphabet', ALPHABET)
 
     try:
-        validate_rotor_positions(positions, alphabet)
-        validate_plugboard_settings(plugboard, alphabet)
-        validate_text(text, alphabet)
+        with phase('validate'):
+            validate_rotor_positions(positions, alphabet, len(config.get('rotors', ())))
+            validate_plugboard_settings(plugboard, alphabet)
+            if text is not None:
+                text = validate_text(text, alphabet, args.unknown or 'reject')
     except ValueError as e:
         print(f"Ошибка: {e}")
         sys.exit(1)
 
-    config = load_config(config_file)
-    enigma = create_enigma(config, positions, plugboard)
-    result = enigma.encode_text(text)
+    with phase('create_enigma'):
+        enigma = create_enigma(config, positions, plugboard)
+        if state is not None:
+            enigma.restore(state['machine'])
+
+    if text is None and args.mmap:
+        from mapped import encode_file
+        try:
+            with phase('encode'):
+                encode_file(enigma, args.input, None if args.in_place else args.output, args.batch)
+        except ValueError as e:
+            print(f"Ошибка: {e}", file=sys.stderr)
+            sys.exit(1)
+        return
+
+    if text is None:
+        # Потоковый режим: по умолчанию символы вне алфавита передаются без изменений,
+        # при --unknown reject допустимы также пробельные символы
+        normalizer = None
+        if args.unknown not in (None, 'pass'):
+            from validation import Normalizer
+            normalizer = Normalizer(alphabet, args.unknown, allowed=string.whitespace)
+            if state is not None:
+                normalizer.position = state['characters']
+        try:
+            with open_binary(args.input, 'rb') as source, \
+                    open_binary(args.output, 'r+b' if state is not None else 'wb') as target, phase('encode'):
+                checkpointer = None
+                if args.checkpoint:
+                    if state is not None:
+                        # Уже записанный вывод не пересчитывается, хвост после контрольной точки отбрасывается
+                        if os.fstat(target.fileno()).st_size < state['output_offset']:
+                            raise ValueError("файл вывода короче, чем записано в контрольной точке.")
+                        source.seek(state['input_offset'])
+                        target.truncate(state['output_offset'])
+                        target.seek(state['output_offset'])
+                    checkpointer = Checkpointer(args.checkpoint, enigma, file_hash(config_file), target,
+                                                args.checkpoint_interval, state)
+                if args.workers:
+                    from parallel import ParallelEncoder
+                    # Каждая прочитанная часть делится между всеми процессами
+                    chunk_size = -(-args.chunk_size // args.workers)
+                    with ParallelEncoder(enigma, args.workers, chunk_size) as encoder:
+                        encode_stream(encoder, source, target, args.chunk_size, args.batch, normalizer, checkpointer)
+                else:
+                    encode_stream(enigma, source, target, args.chunk_size, args.batch, normalizer, checkpointer)
+        except ValueError as e:
+            print(f"Ошибка: {e}", file=sys.stderr)
+            sys.exit(1)
+        if args.checkpoint and os.path.exists(args.checkpoint):
+            # Поток закодирован полностью, продолжать нечего
+            os.remove(args.checkpoint)
+        return
+
+    with phase('encode'):
+        result = enigma.encode_text(text, batch=args.batch, workers=args.workers)
     print(f"Результат: {result}")
 
 
@@ -0,0 +1,194 @@
+import mmap
+import os
+from array import array
+
+from enigma import UTF32
+
+# Размер окна в байтах: обработанные окна освобождаются из памяти процесса
+WINDOW = 1 << 20
+
+
+def case_table(alphabet):
+    """
+    Строит таблицу перевода в верхний регистр, не меняющего длину текста в UTF-8.
+
+    Параметры:
+        alphabet (str): Алфавит машины; все буквы должны занимать в UTF-8 два байта.
+
+    Возвращает:
+        dict: Коды символов ASCII и двухбайтовых символов UTF-8, которые str.upper
+            заменяет одним символом той же длины, и коды замен (для str.translate).
+
+    Исключения:
+        ValueError: Если буква алфавита не является двухбайтовым символом UTF-8.
+    """
+    if any(len(char.encode('utf-8')) != 2 for char in alphabet):
+        raise ValueError("Кодирование через mmap требует алфавита из двухбайтовых символов UTF-8.")
+    table = {}
+    for code in range(0x800):
+        char = chr(code)
+        upper = char.upper()
+        if len(upper) == 1 and upper != char and len(upper.encode('utf-8')) == len(char.encode('utf-8')):
+            table[code] = ord(upper)
+    return table
+
+
+def encode_file(enigma, source, target=None, batch=False, window=WINDOW):
+    """
+    Кодирует файл UTF-8, отображенный в память.
+
+    Файл обрабатывается последовательными окнами, граница окна не разрывает символ.
+    Буквы алфавита (двухбайтовые символы, например кириллица) заменяются с
+    сохранением длины, поэтому результат записывается в отображенный файл вывода
+    той же длины или на место исходного. Роторы поворачиваются по тем же правилам и
+    таблицам, что и в Enigma.encode_char. После обработки окна его страницы
+    освобождаются из памяти процесса, так что пик RSS не зависит от размера файла.
+
+    В верхний регистр переводятся только символы, длина которых в UTF-8 при этом не
+    меняется (ASCII и двухбайтовые, см. case_table), остальные символы и
+    некорректные последовательности байтов копируются без изменений. Для текста из
+    таких символов результат совпадает с Enigma.encode_text.
+
+    Параметры:
+        enigma (Enigma): Машина Enigma.
+
+        source (str): Путь к исходному файлу.
+
+        target (str): Путь к файлу результата; None или путь к самому исходному
+            файлу - кодировать на месте.
+
+        batch (bool): Обрабатывать байты окна операциями NumPy, без построения строк.
+
+        window (int): Размер окна в байтах.
+
+    Исключения:
+        ValueError: Если алфавит машины содержит не двухбайтовые символы.
+    """
+    table = case_table(enigma.alphabet)
+    if target is not None and os.path.exists(target) and os.path.samefile(source, target):
+        # Открытие target для записи обнулило бы исходный файл
+        target = None
+    with open(source, 'r+b' if target is None else 'rb') as src:
+        size = os.fstat(src.fileno()).st_size
+        if target is not None:
+            with open(target, 'wb') as dst:
+                dst.truncate(size)
+        if not size:
+            return
+        with mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_WRITE if target is None else mmap.ACCESS_READ) as data:
+            if target is None:
+                _encode_mapped(enigma, data, data, table, batch, window)
+                return
+            with open(target, 'r+b') as dst, mmap.mmap(dst.fileno(), 0) as out:
+                _encode_mapped(enigma, data, out, table, batch, window)
+
+
+def _encode_mapped(enigma, data, out, table, batch, window):
+    """
+    Кодирует отображение data в отображение out той же длины (см. encode_file).
+    """
+    enigma._sync_plugboard()
+    if hasattr(mmap, 'MADV_SEQUENTIAL'):
+        data.madvise(mmap.MADV_SEQUENTIAL)
+    if batch:
+        encode = _encode_window_batch
+        table = _batch_tables(enigma, table)
+    else:
+        encode = _encode_window
+    size = len(data)
+    window = max(window - window % mmap.PAGESIZE, mmap.PAGESIZE)
+    begin = released = 0
+    while begin < size:
+        end = min(begin + window, size)
+        # Окно заканчивается перед началом символа (байты продолжения - 10xxxxxx)
+        while begin < end < size and 0x80 <= data[end] < 0xC0:
+            end -= 1
+        if end == begin:
+            end = min(begin + window, size)
+        encode(enigma, data, out, begin, end, table)
+        begin = end
+        # Страницы, целиком лежащие перед текущей позицией, больше не нужны
+        done = begin - begin % mmap.PAGESIZE
+        if done > released and hasattr(mmap, 'MADV_DONTNEED'):
+            # Измененные страницы общего отображения остаются в страничном кэше файла
+            for mapping in (data,) if out is data else (data, out):
+                mapping.madvise(mmap.MADV_DONTNEED, released, done - released)
+            released = done
+
+
+def _encode_window(enigma, data, out, begin, end, table):
+    """
+    Кодирует байты data[begin:end] в out скалярным циклом Enigma.
+    """
+    # Некорректные байты проходят через коды UTF-32 как суррогаты и восстанавливаются
+    text = data[begin:end].decode('utf-8', 'surrogateescape').translate(table)
+    buffer = array('I', text.encode(UTF32, 'surrogatepass'))
+    enigma._encode_codes(buffer)
+    out[begin:end] = buffer.tobytes().decode(UTF32, 'surrogatepass').encode('utf-8', 'surrogateescape')
+
+
+def _encode_window_batch(enigma, data, out, begin, end, tables):
+    """
+    Кодирует байты data[begin:end] в out с помощью операций NumPy.
+    """
+    import numpy as np
+
+    from vectorized import encode_indices, rotor_positions
+
+    lower, upper, indices, pairs = tables
+    source = np.frombuffer(data, dtype=np.uint8, count=end - begin, offset=begin)
+    target = np.frombuffer(out, dtype=np.uint8, count=end - begin, offset=begin)
+    following = source[1:]
+    try:
+        # Двухбайтовые символы: ведущий байт 110xxxxx (кроме C0 и C1), затем 10xxxxxx
+        leads = np.flatnonzero((source[:-1] >= 0xC2) & (source[:-1] < 0xE0)
+                               & (following >= 0x80) & (following < 0xC0))
+        codes = upper[((source[leads] & 0x1F).astype(np.intp) << 6) | (source[leads + 1] & 0x3F)]
+        shift = lower[source]
+        found = indices[codes]
+
+        if out is not data:
+            target[:] = source
+        target -= shift
+        target[leads] = 0xC0 | (codes >> 6)
+        target[leads + 1] = 0x80 | (codes & 0x3F)
+
+        mask = found >= 0
+        chars = found[mask]
+        if not len(chars):
+            return
+        at = leads[mask]
+        positions = rotor_positions(enigma, np.arange(1, len(chars) + 1))
+        encoded = encode_indices(enigma, chars, positions)
+        for rotor, pos in zip(enigma.rotors, positions):
+            rotor.position = int(pos[-1])
+        target[at] = pairs[encoded, 0]
+        target[at + 1] = pairs[encoded, 1]
+    finally:
+        # Отображение нельзя закрыть, пока на него ссылаются массивы
+        del source, target, following
+
+
+def _batch_tables(enigma, table):
+    """
+    Переводит таблицу case_table в массивы NumPy.
+
+    Возвращает:
+        tuple: Поправки ASCII по значению байта, номера двухбайтовых символов в верхнем
+            регистре, индексы букв алфавита по номеру символа (или -1) и байты букв в
+            виде матрицы (размер алфавита, 2).
+    """
+    import numpy as np
+
+    lower = np.zeros(0x100, dtype=np.uint8)
+    upper = np.arange(0x800, dtype=np.intp)
+    for code, replaced in table.items():
+        if code < 0x80:
+            lower[code] = code - replaced
+        else:
+            upper[code] = replaced
+    indices = np.full(0x800, -1, dtype=np.intp)
+    for i, char in enumerate(enigma.alphabet):
+        indices[ord(char)] = i
+    pairs = np.frombuffer(enigma.alphabet.encode('utf-8'), dtype=np.uint8).reshape(-1, 2)
+    return lower, upper, indices, pairs
@@ -0,0 +1,156 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from instrumentation import HOOKS, emit
+
+_worker_enigma = None
+
+
+def _init_worker(enigma):
+    """
+    Сохраняет копию машины Enigma в рабочем процессе.
+
+    Параметры:
+        enigma (Enigma): Машина Enigma.
+    """
+    global _worker_enigma
+    _worker_enigma = enigma
+
+
+def _encode_chunk(positions, chunk, batch):
+    """
+    Кодирует часть текста в рабочем процессе, начиная с заданных позиций роторов.
+
+    Параметры:
+        positions (tuple): Позиции роторов перед первой буквой части.
+
+        chunk (str): Часть текста в верхнем регистре.
+
+        batch (bool): Использовать векторизованный движок NumPy.
+
+    Возвращает:
+        str: Закодированная часть текста.
+    """
+    for rotor, position in zip(_worker_enigma.rotors, positions):
+        rotor.position = position
+    return _worker_enigma.encode_text(chunk, batch=batch)
+
+
+class ParallelEncoder:
+    """
+    Параллельный кодировщик текста на пуле процессов.
+
+    Текст делится на части, для каждой части начальные позиции роторов вычисляются
+    по количеству букв в предыдущих частях (см. Enigma.stepped_positions), и части кодируются
+    независимо. Результат совпадает с последовательным Enigma.encode_text.
+    Рабочие процессы получают копию машины при создании пула, поэтому проводку,
+    кольца и коммутационную панель после этого менять нельзя.
+
+    Атрибуты:
+        enigma (Enigma): Машина Enigma, позиции роторов которой продвигаются после кодирования.
+
+        workers (int): Количество рабочих процессов.
+
+        chunk_size (int): Размер части текста в символах.
+    """
+
+    def __init__(self, enigma, workers=None, chunk_size=1 << 20):
+        self.enigma = enigma
+        self.workers = workers or os.cpu_count()
+        self.chunk_size = chunk_size
+        self._letters = {ord(char): None for char in enigma.alphabet}
+        self._executor = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(enigma,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Завершает рабочие процессы.
+        """
+        self._executor.shutdown()
+
+    def start(self):
+        """
+        Запускает рабочие процессы заранее, чтобы их запуск не попадал в первое кодирование.
+        """
+        start = tuple(rotor.position for rotor in self.enigma.rotors)
+        futures = [self.submit(start, '') for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    def submit(self, positions, chunk, batch=False):
+        """
+        Отправляет часть текста на кодирование в рабочий процесс.
+
+        Позиции роторов машины не меняются.
+
+        Параметры:
+            positions (tuple): Позиции роторов перед первой буквой части.
+
+            chunk (str): Часть текста.
+
+            batch (bool): Использовать векторизованный движок NumPy.
+
+        Возвращает:
+            concurrent.futures.Future: Будущий результат - закодированная часть текста.
+        """
+        return self._executor.submit(_encode_chunk, positions, chunk, batch)
+
+    def encode_text(self, text, batch=False):
+        """
+        Кодирует текст параллельно.
+
+        Параметры:
+            text (str): Текст для кодирования.
+
+            batch (bool): Использовать векторизованный движок NumPy в рабочих процессах.
+
+        Возвращает:
+            str: Закодированный текст.
+        """
+        enigma = self.enigma
+        start = tuple(rotor.position for rotor in enigma.rotors)
+        started = time.perf_counter()
+        characters = len(text)
+        text = text.upper()
+        chunks = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+        starts = []
+        offset = 0
+        for chunk in chunks:
+            starts.append(enigma.stepped_positions(offset))
+            offset += len(chunk) - len(chunk.translate(self._letters))
+
+        futures = [self.submit(positions, chunk, batch) for positions, chunk in zip(starts, chunks)]
+        result = ''.join(future.result() for future in futures)
+        enigma.advance(offset)
+        if 'encode' in HOOKS:
+            emit('encode', enigma=enigma, start=start, characters=characters, letters=offset,
+                 seconds=time.perf_counter() - started)
+        return result
+
+
+def encode_text_parallel(enigma, text, workers=None, chunk_size=1 << 20, batch=False):
+    """
+    Кодирует текст на пуле процессов (см. ParallelEncoder).
+
+    Параметры:
+        enigma (Enigma): Машина Enigma.
+
+        text (str): Текст для кодирования.
+
+        workers (int): Количество процессов; None - по числу ядер.
+
+        chunk_size (int): Размер части текста в символах.
+
+        batch (bool): Использовать векторизованный движок NumPy в рабочих процессах.
+
+    Возвращает:
+        str: Закодированный текст.
+    """
+    with ParallelEncoder(enigma, workers, chunk_size) as encoder:
+        return encoder.encode_text(text, batch=batch)
@@ -0,0 +1,289 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from enigma import load_config
+from jobs import JobRunner
+
+_worker_runners = None
+
+
+def _init_worker(configs):
+    """
+    Создает по одному JobRunner на каждую конфигурацию в рабочем процессе.
+
+    Параметры:
+        configs (dict): Конфигурации по именам.
+    """
+    global _worker_runners
+    _worker_runners = {name: JobRunner(config) for name, config in configs.items()}
+
+
+def _run_job(config_name, job):
+    """
+    Выполняет задание в рабочем процессе на заранее собранной машине.
+
+    Параметры:
+        config_name (str): Имя конфигурации.
+
+        job (dict): Задание (см. JobRunner).
+
+    Возвращает:
+        str: Зашифрованный текст.
+    """
+    return _worker_runners[config_name].run(job)
+
+
+class ServerStats:
+    """
+    Счетчики сервера: количество запросов, символов, ошибок и задержки последних запросов.
+
+    Атрибуты:
+        requests (int): Количество выполненных запросов шифрования.
+
+        errors (int): Количество запросов, завершившихся ошибкой.
+
+        characters (int): Количество обработанных символов.
+
+        in_flight (int): Количество запросов в обработке.
+    """
+
+    def __init__(self, window=10000):
+        self.started = time.monotonic()
+        self.requests = 0
+        self.errors = 0
+        self.characters = 0
+        self.in_flight = 0
+        self.latencies = deque(maxlen=window)
+
+    def record(self, characters, latency, error=False):
+        """
+        Учитывает завершенный запрос.
+
+        Параметры:
+            characters (int): Длина текста запроса.
+
+            latency (float): Время обработки в секундах.
+
+            error (bool): Запрос завершился ошибкой.
+        """
+        self.requests += 1
+        self.errors += error
+        self.characters += characters
+        self.latencies.append(latency)
+
+    def snapshot(self):
+        """
+        Возвращает текущие значения счетчиков.
+
+        Возвращает:
+            dict: Счетчики, перцентили задержки (мс) и пропускная способность.
+        """
+        uptime = time.monotonic() - self.started
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 3)
+
+        return {
+            'uptime': round(uptime, 3),
+            'requests': self.requests,
+            'errors': self.errors,
+            'characters': self.characters,
+            'in_flight': self.in_flight,
+            'requests_per_second': round(self.requests / uptime, 3) if uptime else 0.0,
+            'characters_per_second': round(self.characters / uptime, 3) if uptime else 0.0,
+            'latency_ms': {'p50': percentile(0.50), 'p95': percentile(0.95), 'p99': percentile(0.99)},
+        }
+
+
+class EnigmaServer:
+    """
+    Сервер шифрования с протоколом JSON Lines поверх TCP.
+
+    Каждая строка запроса - объект JSON:
+        {"id": ..., "op": "encrypt", "config": "default", "positions": "АБВ", "plugboard": "АБ", "text": "..."}
+
+    Операции "encrypt" и "decrypt" эквивалентны (машина Enigma симметрична), "stats"
+    возвращает счетчики сервера. Ответ - строка JSON с тем же "id" и полем "result",
+    "stats" или "error". Запросы одного соединения обрабатываются конвейерно: новые
+    строки читаются, пока предыдущие выполняются, ответы отправляются в порядке запросов.
+    Шифрование выполняется в пуле процессов на заранее собранных машинах, общее
+    количество одновременно выполняемых запросов ограничено.
+
+    Атрибуты:
+        configs (dict): Конфигурации машин по именам (первая доступна как "default").
+
+        stats (ServerStats): Счетчики сервера.
+    """
+
+    def __init__(self, configs, workers=None, concurrency=64, pipeline_depth=128):
+        self.configs = dict(configs)
+        if 'default' not in self.configs:
+            self.configs['default'] = next(iter(self.configs.values()))
+        self.stats = ServerStats()
+        self.pipeline_depth = pipeline_depth
+        self._limit = asyncio.Semaphore(concurrency)
+        if workers == 0:
+            # Выполнение в цикле событий: для отладки и очень коротких сообщений
+            self.workers = 0
+            self._executor = None
+            _init_worker(self.configs)
+        else:
+            self.workers = workers or os.cpu_count()
+            # spawn: рабочие процессы не должны наследовать сокеты клиентов
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                                 initializer=_init_worker, initargs=(self.configs,))
+
+    def close(self):
+        """
+        Завершает рабочие процессы.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+
+    async def warm_up(self):
+        """
+        Запускает рабочие процессы и собирает в них машины до приема соединений.
+        """
+        if self._executor is None:
+            return
+        loop = asyncio.get_running_loop()
+        job = {'positions': 'А' * len(self.configs['default']['rotors']), 'text': ''}
+        await asyncio.gather(*(loop.run_in_executor(self._executor, _run_job, 'default', job)
+                               for _ in range(self.workers)))
+
+    async def handle_request(self, line):
+        """
+        Выполняет один запрос.
+
+        Параметры:
+            line (bytes): Строка запроса.
+
+        Возвращает:
+            dict: Ответ.
+        """
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            op = request.get('op', 'encrypt')
+            if op == 'stats':
+                return {'id': request_id, 'stats': self.stats.snapshot()}
+            if op not in ('encrypt', 'decrypt'):
+                raise ValueError(f"Неизвестная операция: {op}")
+            config_name = request.get('config', 'default')
+            if config_name not in self.configs:
+                raise ValueError(f"Неизвестная конфигурация: {config_name}")
+        except Exception as e:
+            return {'id': request_id, 'error': str(e)}
+
+        text = request.get('text', '')
+        async with self._limit:
+            self.stats.in_flight += 1
+            started = time.perf_counter()
+            error = False
+            try:
+                if self._executor is None:
+                    result = _run_job(config_name, request)
+                else:
+                    loop = asyncio.get_running_loop()
+                    result = await loop.run_in_executor(self._executor, _run_job, config_name, request)
+                response = {'id': request_id, 'result': result}
+            except KeyError as e:
+                error = True
+                response = {'id': request_id, 'error': f"Отсутствует поле {e} в запросе."}
+            except Exception as e:
+                # Любая ошибка запроса возвращается клиенту и не прерывает отправку ответов соединения
+                error = True
+                response = {'id': request_id, 'error': str(e) or type(e).__name__}
+            finally:
+                self.stats.in_flight -= 1
+            self.stats.record(len(text) if isinstance(text, str) else 0, time.perf_counter() - started, error)
+        return response
+
+    async def handle_connection(self, reader, writer):
+        """
+        Обслуживает одно соединение: читает запросы и отправляет ответы в порядке поступления.
+
+        Параметры:
+            reader (asyncio.StreamReader): Поток чтения.
+
+            writer (asyncio.StreamWriter): Поток записи.
+        """
+        pending = asyncio.Queue(self.pipeline_depth)
+
+        async def send_responses():
+            while True:
+                task = await pending.get()
+                if task is None:
+                    return
+                response = await task
+                writer.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+                await writer.drain()
+
+        sender = asyncio.create_task(send_responses())
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    await pending.put(asyncio.create_task(self.handle_request(line)))
+            await pending.put(None)
+            await sender
+        except ConnectionError:
+            sender.cancel()
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8765):
+        """
+        Запускает сервер и обслуживает соединения до остановки.
+
+        Параметры:
+            host (str): Адрес для прослушивания.
+
+            port (int): Порт.
+        """
+        await self.warm_up()
+        server = await asyncio.start_server(self.handle_connection, host, port, limit=1 << 24)
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    """
+    Точка входа подкоманды serve: локальный сервер шифрования.
+
+    Параметры:
+        argv (list): Аргументы командной строки без имени подкоманды.
+    """
+    parser = argparse.ArgumentParser(prog='main.py serve', description='Local Enigma encryption server (JSON Lines over TCP)')
+    parser.add_argument('--config', help='Configuration file (NAME=PATH or PATH, repeatable)', action='append')
+    parser.add_argument('--host', help='Address to bind', default='127.0.0.1')
+    parser.add_argument('--port', help='Port to bind', type=int, default=8765)
+    parser.add_argument('--workers', help='Worker processes (0 runs in the event loop)', type=int, default=os.cpu_count())
+    parser.add_argument('--concurrency', help='Maximum requests processed at once', type=int, default=64)
+    args = parser.parse_args(argv)
+
+    configs = {}
+    for spec in args.config or ['config.json']:
+        name, _, path = spec.rpartition('=')
+        configs[name or path] = load_config(path)
+
+    server = EnigmaServer(configs, args.workers, args.concurrency)
+    print(f"Сервер Enigma слушает {args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
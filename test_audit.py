@@ -0,0 +1,152 @@
+import copy
+import itertools
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from enigma import STEPPING_MODES, create_enigma, load_config
+from test_enigma import random_config
+
+pytest.importorskip("numpy")
+
+import audit  # noqa: E402
+from audit import audit_config, audit_configs, check_config, stepping_cycles  # noqa: E402
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CONFIG = os.path.join(ROOT, 'config.json')
+
+
+def test_audit_shipped_config():
+    """ Проверяет отчет для config.json: неподвижные буквы отражателя дают 7 самоотображений
+        в каждом положении, период правил legacy - 33 * 33 нажатий. """
+    report = audit_config(load_config(CONFIG), 'config.json')
+    assert report['errors'] == []
+    assert any(warning.startswith("Отражатель оставляет на месте буквы Щ (26)") for warning in report['warnings'])
+    assert report['composite']['self_maps_per_state'] == 7
+    assert report['composite']['states_with_self_maps'] == 1
+    assert report['composite']['involutions']
+    assert report['stepping'] == {'states': 33 ** 3, 'cycles': {33 * 33: 33}, 'period': 33 * 33, 'transient': 0}
+
+
+def test_check_config_errors():
+    """ Проверяет ошибки: проводка не перестановка, несимметричный отражатель, зазор вне
+        диапазона, неверная длина проводки. """
+    config = load_config(CONFIG)
+    broken = copy.deepcopy(config)
+    broken['rotors'][0]['wiring'][0] = broken['rotors'][0]['wiring'][1]
+    broken['rotors'][1]['notch'] = 33
+    broken['rotors'][2]['wiring'] = broken['rotors'][2]['wiring'][:-1]
+    wiring = broken['reflector']['wiring']
+    wiring[26], wiring[27], wiring[28] = 27, 28, 26
+    errors, _ = check_config(broken)
+    assert len(errors) == 4
+    assert "Ротор 1: проводка не является перестановкой" in errors[0]
+    assert "зазор 33 вне диапазона" in errors[1]
+    assert "длина проводки 32" in errors[2]
+    assert "не является инволюцией" in errors[3]
+
+    report = audit_config(broken)
+    assert report['stepping'] is None and report['composite'] is None
+
+
+@pytest.mark.parametrize("config,message", [
+    ([], "объектом JSON, а не list"),
+    ({"alphabet": 5, "rotors": []}, "Алфавит должен быть непустой строкой"),
+    ({"rotors": [{"wiring": "АБВ", "notch": 0}], "reflector": []}, "проводка должна быть списком"),
+])
+def test_check_config_wrong_types(config, message):
+    """ Проверяет, что конфигурация неверного типа или с полями неверных типов дает ошибку, а не исключение. """
+    errors, _ = check_config(config)
+    assert any(message in error for error in errors)
+
+
+@pytest.mark.parametrize("stepping", STEPPING_MODES)
+def test_stepping_cycles_match_machine(stepping):
+    """ Проверяет циклы положений роторов по пошаговому повороту машины для всех положений. """
+    config = random_config('ABCDEFG', 3, stepping, seed=1)
+    enigma = create_enigma(config, 'AAA', [])
+    following = {}
+    for start in itertools.product(range(7), repeat=3):
+        for rotor, position in zip(enigma.rotors, start):
+            rotor.position = position
+        enigma.encode_char('A')
+        following[start] = tuple(rotor.position for rotor in enigma.rotors)
+
+    cyclic = set(following)
+    while {following[state] for state in cyclic} != cyclic:
+        cyclic = {following[state] for state in cyclic}
+    lengths = {}
+    for state in cyclic:
+        length, current = 1, following[state]
+        while current != state:
+            length, current = length + 1, following[current]
+        lengths[length] = lengths.get(length, 0) + 1
+    cycles = {length: number // length for length, number in lengths.items()}
+
+    result = stepping_cycles(enigma)
+    assert result['cycles'] == cycles
+    assert result['transient'] == 7 ** 3 - len(cyclic)
+
+
+def test_audit_configs_parallel():
+    """ Проверяет пакет конфигураций на пуле процессов: порядок отчетов и отсутствие
+        самоотображений при отражателе без неподвижных букв. """
+    configs = [(str(seed), random_config('АБВГДЕЖЗИКЛМ', 3, 'odometer', seed)) for seed in range(6)]
+    configs.insert(3, ('broken', {'rotors': []}))
+    reports = list(audit_configs(configs, workers=2))
+    assert [report['name'] for report in reports] == [name for name, _ in configs]
+    assert reports[3]['errors']
+    for report in reports[:3] + reports[4:]:
+        assert report['errors'] == []
+        assert report['composite']['self_maps'] == 0
+        assert report['stepping']['period'] == 12 ** 3
+
+
+def test_audit_undefined_pair_statistics():
+    """ Проверяет, что конфигурации без пар разных букв (алфавит из одной буквы, тождественный
+        отражатель) попадают в отчет с ошибкой, а отчет записывается в JSON без NaN. """
+    single = {'alphabet': 'А', 'rotors': [{'wiring': [0], 'notch': 0}] * 3, 'reflector': {'wiring': [0]}}
+    identity = random_config('ABCDEF', 2, 'legacy', seed=1)
+    identity['reflector']['wiring'] = list(range(6))
+    for config in (single, identity):
+        report = audit_config(config)
+        assert report['errors'] == ["Статистика пар букв не определена: нет пар разных букв."]
+        assert report['composite'] is None
+        json.dumps(report, allow_nan=False)
+
+
+def test_audit_configs_unexpected_error(monkeypatch):
+    """ Проверяет, что непредвиденная ошибка в одной конфигурации не прерывает проверку остальных. """
+    def failing(enigma, block=audit.BLOCK):
+        if len(enigma.alphabet) == 5:
+            raise RuntimeError("сбой")
+        return composite_statistics(enigma, block)
+
+    composite_statistics = audit.composite_statistics
+    monkeypatch.setattr(audit, 'composite_statistics', failing)
+    configs = [(str(size), random_config('ABCDEFG'[:size], 2, 'legacy', seed=0)) for size in (4, 5, 6)]
+    reports = list(audit_configs(configs, workers=1))
+    assert [report['name'] for report in reports] == ['4', '5', '6']
+    assert reports[1]['errors'] == ["Конфигурация не проверена: RuntimeError('сбой')"]
+    assert reports[0]['errors'] == reports[2]['errors'] == []
+
+
+def test_cli_audit(tmp_path):
+    """ Проверяет подкоманду audit с файлом кандидатов: вывод JSON Lines, код возврата 1 при ошибках
+        и продолжение проверки после строки, которая не является JSON. """
+    candidates = tmp_path / "candidates.jsonl"
+    broken = random_config('ABCDEF', 2, 'legacy', seed=0)
+    broken['reflector']['wiring'] = [1, 2, 0, 3, 4, 5]
+    valid = json.dumps(random_config('ABCDEF', 2, 'legacy', seed=0))
+    candidates.write_text('\n'.join([valid, '', json.dumps(broken), '[]', '{"rotors": ', valid]) + '\n',
+                          encoding='utf-8')
+    result = subprocess.run([sys.executable, os.path.join(ROOT, 'main.py'), 'audit', '--candidates', str(candidates),
+                             '--json', '--workers', '1'], capture_output=True, text=True)
+    assert result.returncode == 1
+    reports = [json.loads(line) for line in result.stdout.splitlines()]
+    assert [report['name'] for report in reports] == [f"{candidates}:{number}" for number in (1, 3, 4, 5, 6)]
+    assert [bool(report['errors']) for report in reports] == [False, True, True, True, False]
+    assert reports[3]['errors'][0].startswith("Строка не является JSON")
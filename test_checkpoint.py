@@ -0,0 +1,110 @@
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from checkpoint import Checkpointer, file_hash, load_checkpoint
+from enigma import create_enigma, encode_stream, load_config
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CONFIG = os.path.join(ROOT, 'config.json')
+TEXT = "Съешь же ещё этих мягких французских булок, да выпей чаю!\n" * 200
+
+
+class Interrupted(Exception):
+    pass
+
+
+class FailingSource(io.BytesIO):
+    """ Поток, чтение из которого прерывается после заданного количества частей. """
+
+    def __init__(self, data, reads):
+        super().__init__(data)
+        self.reads = reads
+
+    def read(self, size=-1):
+        if not self.reads:
+            raise Interrupted()
+        self.reads -= 1
+        return super().read(size)
+
+
+def interrupted_run(tmp_path, reads, chunk_size=7):
+    """ Кодирует TEXT в файл с контрольными точками и прерывает кодирование после reads частей. """
+    config = load_config(CONFIG)
+    output = tmp_path / "out.txt"
+    checkpoint = tmp_path / "state.json"
+    enigma = create_enigma(config, "АБВ", ["АБ", "ВГ"])
+    with open(output, 'wb') as target:
+        checkpointer = Checkpointer(str(checkpoint), enigma, file_hash(CONFIG), target, interval=0)
+        with pytest.raises(Interrupted):
+            encode_stream(enigma, FailingSource(TEXT.encode('utf-8'), reads), target, chunk_size,
+                          checkpoint=checkpointer)
+        # Часть вывода после контрольной точки, которая могла не попасть на диск
+        target.write("ЛИШНЕЕ".encode('utf-8'))
+    return output, checkpoint
+
+
+def test_snapshot_restore():
+    """ Проверяет, что восстановленная машина продолжает кодирование с того же места. """
+    config = load_config(CONFIG)
+    enigma = create_enigma(config, "ЯЯЯ", ["АБ", "ВГ"])
+    enigma.set_ring_settings([1, 2, 3])
+    enigma.encode_text("ПРИВЕТМИР" * 50)
+    state = json.loads(json.dumps(enigma.snapshot()))
+    assert state['plugboard'] == ["АБ", "ВГ"]
+
+    restored = create_enigma(config, "ААА", [])
+    restored.restore(state)
+    assert restored.snapshot() == state
+    assert restored.encode_text("ПРОДОЛЖЕНИЕ") == enigma.encode_text("ПРОДОЛЖЕНИЕ")
+
+
+@pytest.mark.parametrize("reads", [1, 5, 38])
+def test_resume_matches_uninterrupted(tmp_path, reads):
+    """ Проверяет, что продолжение с контрольной точки дает тот же вывод, что и
+        непрерывное кодирование, в том числе при разрыве внутри многобайтового символа. """
+    config = load_config(CONFIG)
+    output, checkpoint = interrupted_run(tmp_path, reads)
+    state = load_checkpoint(str(checkpoint), file_hash(CONFIG))
+
+    enigma = create_enigma(config, "ААА", [])
+    enigma.restore(state['machine'])
+    with open(output, 'r+b') as target:
+        source = io.BytesIO(TEXT.encode('utf-8'))
+        source.seek(state['input_offset'])
+        target.truncate(state['output_offset'])
+        target.seek(state['output_offset'])
+        checkpointer = Checkpointer(str(checkpoint), enigma, file_hash(CONFIG), target, 0, state)
+        encode_stream(enigma, source, target, 7, checkpoint=checkpointer)
+
+    expected = create_enigma(config, "АБВ", ["АБ", "ВГ"]).encode_text(TEXT)
+    assert output.read_bytes().decode('utf-8') == expected
+    assert load_checkpoint(str(checkpoint))['characters'] == len(TEXT)
+
+
+def test_checkpoint_for_other_config(tmp_path):
+    """ Проверяет, что контрольная точка другой конфигурации отклоняется. """
+    _, checkpoint = interrupted_run(tmp_path, 3)
+    other = tmp_path / "other.json"
+    other.write_text(json.dumps(load_config(CONFIG)), encoding='utf-8')
+    with pytest.raises(ValueError, match="другой конфигурации"):
+        load_checkpoint(str(checkpoint), file_hash(str(other)))
+
+
+def test_cli_resume(tmp_path):
+    """ Проверяет продолжение прерванного кодирования из командной строки. """
+    output, checkpoint = interrupted_run(tmp_path, 10)
+    source = tmp_path / "in.txt"
+    source.write_bytes(TEXT.encode('utf-8'))
+
+    subprocess.run([sys.executable, os.path.join(ROOT, 'main.py'), '--config', CONFIG, '--no-config-cache',
+                    '--input', str(source), '--output', str(output), '--chunk-size', '7',
+                    '--checkpoint', str(checkpoint), '--resume'], check=True, capture_output=True)
+
+    expected = create_enigma(load_config(CONFIG), "АБВ", ["АБ", "ВГ"]).encode_text(TEXT)
+    assert output.read_bytes().decode('utf-8') == expected
+    assert not checkpoint.exists()
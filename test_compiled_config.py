@@ -0,0 +1,97 @@
+import json
+import pickle
+import shutil
+
+from compiled_config import SUFFIX, load_config_cached, write_cache
+from enigma import create_enigma, load_config
+
+
+def test_cached_config_matches_json(tmp_path):
+    """ Проверяет, что машина из скомпилированного кэша шифрует так же, как из JSON,
+        а кэш создается при первой загрузке и переиспользуется при следующих. """
+    config_file = str(tmp_path / "config.json")
+    shutil.copy("config.json", config_file)
+    text = "ПРОВЕРКА СКОМПИЛИРОВАННОЙ КОНФИГУРАЦИИ"
+    expected = create_enigma(load_config(config_file), "АБВ", ["АБ"]).encode_text(text)
+
+    first = load_config_cached(config_file)
+    assert (tmp_path / ("config.json" + SUFFIX)).exists()
+    second = load_config_cached(config_file)
+
+    for config in (first, second):
+        assert create_enigma(config, "АБВ", ["АБ"]).encode_text(text) == expected
+    assert isinstance(second['rotors'][0]['wiring'], memoryview)
+
+
+def test_cached_config_invalidated_on_change(tmp_path):
+    """ Проверяет, что изменение JSON автоматически пересобирает кэш. """
+    config_file = str(tmp_path / "config.json")
+    config = load_config("config.json")
+    with open(config_file, 'w', encoding='utf-8') as f:
+        json.dump(config, f)
+    old_hash = load_config_cached(config_file)['hash']
+
+    config['rotors'][0]['notch'] = 3
+    with open(config_file, 'w', encoding='utf-8') as f:
+        json.dump(config, f)
+    cached = load_config_cached(config_file)
+
+    assert cached['hash'] != old_hash
+    assert cached['rotors'][0]['notch'] == 3
+
+
+def test_cached_machine_is_picklable(tmp_path):
+    """ Проверяет, что машину на таблицах из кэша можно передать в другой процесс (pickle). """
+    config_file = str(tmp_path / "config.json")
+    shutil.copy("config.json", config_file)
+    enigma = create_enigma(load_config_cached(config_file), "АБВ", [])
+
+    copy = pickle.loads(pickle.dumps(enigma))
+
+    assert copy.encode_text("ТЕСТ") == enigma.encode_text("ТЕСТ")
+
+
+def test_cached_config_keeps_alphabet_and_stepping(tmp_path):
+    """ Проверяет, что алфавит и правила поворота сохраняются в скомпилированном кэше. """
+    from test_enigma import random_config
+
+    config = random_config('ABCDEFGHIJKLMNOPQRSTUVWXYZ', 4, 'double_step', seed=1)
+    config_file = str(tmp_path / "config.json")
+    with open(config_file, 'w', encoding='utf-8') as f:
+        json.dump(config, f)
+
+    load_config_cached(config_file)
+    cached = load_config_cached(config_file)
+    assert cached['alphabet'] == config['alphabet'] and cached['stepping'] == 'double_step'
+    text = "FOUR ROTORS DOUBLE STEP " * 50
+    assert (create_enigma(cached, "ABCD", ["QZ"]).encode_text(text)
+            == create_enigma(config, "ABCD", ["QZ"]).encode_text(text))
+
+
+def test_cached_config_falls_back_to_json(tmp_path):
+    """ Проверяет, что конфигурация, которую нельзя прочитать из кэша (ротор короче
+        отражателя), возвращается из JSON, а не как None. """
+    config = load_config("config.json")
+    config['rotors'][0]['wiring'] = list(range(26))
+    config_file = str(tmp_path / "config.json")
+    with open(config_file, 'w', encoding='utf-8') as f:
+        json.dump(config, f)
+
+    assert load_config_cached(config_file) == config
+
+
+def test_write_cache_ignores_errors(tmp_path):
+    """ Проверяет, что запись кэша создает каталог, а ошибки записи не выбрасываются
+        и не оставляют временных файлов. """
+    assert write_cache(str(tmp_path / "cache" / "data.bin"), lambda f: f.write(b"data"))
+    assert (tmp_path / "cache" / "data.bin").read_bytes() == b"data"
+
+    (tmp_path / "file").write_bytes(b"")
+    assert not write_cache(str(tmp_path / "file" / "data.bin"), lambda f: f.write(b"data"))
+
+    def failing(f):
+        raise OSError("диск заполнен")
+
+    assert not write_cache(str(tmp_path / "cache" / "data.bin"), failing)
+    assert sorted(path.name for path in (tmp_path / "cache").iterdir()) == ["data.bin"]
+    assert (tmp_path / "cache" / "data.bin").read_bytes() == b"data"
@@ -0,0 +1,79 @@
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+
+import pytest
+
+from compiled_config import config_hash
+from container import Container, write_container
+from enigma import create_enigma, load_config
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CONFIG = os.path.join(ROOT, 'config.json')
+
+
+def config_digest():
+    with open(CONFIG, 'rb') as f:
+        return config_hash(f.read())
+
+
+@pytest.fixture
+def container(tmp_path):
+    """ Контейнер из случайного текста с частями по 1001 байту (границы частей разрывают символы). """
+    text = ''.join(random.Random(0).choices('абвгдеёжзАБВ  ,.\nxß€', k=30000))
+    path = tmp_path / "text.engc"
+    with open(path, 'wb') as target:
+        write_container(create_enigma(load_config(CONFIG), "АБВ", ["АБ"]), io.BytesIO(text.encode('utf-8')),
+                        target, config_digest(), chunk_size=1001)
+    return Container(str(path)), text.upper().encode('utf-8')
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_decrypt_range(container, workers):
+    """ Проверяет расшифровку всего текста и произвольных диапазонов, в том числе на границах частей. """
+    container, plain = container
+    assert container.plain_size == len(plain)
+    enigma = create_enigma(load_config(CONFIG), "АБВ", ["АБ"])
+    assert container.decrypt_range(enigma, workers=workers) == plain
+    for start, end in [(0, 10), (5000, 5001), (len(plain) - 100, None), (999, 3005), (10 ** 9, None)]:
+        assert container.decrypt_range(enigma, start, end, workers=workers) == plain[start:end]
+
+
+def test_container_config_mismatch(container, tmp_path):
+    """ Проверяет, что контейнер другой конфигурации и поврежденный файл отклоняются. """
+    container, _ = container
+    with pytest.raises(ValueError, match="другой конфигурации"):
+        container.check(config_hash(b'{}'))
+
+    broken = tmp_path / "broken.engc"
+    with open(container.path, 'rb') as f:
+        broken.write_bytes(f.read()[:-3])
+    with pytest.raises(ValueError, match="не является контейнером"):
+        Container(str(broken))
+
+
+def test_cli_container(tmp_path):
+    """ Проверяет запись контейнера и расшифровку диапазона из командной строки. """
+    text = "Съешь же ещё этих мягких французских булок, да выпей чаю!\n" * 100
+    source = tmp_path / "in.txt"
+    packed = tmp_path / "out.engc"
+    source.write_text(text, encoding='utf-8')
+    command = [sys.executable, os.path.join(ROOT, 'main.py'), 'container']
+    key = ['--config', CONFIG, '--positions', 'АБВ', '--plugboard', 'АБ ВГ']
+
+    subprocess.run(command + ['pack'] + key + ['--input', str(source), '--output', str(packed),
+                                             '--chunk-size', '500'], check=True, capture_output=True)
+    result = subprocess.run(command + ['unpack'] + key + ['--input', str(packed), '--range', '1000:1200'],
+                            check=True, capture_output=True)
+    assert result.stdout == text.upper().encode('utf-8')[1000:1200]
+
+    # Та же конфигурация, записанная иначе, имеет другой хэш
+    other = tmp_path / "config.json"
+    other.write_text(json.dumps(load_config(CONFIG)), encoding='utf-8')
+    result = subprocess.run(command + ['unpack'] + key[2:] + ['--config', str(other), '--input', str(packed)],
+                            capture_output=True, text=True)
+    assert result.returncode == 1
+    assert "другой конфигурации" in result.stdout
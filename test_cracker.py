@@ -0,0 +1,41 @@
+import pytest
+
+from enigma import create_enigma, load_config
+
+pytest.importorskip("numpy")
+
+from cracker import ALPHABET, Cracker, crack
+
+PLAINTEXT = ("СЕГОДНЯ ПОГОДА ХОРОШАЯ И МЫ ИДЕМ ГУЛЯТЬ В ПАРК ПОТОМ ВЕРНЕМСЯ ДОМОЙ И БУДЕМ ПИТЬ ЧАЙ "
+             "С ВАРЕНЬЕМ НАШИ ДРУЗЬЯ ПРИДУТ ВЕЧЕРОМ ЧТОБЫ ОБСУДИТЬ ПЛАНЫ НА ЗАВТРА")
+
+
+@pytest.fixture
+def config():
+    """ Фикстура с конфигурацией из config.json. """
+    return load_config("config.json")
+
+
+def test_crack_with_crib(config):
+    """ Проверяет, что поиск по известному фрагменту находит начальные позиции роторов
+        при известной коммутационной панели. """
+    ciphertext = create_enigma(config, "КЛМ", ["ОЕ"]).encode_text(PLAINTEXT)
+    pairs = [(ALPHABET.index("О"), ALPHABET.index("Е"))]
+
+    results = crack(config, ciphertext, crib="СЕГОДНЯ", plugboard_pairs=pairs, workers=1)
+
+    assert results[0][1] == (11, 12, 13)
+    assert results[0][0] == 0
+
+
+def test_crack_by_statistics_and_plugboard(config):
+    """ Проверяет, что статистическая оценка находит позиции роторов, а восхождение
+        по коммутационной панели восстанавливает пару и открытый текст. """
+    ciphertext = create_enigma(config, "КЛМ", ["ОЕ"]).encode_text(PLAINTEXT)
+
+    results = crack(config, ciphertext, top=3, workers=1)
+    assert results[0][1] == (11, 12, 13)
+
+    pairs, _, plaintext = Cracker(config).hill_climb_plugboard(ciphertext, results[0][1], results[0][2], max_pairs=1)
+    assert pairs == [(ALPHABET.index("Е"), ALPHABET.index("О"))]
+    assert plaintext == PLAINTEXT.replace(" ", "")
@@ -1,5 +1,9 @@
+import io
+import random
+
 import pytest
-from enigma import Enigma, Rotor, Reflector, load_config
+from enigma import (Enigma, Rotor, Reflector, STEPPING_MODES, TABLES_CACHE_SIZE, create_enigma, load_config,
+                    step_positions, encode_stream, _rotor_tables)
 from unittest.mock import mock_open, patch
 
 @pytest.fixture
@@ -213,3 +217,198 @@ def test_different_rotor_configuration():
     enigma2.set_rotor_positions(start_position)
     decrypted2 = enigma2.encode_text(result2)
     assert decrypted2 == test_text
+
+
+def test_rotor_tables_match_wiring(sample_config):
+    """ Проверяет, что таблицы прямого и обратного прохода ротора совпадают с расчетом по проводке
+        для всех позиций и настроек кольца (в том числе вне диапазона), после изменения
+        ring_setting и wiring. """
+    rotor = Rotor(sample_config['rotors'][0]['wiring'], 5)
+    for ring_setting in (0, 7, 40, -3):
+        rotor.ring_setting = ring_setting
+        for position in range(33):
+            rotor.position = position
+            shift = position - ring_setting
+            for char_idx in range(33):
+                expected = (rotor.wiring[(char_idx + shift) % 33] - shift) % 33
+                assert rotor.forward(char_idx) == expected
+                assert rotor.backward(expected) == char_idx
+
+    rotor.wiring = sample_config['rotors'][1]['wiring']
+    rotor.ring_setting = 0
+    rotor.position = 0
+    assert [rotor.forward(i) for i in range(33)] == sample_config['rotors'][1]['wiring']
+
+
+def test_rotor_tables_cache_bounded(sample_config):
+    """ Проверяет, что роторы с одинаковой проводкой используют общие таблицы, а кэш таблиц
+        не растет больше TABLES_CACHE_SIZE проводок. """
+    wiring = sample_config['rotors'][0]['wiring']
+    assert Rotor(wiring, 0)._forward is Rotor(list(wiring), 3)._forward
+    rng = random.Random(0)
+    for _ in range(TABLES_CACHE_SIZE + 10):
+        Rotor(rng.sample(range(33), 33), 0)
+    assert _rotor_tables.cache_info().currsize == TABLES_CACHE_SIZE
+
+
+def test_ring_settings_out_of_range(basic_enigma, sample_config):
+    """ Проверяет, что кольца вне диапазона приводятся по модулю длины алфавита. """
+    basic_enigma.set_ring_settings([40, -1, 33])
+    assert [rotor.ring_setting for rotor in basic_enigma.rotors] == [7, 32, 0]
+    basic_enigma.set_rotor_positions("ЭЮЯ")
+    expected = create_enigma(sample_config, "ЭЮЯ", [])
+    expected.set_ring_settings([7, 32, 0])
+    expected.set_rotor_positions("ЭЮЯ")
+    assert basic_enigma.encode_text("ПРОВЕРКА КОЛЕЦ") == expected.encode_text("ПРОВЕРКА КОЛЕЦ")
+
+
+@pytest.mark.parametrize("positions", ["АБВ", "ЯЯЯ", "ЁЙФ"])
+def test_step_positions_matches_encode_char(basic_enigma, positions):
+    """ Проверяет, что аналитический расчет позиций роторов совпадает с пошаговым
+        поворотом роторов в encode_char, включая переносы через зазоры. """
+    basic_enigma.set_rotor_positions(positions)
+    start = tuple(r.position for r in basic_enigma.rotors)
+    notches = tuple(r.notch for r in basic_enigma.rotors)
+    for steps in range(1, 2200):
+        basic_enigma.encode_char("А")
+        assert step_positions(start, notches, steps) == tuple(r.position for r in basic_enigma.rotors)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 4096])
+def test_encode_stream_matches_encode_text(basic_enigma, chunk_size):
+    """ Проверяет, что потоковое кодирование по частям (в том числе с разрывом многобайтовых
+        символов на границе частей) совпадает с кодированием всего текста. """
+    text = "Привет, мир!\nТЕСТОВОЕ СООБЩЕНИЕ 2024\n" * 50
+    basic_enigma.set_rotor_positions("АБВ")
+    expected = basic_enigma.encode_text(text)
+
+    basic_enigma.set_rotor_positions("АБВ")
+    target = io.BytesIO()
+    processed = encode_stream(basic_enigma, io.BytesIO(text.encode('utf-8')), target, chunk_size)
+
+    assert processed == len(text)
+    assert target.getvalue().decode('utf-8') == expected
+
+
+def test_advance_and_seek_match_encoding(basic_enigma):
+    """ Проверяет, что advance и seek переводят роторы в то же положение, что и посимвольное кодирование. """
+    basic_enigma.set_rotor_positions("ЯЮЭ")
+    basic_enigma.encode_text("А" * 1500)
+    expected = [r.position for r in basic_enigma.rotors]
+
+    basic_enigma.seek(1000)
+    basic_enigma.advance(500)
+    assert [r.position for r in basic_enigma.rotors] == expected
+
+    basic_enigma.seek(0)
+    assert [r.position for r in basic_enigma.rotors] == [32, 31, 30]
+
+
+def test_parallel_encode_matches_sequential(basic_enigma):
+    """ Проверяет, что параллельное кодирование частями совпадает с последовательным,
+        включая конечное положение роторов. """
+    from parallel import encode_text_parallel
+
+    text = "Параллельное шифрование, часть 1. " * 200
+    basic_enigma.set_rotor_positions("ЖЗИ")
+    expected = basic_enigma.encode_text(text)
+    expected_positions = [r.position for r in basic_enigma.rotors]
+
+    basic_enigma.set_rotor_positions("ЖЗИ")
+    assert encode_text_parallel(basic_enigma, text, workers=2, chunk_size=333) == expected
+    assert [r.position for r in basic_enigma.rotors] == expected_positions
+
+
+ENIGMA_I = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+
+@pytest.fixture
+def enigma_i_config():
+    """ Фикстура с конфигурацией армейской машины Enigma I: роторы I, II, III,
+    отражатель B, латинский алфавит и правила поворота double_step. """
+    def wiring(letters):
+        return [ENIGMA_I.index(c) for c in letters]
+    return {
+        "alphabet": ENIGMA_I,
+        "stepping": "double_step",
+        "rotors": [
+            {"wiring": wiring("EKMFLGDQVZNTOWYHXUSPAIBRCJ"), "notch": ENIGMA_I.index("R")},
+            {"wiring": wiring("AJDKSIRUXBLHWTMCQGZNPYFVOE"), "notch": ENIGMA_I.index("F")},
+            {"wiring": wiring("BDFHJLCPRTXVZNYEIWGAKMQOUS"), "notch": ENIGMA_I.index("W")},
+        ],
+        "reflector": {"wiring": wiring("YRUHQSLDPXNGOKMIEBFZCWVJAT")}
+    }
+
+
+def test_enigma_i_double_step(enigma_i_config):
+    """ Тестирует латинский алфавит и правила double_step на исторической машине Enigma I:
+    известный контрольный пример и двойной шаг среднего ротора. """
+    enigma = create_enigma(enigma_i_config, "AAA", [])
+    assert enigma.encode_text("AAAAA") == "BDZGO"
+
+    enigma.set_rotor_positions("ADU")
+    sequence = []
+    for _ in range(4):
+        enigma.encode_char("A")
+        sequence.append(''.join(ENIGMA_I[r.position] for r in enigma.rotors))
+    assert sequence == ["ADV", "AEW", "BFX", "BFY"]
+
+
+def random_config(alphabet, count, stepping, seed):
+    """ Создает случайную конфигурацию с заданными алфавитом, количеством роторов и правилами поворота. """
+    rng = random.Random(seed)
+    size = len(alphabet)
+    rotors = []
+    for _ in range(count):
+        wiring = list(range(size))
+        rng.shuffle(wiring)
+        rotors.append({"wiring": wiring, "notch": rng.randrange(size)})
+    letters = list(range(size))
+    rng.shuffle(letters)
+    reflector = list(range(size))
+    for a, b in zip(letters[::2], letters[1::2]):
+        reflector[a], reflector[b] = b, a
+    return {"alphabet": alphabet, "stepping": stepping, "rotors": rotors, "reflector": {"wiring": reflector}}
+
+
+@pytest.mark.parametrize("stepping", STEPPING_MODES)
+@pytest.mark.parametrize("count", [1, 2, 4, 5])
+def test_step_positions_n_rotors(stepping, count):
+    """ Проверяет, что аналитический поворот совпадает с посимвольным для разного
+    количества роторов и всех правил поворота, и что шифрование обратимо. """
+    alphabet = 'ABCDEFGH'
+    config = random_config(alphabet, count, stepping, seed=count)
+    positions = alphabet[-count:]
+    enigma = create_enigma(config, positions, ["AB"])
+    start = tuple(r.position for r in enigma.rotors)
+    notches = tuple(r.notch for r in enigma.rotors)
+    for steps in range(1, 700):
+        enigma.encode_char("C")
+        assert step_positions(start, notches, steps, len(alphabet), stepping) == tuple(r.position for r in enigma.rotors)
+
+    text = "HEAD FACE BADGE " * 20
+    encoded = create_enigma(config, positions, ["AB"]).encode_text(text)
+    assert create_enigma(config, positions, ["AB"]).encode_text(encoded) == text
+
+
+def test_unknown_stepping(sample_config):
+    """ Проверяет, что неизвестные правила поворота приводят к ошибке. """
+    with pytest.raises(SystemExit):
+        create_enigma(dict(sample_config, stepping="sideways"), "АБВ", [])
+
+
+def test_slots_and_pickle(basic_enigma):
+    """ Проверяет, что машина без __dict__ сериализуется pickle и после восстановления
+    кодирует так же, а encode_text совпадает с посимвольным encode_char, в том числе
+    с коммутационной панелью, измененной на месте. """
+    import pickle
+
+    assert not hasattr(basic_enigma, '__dict__') and not hasattr(basic_enigma.rotors[0], '__dict__')
+    basic_enigma.plugboard[0] = 32
+    basic_enigma.plugboard[32] = 0
+    basic_enigma.set_rotor_positions("ЖЗИ")
+    copy = pickle.loads(pickle.dumps(basic_enigma))
+    text = "Съешь же ещё этих мягких французских булок, да выпей чаю! Ёж"
+
+    expected = ''.join(copy.encode_char(c) for c in text.upper())
+    assert basic_enigma.encode_text(text) == expected
@@ -0,0 +1,93 @@
+import codecs
+import io
+
+import pytest
+
+import enigma_codec
+from enigma import create_enigma, load_config
+from test_enigma import random_config
+
+TEXT = "Съешь же ещё этих мягких французских булок, да выпей чаю!\n" * 3
+
+
+@pytest.fixture(params=[True, False], ids=['keystream', 'machine'])
+def codec(request):
+    """ Кодек для ключа АБВ/АБ ВГ с потоком перестановок и без него. """
+    enigma_codec.register('enigma-test', create_enigma(load_config("config.json"), "АБВ", ["АБ", "ВГ"]),
+                          keystream=request.param)
+    yield 'enigma-test'
+    enigma_codec.unregister('enigma-test')
+
+
+def reference():
+    return create_enigma(load_config("config.json"), "АБВ", ["АБ", "ВГ"])
+
+
+def test_encode_decode(codec):
+    """ Проверяет, что кодек без состояния совпадает с encode_text и обратим. """
+    encoded = TEXT.encode(codec)
+    assert encoded == reference().encode_text(TEXT).encode('utf-8')
+    assert encoded.decode(codec) == TEXT.upper()
+    assert codecs.lookup('Enigma Test').name == 'enigma_test'
+
+
+def test_incremental_state(codec):
+    """ Проверяет перенос состояния роторов между вызовами, getstate/setstate и reset. """
+    encoder = codecs.getincrementalencoder(codec)()
+    lines = TEXT.splitlines(keepends=True)
+    encoded = b''.join(encoder.encode(line) for line in lines)
+    assert encoded == reference().encode_text(TEXT).encode('utf-8')
+
+    state = encoder.getstate()
+    tail = encoder.encode("ЕЩЁ")
+    encoder.setstate(state)
+    assert encoder.encode("ЕЩЁ") == tail
+    encoder.reset()
+    assert encoder.encode(lines[0]) == encoded[:len(lines[0].encode('utf-8'))]
+
+    # Побайтовая подача разрывает двухбайтовые символы
+    decoder = codecs.getincrementaldecoder(codec)()
+    decoded = ''.join(decoder.decode(encoded[i:i + 1]) for i in range(len(encoded)))
+    assert decoded + decoder.decode(b'', final=True) == TEXT.upper()
+    alphabet = reference().alphabet
+    assert decoder.getstate() == (b'', sum(char in alphabet for char in TEXT.upper()))
+
+
+def test_text_io(codec, tmp_path):
+    """ Проверяет open(..., encoding=...) с tell/seek, потоковые классы и codecs.iterencode. """
+    path = tmp_path / "secret.txt"
+    with open(path, 'w', encoding=codec) as f:
+        for line in TEXT.splitlines(keepends=True):
+            f.write(line)
+    expected = reference().encode_text(TEXT).encode('utf-8')
+    assert path.read_bytes() == expected
+
+    with open(path, 'r', encoding=codec, newline='') as f:
+        head = f.read(25)
+        position = f.tell()
+        rest = f.read()
+        f.seek(position)
+        assert f.read() == rest
+    assert head + rest == TEXT.upper()
+
+    writer = codecs.getwriter(codec)(io.BytesIO())
+    writer.writelines(TEXT.splitlines(keepends=True))
+    assert writer.stream.getvalue() == expected
+    assert codecs.getreader(codec)(io.BytesIO(expected)).read() == TEXT.upper()
+    assert b''.join(codecs.iterencode(TEXT.splitlines(keepends=True), codec)) == expected
+
+
+def test_non_periodic_stepping():
+    """ Проверяет кодек для правил double_step, для которых поток перестановок не строится. """
+    config = random_config('АБВГДЕЖЗИК', 3, 'double_step', seed=2)
+    enigma_codec.register('enigma-double', create_enigma(config, "АБВ", []))
+    try:
+        encoder = codecs.getincrementalencoder('enigma-double')()
+        text = "абвгдежзик" * 50
+        encoded = b''.join(encoder.encode(text[i:i + 7]) for i in range(0, len(text), 7))
+        assert encoded == create_enigma(config, "АБВ", []).encode_text(text).encode('utf-8')
+        assert encoder.getstate() == len(text)
+    finally:
+        enigma_codec.unregister('enigma-double')
+    with pytest.raises(LookupError):
+        codecs.lookup('enigma-double')
@@ -0,0 +1,97 @@
+import json
+import os
+import pstats
+import subprocess
+import sys
+
+import pytest
+
+from enigma import STEPPING_MODES, create_enigma
+from instrumentation import HOOKS, Metrics, phase, register_hook, unregister_hook
+from test_enigma import random_config
+
+
+@pytest.mark.parametrize("stepping", STEPPING_MODES)
+def test_metrics_match_simulation(stepping):
+    """ Проверяет, что аналитически посчитанные повороты роторов и переносы совпадают
+        с пошаговым моделированием, а обработчики снимаются после выхода из блока. """
+    config = random_config('ABCDEFGHIJ', 4, stepping, seed=3)
+    text = "A QUICK BROWN FOX, JUMPED OVER THE LAZY DOG! " * 30
+    enigma = create_enigma(config, "JIHG", ["AB"])
+
+    with Metrics() as metrics:
+        with phase('encode'):
+            enigma.encode_text(text[:500])
+            enigma.encode_text(text[500:])
+    assert not HOOKS
+
+    simulated = create_enigma(config, "JIHG", ["AB"])
+    driven = 2 if stepping == 'legacy' else 1
+    steps = carries = 0
+    for char in text:
+        before = [r.position for r in simulated.rotors]
+        if simulated.encode_char(char) == char:
+            continue
+        turns = sum((r.position - position) % 10 for r, position in zip(simulated.rotors, before))
+        steps += turns
+        carries += turns - driven
+
+    counters = metrics.to_dict()['counters']
+    assert counters['encode_calls'] == 2
+    assert counters['characters'] == len(text)
+    assert counters['letters'] == sum(c in config['alphabet'] for c in text)
+    assert counters['rotor_steps'] == steps
+    assert counters['notch_carries'] == carries
+    assert set(metrics.phases) == {'encode'}
+
+
+def test_metrics_with_workers():
+    """ Проверяет, что параллельное кодирование учитывается в метриках один раз. """
+    config = random_config('ABCDEFGHIJ', 3, 'legacy', seed=5)
+    text = "A QUICK BROWN FOX, JUMPED OVER THE LAZY DOG!"
+    enigma = create_enigma(config, "JIH", [])
+    reference = create_enigma(config, "JIH", [])
+    with Metrics() as expected:
+        encoded = reference.encode_text(text)
+
+    with Metrics() as metrics:
+        assert enigma.encode_text(text, workers=2) == encoded
+    counters = metrics.to_dict()['counters']
+    assert counters['encode_calls'] == 1
+    assert counters['letters'] == sum(c in config['alphabet'] for c in text)
+    for name in ('characters', 'rotor_steps', 'notch_carries'):
+        assert counters[name] == expected.counters[name]
+
+
+def test_custom_hook():
+    """ Проверяет регистрацию и удаление собственного обработчика событий. """
+    events = []
+
+    def on_phase(name, seconds):
+        events.append(name)
+
+    register_hook('phase', on_phase)
+    try:
+        with phase('load_config'):
+            pass
+    finally:
+        unregister_hook('phase', on_phase)
+    with phase('ignored'):
+        pass
+    assert events == ['load_config']
+    assert not HOOKS
+
+
+def test_cli_metrics_and_profile(tmp_path):
+    """ Проверяет флаги --metrics и --profile командной строки. """
+    metrics_file = tmp_path / "metrics.json"
+    profile_file = tmp_path / "profile.pstats"
+    root = os.path.dirname(os.path.abspath(__file__))
+    subprocess.run([sys.executable, os.path.join(root, 'main.py'), '--config', os.path.join(root, 'config.json'),
+                    '--no-config-cache', '--positions', 'АБВ', '--plugboard', 'АБ', '--text', 'ПРИВЕТ МИР',
+                    '--metrics', str(metrics_file), '--profile', str(profile_file)], check=True, capture_output=True)
+
+    metrics = json.loads(metrics_file.read_text(encoding='utf-8'))
+    assert set(metrics['phases']) == {'load_config', 'validate', 'create_enigma', 'encode'}
+    assert metrics['counters']['letters'] == 9
+    assert any(name == 'encode_text' for _, _, name in pstats.Stats(str(profile_file)).stats)
@@ -0,0 +1,65 @@
+import io
+import json
+
+import pytest
+
+from enigma import create_enigma, load_config
+from jobs import run_jobs
+
+
+@pytest.fixture
+def config():
+    """ Фикстура с конфигурацией из config.json. """
+    return load_config("config.json")
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_jobs_matches_create_enigma(config, workers):
+    """ Проверяет, что результаты пакетного выполнения совпадают с отдельным созданием машины
+        для каждого задания, порядок сохраняется, а ошибочные задания не прерывают обработку. """
+    jobs = [
+        {"id": 1, "positions": "АБВ", "plugboard": "АБ ВГ", "text": "привет мир"},
+        {"id": 2, "positions": "АБ", "text": "ТЕСТ"},
+        {"request_id": "r-3", "body": "ВТОРОЕ СООБЩЕНИЕ"},
+    ]
+    source = io.StringIO(''.join(json.dumps(job, ensure_ascii=False) + '\n' for job in jobs))
+    target = io.StringIO()
+
+    count = run_jobs(config, source, target, workers, defaults={'positions': 'ЯЯЯ'}, batch_size=1)
+
+    results = [json.loads(line) for line in target.getvalue().splitlines()]
+    assert count == 3
+    assert [r['id'] for r in results] == [1, 2, "r-3"]
+    assert results[0]['result'] == create_enigma(config, "АБВ", ["АБ", "ВГ"]).encode_text("привет мир")
+    assert 'error' in results[1]
+    assert results[2]['result'] == create_enigma(config, "ЯЯЯ", []).encode_text("ВТОРОЕ СООБЩЕНИЕ")
+
+
+def test_run_jobs_batch_matches_scalar(config):
+    """ Проверяет, что пакет коротких заданий с разными ключами, зашифрованный одним
+        проходом NumPy, совпадает с заданиями, выполненными по одному. """
+    pytest.importorskip("numpy")
+    jobs = [
+        {"id": 1, "positions": "АБВ", "plugboard": "АБ ВГ", "rings": [1, 2, 3], "text": "привет мир"},
+        {"id": 2, "positions": "ЯЯЯ", "text": "Съешь же ещё этих мягких французских булок" * 40},
+        {"id": 3, "positions": "АБ", "text": "ТЕСТ"},
+        {"id": 4, "positions": "ЁЖЗ", "plugboard": ["ЯЮ"], "text": ""},
+        {"id": 5, "positions": "ЁЖЗ", "rings": [1], "text": "КОЛЬЦА"},
+        {"id": 6, "positions": "ЭЮЯ", "text": 5},
+        {"id": 7, "positions": "АБВ", "plugboard": "АЪ", "text": "ключ"},
+        {"id": 8, "positions": "АБВ", "rings": [40, 0, 0], "text": "КОЛЬЦА"},
+        {"id": 9, "positions": "АБВ", "plugboard": "АБ АВ", "text": "ВАБВАБ"},
+        {"id": 10, "positions": "АБВ", "plugboard": "АА", "text": "ВАБВАБ"},
+    ]
+    lines = ''.join(json.dumps(job, ensure_ascii=False) + '\n' for job in jobs)
+    results = {}
+    for batch in (False, True):
+        target = io.StringIO()
+        run_jobs(config, io.StringIO(lines), target, batch=batch)
+        results[batch] = [json.loads(line) for line in target.getvalue().splitlines()]
+    assert results[True] == results[False]
+    enigma = create_enigma(config, "АБВ", ["АБ", "ВГ"])
+    enigma.set_ring_settings([1, 2, 3])
+    assert results[True][0]['result'] == enigma.encode_text("привет мир")
+    assert "другой паре" in results[True][8]['error'] and "одинаковыми" in results[True][9]['error']
+    assert ['error' in result for result in results[True]] == [False, False, True, False, True, True, False, True, True, True]
@@ -0,0 +1,85 @@
+import io
+import json
+import os
+import pickle
+import random
+
+import pytest
+
+from enigma import create_enigma, load_config
+
+np = pytest.importorskip("numpy")
+
+from jobs import run_jobs
+from keystream import Keystream, keystream_cached
+from test_enigma import random_config
+
+ALPHABET = 'АБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ'
+
+
+def test_keystream_matches_scalar():
+    """ Проверяет, что кодирование выборкой из потока совпадает с посимвольным,
+        в том числе со смещением от начала ключа. """
+    config = load_config("config.json")
+    enigma = create_enigma(config, "ГДЕ", ["АБ", "ЯЮ"])
+    enigma.set_ring_settings([3, 0, 7])
+    enigma.set_rotor_positions("ГДЕ")
+    keystream = Keystream.build(enigma)
+    text = ''.join(random.Random(1).choice(ALPHABET + " .,1") for _ in range(3000))
+
+    assert [r.position for r in enigma.rotors] == [3, 4, 5]
+    assert keystream.periodic
+    assert keystream.encode_text(text) == enigma.encode_text(text)
+    enigma.seek(1234)
+    assert keystream.encode_text(text, offset=1234) == enigma.encode_text(text)
+
+
+@pytest.mark.parametrize("stepping", ["legacy", "odometer", "double_step"])
+def test_keystream_wraps_only_when_periodic(stepping):
+    """ Проверяет, что периодический поток применяется к сообщениям длиннее периода,
+        а непериодический отказывается кодировать такие сообщения. """
+    alphabet = 'ABCDEFGH'
+    config = random_config(alphabet, 3, stepping, seed=7)
+    enigma = create_enigma(config, "HAD", ["AB"])
+    keystream = Keystream.build(enigma)
+    text = ''.join(random.Random(2).choice(alphabet) for _ in range(3 * keystream.length))
+
+    if keystream.periodic:
+        assert keystream.encode_text(text) == enigma.encode_text(text)
+    else:
+        assert stepping == "double_step"
+        with pytest.raises(ValueError):
+            keystream.encode_text(text)
+        assert keystream.encode_text(text[:keystream.length]) == enigma.encode_text(text[:keystream.length])
+
+
+def test_keystream_cached_is_memory_mapped(tmp_path):
+    """ Проверяет, что поток сохраняется в файл ключа, открывается через mmap,
+        а при передаче в другой процесс передается путь, а не перестановки. """
+    enigma = create_enigma(load_config("config.json"), "АБВ", ["АБ"])
+    first = keystream_cached(enigma, str(tmp_path))
+    second = keystream_cached(enigma, str(tmp_path))
+    other = keystream_cached(create_enigma(load_config("config.json"), "АБГ", ["АБ"]), str(tmp_path))
+
+    assert len(os.listdir(tmp_path)) == 2
+    assert isinstance(second.permutations, np.memmap)
+    assert len(pickle.dumps(second)) < second.permutations.nbytes // 100
+    text = "ОДИН КЛЮЧ МНОГО СООБЩЕНИЙ"
+    expected = enigma.encode_text(text)
+    assert first.encode_text(text) == pickle.loads(pickle.dumps(second)).encode_text(text) == expected
+    assert other.encode_text(text) != expected
+
+
+def test_run_jobs_with_keystream(tmp_path):
+    """ Проверяет, что задания с каталогом потоков перестановок дают те же результаты. """
+    config = load_config("config.json")
+    jobs = [{"id": i, "positions": "АБВ" if i % 2 else "ВБА", "plugboard": "АБ", "text": f"СООБЩЕНИЕ {i}"}
+            for i in range(6)]
+    source = io.StringIO(''.join(json.dumps(job, ensure_ascii=False) + '\n' for job in jobs))
+    target = io.StringIO()
+
+    run_jobs(config, source, target, keystream_dir=str(tmp_path))
+
+    results = [json.loads(line)['result'] for line in target.getvalue().splitlines()]
+    assert results == [create_enigma(config, job["positions"], ["АБ"]).encode_text(job["text"]) for job in jobs]
+    assert len(os.listdir(tmp_path)) == 2
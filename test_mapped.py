@@ -0,0 +1,119 @@
+import os
+import random
+import subprocess
+import sys
+
+import pytest
+
+from enigma import create_enigma, load_config
+from mapped import encode_file
+from test_enigma import random_config
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CONFIG = os.path.join(ROOT, 'config.json')
+SYMBOLS = 'абвгдеёжзийклмнопрстуфхцчшщъыьэюяАБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ   .,\nabcéß€—'
+
+
+def engines():
+    """ Скалярный движок и движок NumPy, если он установлен. """
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return [False]
+    return [False, True]
+
+
+def make_text(size, seed=0):
+    """ Генерирует текст из кириллицы, латиницы, знаков препинания и многобайтовых символов. """
+    rng = random.Random(seed)
+    return ''.join(rng.choices(SYMBOLS, k=size))
+
+
+def expected_file(enigma, text):
+    """ Ожидаемый результат: как encode_text, но ß (при переводе в верхний регистр
+        меняет длину) копируется без изменений. """
+    return 'ß'.join(enigma.encode_text(part) for part in text.split('ß')).encode('utf-8')
+
+
+@pytest.mark.parametrize("batch", engines())
+@pytest.mark.parametrize("window", [1, 4096, 1 << 20])
+def test_encode_file_matches_encode_text(tmp_path, batch, window):
+    """ Проверяет, что кодирование через mmap совпадает с encode_text при любом размере
+        окна, в том числе когда граница окна приходится на многобайтовый символ. """
+    config = load_config(CONFIG)
+    text = make_text(20000)
+    source = tmp_path / "in.txt"
+    target = tmp_path / "out.txt"
+    source.write_text(text, encoding='utf-8')
+
+    enigma = create_enigma(config, "АБВ", ["АБ", "ВГ"])
+    encode_file(enigma, str(source), str(target), batch=batch, window=window)
+
+    reference = create_enigma(config, "АБВ", ["АБ", "ВГ"])
+    assert target.read_bytes() == expected_file(reference, text)
+    assert [rotor.position for rotor in enigma.rotors] == [rotor.position for rotor in reference.rotors]
+
+
+@pytest.mark.parametrize("batch", engines())
+@pytest.mark.parametrize("stepping", ["legacy", "odometer", "double_step"])
+def test_encode_file_in_place(tmp_path, batch, stepping):
+    """ Проверяет кодирование на месте для всех правил поворота и обратимость. """
+    config = random_config('АБВГДЕЖЗИК', 4, stepping, seed=7)
+    text = ''.join(random.Random(1).choices('абвгдежзикАБВГДЕЖЗИК л', k=5000))
+    path = tmp_path / "data.txt"
+    path.write_text(text, encoding='utf-8')
+
+    encode_file(create_enigma(config, "АБВГ", ["АБ"]), str(path), batch=batch, window=4096)
+    assert path.read_bytes() == expected_file(create_enigma(config, "АБВГ", ["АБ"]), text)
+
+    encode_file(create_enigma(config, "АБВГ", ["АБ"]), str(path), batch=batch)
+    assert path.read_text(encoding='utf-8') == text.upper()
+
+
+@pytest.mark.parametrize("batch", engines())
+def test_encode_file_invalid_bytes(tmp_path, batch):
+    """ Проверяет, что некорректные последовательности UTF-8 и пустой файл копируются без изменений. """
+    config = load_config(CONFIG)
+    source = tmp_path / "in.bin"
+    target = tmp_path / "out.bin"
+    source.write_bytes(b'\xc1\xa1 \xd0 \xff' + "привет".encode('utf-8') + b'\xd0')
+    encode_file(create_enigma(config, "АБВ", []), str(source), str(target), batch=batch)
+    encoded = create_enigma(config, "АБВ", []).encode_text("ПРИВЕТ").encode('utf-8')
+    assert target.read_bytes() == b'\xc1\xa1 \xd0 \xff' + encoded + b'\xd0'
+
+    source.write_bytes(b'')
+    encode_file(create_enigma(config, "АБВ", []), str(source), str(target), batch=batch)
+    assert target.read_bytes() == b''
+
+
+def test_encode_file_requires_two_byte_alphabet(tmp_path):
+    """ Проверяет, что алфавит не из двухбайтовых символов отклоняется. """
+    path = tmp_path / "data.txt"
+    path.write_text("ABC", encoding='utf-8')
+    enigma = create_enigma(random_config('ABCDEFGH', 3, 'legacy', seed=1), "ABC", [])
+    with pytest.raises(ValueError, match="двухбайтовых"):
+        encode_file(enigma, str(path))
+
+
+def test_cli_mmap(tmp_path):
+    """ Проверяет режимы --mmap и --in-place командной строки, в том числе --output, совпадающий с --input. """
+    text = make_text(3000, seed=5).replace('ß', '')
+    source = tmp_path / "in.txt"
+    target = tmp_path / "out.txt"
+    source.write_text(text, encoding='utf-8')
+    command = [sys.executable, os.path.join(ROOT, 'main.py'), '--config', CONFIG, '--no-config-cache',
+               '--positions', 'АБВ', '--plugboard', 'АБ', '--input', str(source), '--mmap']
+
+    subprocess.run(command + ['--output', str(target)], check=True, capture_output=True)
+    expected = create_enigma(load_config(CONFIG), "АБВ", ["АБ"]).encode_text(text)
+    assert target.read_text(encoding='utf-8') == expected
+
+    subprocess.run(command + ['--in-place'], check=True, capture_output=True)
+    assert source.read_text(encoding='utf-8') == expected
+
+    # --output, совпадающий с --input, кодирует на месте, а не обнуляет файл
+    subprocess.run(command + ['--output', str(source)], check=True, capture_output=True)
+    assert source.read_text(encoding='utf-8') == create_enigma(load_config(CONFIG), "АБВ", ["АБ"]).encode_text(expected)
+
+    result = subprocess.run(command + ['--workers', '2'], capture_output=True, text=True)
+    assert result.returncode == 1
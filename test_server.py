@@ -0,0 +1,47 @@
+import asyncio
+import json
+
+import pytest
+
+from enigma import create_enigma, load_config
+from server import EnigmaServer
+
+
+@pytest.mark.parametrize("workers", [0, 1])
+def test_server_pipelined_requests(workers):
+    """ Проверяет, что сервер отвечает на конвейерные запросы одного соединения в порядке их
+        поступления, результаты совпадают с create_enigma, ошибочные запросы не прерывают
+        соединение, а статистика учитывает запросы. """
+    config = load_config("config.json")
+
+    async def scenario():
+        server = EnigmaServer({'default': config}, workers=workers, concurrency=4)
+        tcp = await asyncio.start_server(server.handle_connection, '127.0.0.1', 0)
+        port = tcp.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            requests = [
+                {"id": i, "op": "encrypt", "positions": "АБВ", "plugboard": "АБ", "text": "ПРИВЕТ " * i}
+                for i in range(1, 11)
+            ]
+            requests.append({"id": "rings", "op": "encrypt", "positions": "АБВ", "rings": [40, 0, 0], "text": "ТЕСТ"})
+            requests.append({"id": "bad", "op": "encrypt", "text": "ТЕСТ"})
+            writer.write(b''.join(json.dumps(r, ensure_ascii=False).encode('utf-8') + b'\n' for r in requests))
+            await writer.drain()
+            responses = [json.loads(await reader.readline()) for _ in requests]
+            writer.write(b'{"id": "stats", "op": "stats"}\n')
+            responses.append(json.loads(await reader.readline()))
+            writer.close()
+            return responses
+        finally:
+            tcp.close()
+            server.close()
+
+    responses = asyncio.run(scenario())
+
+    assert [r['id'] for r in responses] == list(range(1, 11)) + ["rings", "bad", "stats"]
+    for i, response in enumerate(responses[:10], start=1):
+        assert response['result'] == create_enigma(config, "АБВ", ["АБ"]).encode_text("ПРИВЕТ " * i)
+    assert 'error' in responses[10] and 'error' in responses[11]
+    assert responses[12]['stats']['requests'] == 12
+    assert responses[12]['stats']['errors'] == 2
@@ -0,0 +1,143 @@
+import json
+import os
+import random
+import subprocess
+import sys
+
+import pytest
+
+from compiled_config import config_hash
+from enigma import create_enigma, load_config
+from tree import DEFAULT_MODE, MANIFEST, TreeEncryptor, derive_positions, main
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CONFIG = os.path.join(ROOT, 'config.json')
+
+
+def make_tree(root, count=12, seed=0):
+    """ Создает дерево текстовых файлов во вложенных каталогах. """
+    rng = random.Random(seed)
+    files = {}
+    for i in range(count):
+        path = ['', 'а', 'а/б'][i % 3] + f'/файл{i}.txt'
+        text = ''.join(rng.choices('абвгдеёжз ,.\nABC', k=rng.randint(0, 3000)))
+        full = root.joinpath(*path.strip('/').split('/'))
+        full.parent.mkdir(parents=True, exist_ok=True)
+        full.write_text(text, encoding='utf-8')
+        files[path.strip('/')] = text
+    return files
+
+
+def encryptor(positions="АБВ", secret=None, **options):
+    with open(CONFIG, 'rb') as f:
+        digest = config_hash(f.read())
+    enigma = create_enigma(load_config(CONFIG), positions, ["АБ", "ВГ"])
+    return TreeEncryptor(enigma, digest, secret, workers=2, **options)
+
+
+def test_tree_matches_encode_text(tmp_path):
+    """ Проверяет зеркальное дерево, совпадение каждого файла с encode_text и работу
+        при бюджете памяти меньше одного файла. """
+    files = make_tree(tmp_path / "src")
+    summary = encryptor(in_flight=1).run(str(tmp_path / "src"), str(tmp_path / "out"))
+
+    assert summary['encrypted'] == len(files) and summary['skipped'] == summary['failed'] == 0
+    for path, text in files.items():
+        expected = create_enigma(load_config(CONFIG), "АБВ", ["АБ", "ВГ"]).encode_text(text)
+        assert (tmp_path / "out" / path).read_text(encoding='utf-8') == expected
+    assert (tmp_path / "out" / MANIFEST).exists()
+
+
+def test_tree_keeps_unrelated_tmp_files(tmp_path):
+    """ Проверяет, что временные файлы записи не совпадают с файлами вида "имя.tmp"
+        в выходном дереве и не остаются после запуска. """
+    files = make_tree(tmp_path / "src", count=3)
+    (tmp_path / "out").mkdir()
+    (tmp_path / "out" / "файл0.txt.tmp").write_text("чужой файл", encoding='utf-8')
+    encryptor().run(str(tmp_path / "src"), str(tmp_path / "out"))
+
+    assert (tmp_path / "out" / "файл0.txt.tmp").read_text(encoding='utf-8') == "чужой файл"
+    written = sorted(str(path.relative_to(tmp_path / "out")).replace(os.sep, '/')
+                     for path in (tmp_path / "out").rglob('*') if path.is_file())
+    assert written == sorted([*files, "файл0.txt.tmp", MANIFEST])
+
+
+@pytest.mark.skipif(os.name == 'nt', reason="POSIX file modes")
+def test_tree_keeps_file_modes(tmp_path):
+    """ Проверяет, что зашифрованные файлы получают права исходных, а манифест - права
+        нового файла по umask, а не 0600 временного файла. """
+    make_tree(tmp_path / "src", count=2)
+    os.chmod(tmp_path / "src" / "файл0.txt", 0o640)
+    os.chmod(tmp_path / "src" / "а" / "файл1.txt", 0o755)
+    encryptor().run(str(tmp_path / "src"), str(tmp_path / "out"))
+
+    assert os.stat(tmp_path / "out" / "файл0.txt").st_mode & 0o777 == 0o640
+    assert os.stat(tmp_path / "out" / "а" / "файл1.txt").st_mode & 0o777 == 0o755
+    assert os.stat(tmp_path / "out" / MANIFEST).st_mode & 0o777 == DEFAULT_MODE
+
+
+def test_tree_incremental(tmp_path):
+    """ Проверяет, что повторный запуск пропускает неизмененные файлы (по времени изменения
+        или по хэшу) и шифрует измененные, удаленные из выходного дерева и файлы с другим ключом. """
+    files = make_tree(tmp_path / "src")
+    source, target = str(tmp_path / "src"), str(tmp_path / "out")
+    encryptor().run(source, target)
+
+    assert encryptor().run(source, target)['skipped'] == len(files)
+
+    touched = tmp_path / "src" / "файл0.txt"
+    os.utime(touched, ns=(0, touched.stat().st_mtime_ns + 10 ** 9))
+    changed = tmp_path / "src" / "а" / "файл1.txt"
+    changed.write_text("новый текст", encoding='utf-8')
+    os.remove(tmp_path / "out" / "а" / "б" / "файл2.txt")
+    runner = encryptor()
+    summary = runner.run(source, target)
+    encrypted = sorted(result['path'] for result in runner.results if result['status'] == 'encrypted')
+    assert encrypted == ["а/б/файл2.txt", "а/файл1.txt"]
+    assert summary['skipped'] == len(files) - 2
+    expected = create_enigma(load_config(CONFIG), "АБВ", ["АБ", "ВГ"]).encode_text("новый текст")
+    assert (tmp_path / "out" / "а" / "файл1.txt").read_text(encoding='utf-8') == expected
+
+    # После пропуска по хэшу время изменения обновлено в манифесте
+    assert encryptor().run(source, target)['skipped'] == len(files)
+    assert encryptor(positions="ВГД").run(source, target)['encrypted'] == len(files)
+
+
+def test_tree_derived_keys(tmp_path):
+    """ Проверяет позиции, выведенные из секрета для каждого файла, и расшифровку повторным запуском. """
+    files = make_tree(tmp_path / "src")
+    encryptor(secret=b'secret').run(str(tmp_path / "src"), str(tmp_path / "out"))
+    encryptor(secret=b'secret').run(str(tmp_path / "out"), str(tmp_path / "back"))
+
+    alphabet = create_enigma(load_config(CONFIG), "АБВ", []).alphabet
+    for path, text in files.items():
+        positions = ''.join(alphabet[p] for p in derive_positions(b'secret', path, alphabet, 3))
+        expected = create_enigma(load_config(CONFIG), positions, ["АБ", "ВГ"]).encode_text(text)
+        assert (tmp_path / "out" / path).read_text(encoding='utf-8') == expected
+        assert (tmp_path / "back" / path).read_text(encoding='utf-8') == text.upper()
+    assert len({derive_positions(b'secret', path, alphabet, 3) for path in files}) > 1
+
+
+def test_cli_tree(tmp_path):
+    """ Проверяет подкоманду tree: отчет JSON и ненулевой код возврата при файле не в UTF-8. """
+    files = make_tree(tmp_path / "src", count=4)
+    (tmp_path / "src" / "bad.bin").write_bytes(b'\xff\xfe')
+    report = tmp_path / "report.json"
+    result = subprocess.run([sys.executable, os.path.join(ROOT, 'main.py'), 'tree', '--config', CONFIG,
+                             '--source', str(tmp_path / "src"), '--target', str(tmp_path / "out"),
+                             '--positions', 'абв', '--workers', '2', '--report', str(report)],
+                            capture_output=True, text=True)
+    assert result.returncode == 1
+    assert "bad.bin: ошибка" in result.stdout
+
+    data = json.loads(report.read_text(encoding='utf-8'))
+    assert data['total']['encrypted'] == len(files) and data['total']['failed'] == 1
+    statuses = {entry['path']: entry['status'] for entry in data['files']}
+    assert statuses == {**dict.fromkeys(files, 'encrypted'), 'bad.bin': 'failed'}
+    assert not (tmp_path / "out" / "bad.bin").exists()
+
+
+def test_cli_tree_requires_key(tmp_path):
+    """ Проверяет, что без --positions и --key-file подкоманда завершается с ошибкой. """
+    with pytest.raises(SystemExit):
+        main(['--source', str(tmp_path), '--target', str(tmp_path / "out")])
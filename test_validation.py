@@ -0,0 +1,76 @@
+import io
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+from enigma import create_enigma, encode_stream, load_config
+from main import validate_text
+from validation import Normalizer, normalize_stream, normalize_text
+
+ALPHABET = 'АБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ'
+
+
+@pytest.mark.parametrize("text,unknown,expected", [
+    ("привет мир", 'reject', ("ПРИВЕТ МИР", None)),
+    ("привет, мир!", 'reject', ("ПРИВЕТ, МИР!", 6)),
+    ("привет, мир!", 'strip', ("ПРИВЕТ МИР", 6)),
+    ("привет, мир!", 'pass', ("ПРИВЕТ, МИР!", 6)),
+    ("", 'strip', ("", None)),
+])
+def test_normalize_text(text, unknown, expected):
+    """ Проверяет нормализацию текста и позицию первого недопустимого символа для всех политик. """
+    assert normalize_text(text, ALPHABET, unknown) == expected
+
+
+def test_validate_text_matches_character_loop():
+    """ Проверяет, что validate_text отклоняет те же символы, что и посимвольная проверка,
+        и не переводит текст в верхний регистр. """
+    for text in ("ПРИВЕТ МИР", "ПРИВЕТ\nМИР", "ПРИВЕТ мир", "[ПРИВЕТ]", "Ё Й Ъ"):
+        expected = next((char for char in text if char not in ALPHABET and char != ' '), None)
+        if expected is None:
+            assert validate_text(text, ALPHABET) == text
+        else:
+            with pytest.raises(ValueError, match=re.escape(f"Недопустимый символ в тексте: {expected}")):
+                validate_text(text, ALPHABET)
+    assert validate_text("ПРИВЕТ, МИР", ALPHABET, 'strip') == "ПРИВЕТ МИР"
+
+
+def test_normalize_stream_positions():
+    """ Проверяет, что при потоковой проверке позиция ошибки отсчитывается от начала потока. """
+    assert ''.join(normalize_stream(["при", "вет, ", "мир"], ALPHABET, 'strip')) == "ПРИВЕТ МИР"
+    with pytest.raises(ValueError, match="позиция 6"):
+        list(normalize_stream(["при", "вет, ", "мир"], ALPHABET))
+
+
+def test_encode_stream_with_normalizer():
+    """ Проверяет, что encode_stream удаляет недопустимые символы до кодирования. """
+    config = load_config("config.json")
+    source = io.BytesIO("Привет, мир!\n".encode('utf-8') * 100)
+    target = io.BytesIO()
+    normalizer = Normalizer(ALPHABET, 'strip', allowed=' \n')
+
+    encode_stream(create_enigma(config, "АБВ", []), source, target, chunk_size=7, normalizer=normalizer)
+
+    expected = create_enigma(config, "АБВ", []).encode_text("ПРИВЕТ МИР\n" * 100)
+    assert target.getvalue().decode('utf-8') == expected
+
+
+@pytest.mark.parametrize("unknown", ["strip", "reject"])
+def test_cli_stream_unknown(tmp_path, unknown):
+    """ Проверяет режим --input/--output с --unknown strip и reject. """
+    source = tmp_path / "in.txt"
+    target = tmp_path / "out.txt"
+    source.write_text("Привет, мир!\n", encoding='utf-8')
+    result = subprocess.run([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py'),
+                             '--config', 'config.json', '--positions', 'АБВ', '--input', str(source),
+                             '--output', str(target), '--unknown', unknown], capture_output=True, text=True)
+    if unknown == 'strip':
+        assert result.returncode == 0, result.stderr
+        expected = create_enigma(load_config("config.json"), "АБВ", []).encode_text("ПРИВЕТ МИР\n")
+        assert target.read_text(encoding='utf-8') == expected
+    else:
+        assert result.returncode == 1
+        assert "Ошибка" in result.stderr and "NameError" not in result.stderr
@@ -0,0 +1,105 @@
+import random
+
+import pytest
+
+from enigma import Enigma, Rotor, Reflector, load_config
+
+np = pytest.importorskip("numpy")
+
+ALPHABET = 'АБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ'
+
+
+def make_enigma(plugboard=None, notches=(16, 4, 21)):
+    """ Создает машину Энигма по config.json с заданными зазорами и коммутационной панелью. """
+    config = load_config("config.json")
+    rotors = [Rotor(r['wiring'], notch) for r, notch in zip(config['rotors'], notches)]
+    return Enigma(rotors, Reflector(config['reflector']['wiring']), plugboard or {})
+
+
+@pytest.mark.parametrize("positions,rings", [
+    ("АБВ", (0, 0, 0)),
+    ("ЯЯЯ", (3, 17, 32)),
+    ("ДЁФ", (1, 0, 5)),
+])
+def test_batch_matches_scalar(positions, rings):
+    """ Проверяет, что векторизованный движок дает тот же результат и то же конечное
+        положение роторов, что и посимвольное кодирование, включая символы вне алфавита. """
+    rng = random.Random(positions)
+    text = ''.join(rng.choice(ALPHABET + ALPHABET.lower() + " .,!123\nQ") for _ in range(5000))
+    plugboard = {0: 5, 5: 0, 10: 32, 32: 10}
+
+    scalar = make_enigma(plugboard)
+    batch = make_enigma(plugboard)
+    for machine in (scalar, batch):
+        for rotor, ring in zip(machine.rotors, rings):
+            rotor.ring_setting = ring
+        machine.set_rotor_positions(positions)
+
+    assert batch.encode_text(text, batch=True) == scalar.encode_text(text)
+    assert [r.position for r in batch.rotors] == [r.position for r in scalar.rotors]
+
+
+def test_batch_without_letters():
+    """ Проверяет, что текст без букв алфавита возвращается без изменений и не поворачивает роторы. """
+    enigma = make_enigma()
+    enigma.set_rotor_positions("АБВ")
+    assert enigma.encode_text("123 abc", batch=True) == "123 ABC"
+    assert [r.position for r in enigma.rotors] == [0, 1, 2]
+
+
+def test_batch_lone_surrogate():
+    """ Проверяет, что одиночный суррогат (например, из surrogateescape) передается без изменений
+        обоими движками. """
+    text = "ПРИВЕТ \udcff МИР"
+    scalar, batch = make_enigma(), make_enigma()
+    for machine in (scalar, batch):
+        machine.set_rotor_positions("АБВ")
+    result = scalar.encode_text(text)
+    assert batch.encode_text(text, batch=True) == result
+    assert result[7] == "\udcff"
+
+
+@pytest.mark.parametrize("stepping", ["legacy", "odometer", "double_step"])
+def test_batch_matches_scalar_n_rotors(stepping):
+    """ Проверяет векторизованный движок на машине из пяти роторов с латинским алфавитом. """
+    from test_enigma import random_config
+    from enigma import create_enigma
+
+    config = random_config('ABCDEFGHIJKLMNOPQRSTUVWXYZ', 5, stepping, seed=stepping)
+    text = ''.join(random.Random(stepping).choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ .,") for _ in range(20000))
+    scalar = create_enigma(config, "QWERT", ["AZ", "BY"])
+    batch = create_enigma(config, "QWERT", ["AZ", "BY"])
+
+    assert batch.encode_text(text, batch=True) == scalar.encode_text(text)
+    assert [r.position for r in batch.rotors] == [r.position for r in scalar.rotors]
+
+
+@pytest.mark.parametrize("stepping", ["legacy", "odometer", "double_step"])
+def test_encode_messages_matches_scalar(stepping):
+    """ Проверяет пакет сообщений разной длины с разными позициями, кольцами и коммутационными
+        панелями, включая пустые сообщения и сообщения без букв алфавита. """
+    from test_enigma import random_config
+    from enigma import create_enigma
+    from vectorized import encode_messages, plugboard_rows
+
+    alphabet = 'АБВГДЕЖЗИК'
+    config = random_config(alphabet, 4, stepping, seed=11)
+    rng = random.Random(stepping)
+    texts = [''.join(rng.choices(alphabet + alphabet.lower() + " .,ßQ", k=rng.randint(0, 200))) for _ in range(100)]
+    texts += ["", "123 ...", "ß"]
+    keys = [''.join(rng.choices(alphabet, k=4)) for _ in texts]
+    plugboards = [rng.choice([[], ["АБ"], ["ВК", "ГД"]]) for _ in texts]
+    rings = [[rng.randrange(len(alphabet)) for _ in range(4)] for _ in texts]
+
+    expected = []
+    for text, key, plugboard, ring in zip(texts, keys, plugboards, rings):
+        enigma = create_enigma(config, key, plugboard)
+        enigma.set_ring_settings(ring)
+        expected.append(enigma.encode_text(text))
+
+    enigma = create_enigma(config, "АААА", [])
+    dicts = [create_enigma(config, key, plugboard).plugboard for key, plugboard in zip(keys, plugboards)]
+    positions = [[alphabet.index(char) for char in key] for key in keys]
+    assert encode_messages(enigma, texts, positions, plugboard_rows(dicts, len(alphabet)), rings) == expected
+    assert [rotor.position for rotor in enigma.rotors] == [0, 0, 0, 0]
+    assert encode_messages(enigma, [], []) == []
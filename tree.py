@@ -0,0 +1,404 @@
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from stat import S_IMODE
+
+from compiled_config import config_hash
+from enigma import ALPHABET, create_enigma, load_config
+from parallel import ParallelEncoder
+
+MANIFEST = '.enigma-manifest.json'
+VERSION = 1
+# Примерный бюджет памяти на файлы, одновременно находящиеся в обработке
+IN_FLIGHT = 256 << 20
+# Пиковая память на байт файла в обработке: исходные байты, строка и ее копия в
+# рабочем процессе, массив UTF-32 (4 байта на символ), результат в str и bytes
+FOOTPRINT = 8
+
+# Права новых файлов по умолчанию (0o666 с учетом umask процесса)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+DEFAULT_MODE = 0o666 & ~_UMASK
+
+
+def derive_positions(secret, path, alphabet, count):
+    """
+    Выводит позиции роторов файла из секрета и относительного пути (HMAC-SHA256).
+
+    Один и тот же секрет дает для файла одни и те же позиции, поэтому повторный запуск
+    на зашифрованном дереве расшифровывает его.
+
+    Параметры:
+        secret (bytes): Секрет.
+
+        path (str): Путь файла относительно корня дерева (с "/").
+
+        alphabet (str): Алфавит машины.
+
+        count (int): Количество роторов.
+
+    Возвращает:
+        tuple: Индексы позиций роторов.
+    """
+    value = int.from_bytes(hmac.new(secret, path.encode('utf-8'), hashlib.sha256).digest(), 'big')
+    positions = []
+    for _ in range(count):
+        value, position = divmod(value, len(alphabet))
+        positions.append(position)
+    return tuple(positions)
+
+
+class ByteBudget:
+    """
+    Ограничение объема данных в обработке: acquire ждет, пока освободится место.
+
+    Запрос больше всего бюджета выполняется, когда в обработке ничего нет.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, size):
+        with self._condition:
+            while self.used and self.used + size > self.limit:
+                self._condition.wait()
+            self.used += size
+
+    def release(self, size):
+        with self._condition:
+            self.used -= size
+            self._condition.notify_all()
+
+
+def load_manifest(path):
+    """
+    Читает манифест обработанных файлов.
+
+    Параметры:
+        path (str): Путь к манифесту.
+
+    Возвращает:
+        dict: Записи по относительным путям; пустой словарь, если манифеста нет
+            или он другой версии.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {}
+    if manifest.get('version') != VERSION:
+        return {}
+    return manifest['files']
+
+
+def save_manifest(path, files):
+    """
+    Атомарно записывает манифест обработанных файлов.
+
+    Параметры:
+        path (str): Путь к манифесту.
+
+        files (dict): Записи по относительным путям.
+    """
+    manifest = json.dumps({'version': VERSION, 'files': files}, ensure_ascii=False, indent=1, sort_keys=True)
+    write_atomic(path, manifest.encode('utf-8'))
+
+
+def write_atomic(path, data, mode=DEFAULT_MODE):
+    """
+    Записывает файл целиком или не записывает вовсе.
+
+    Данные пишутся во временный файл с уникальным именем в том же каталоге, который
+    затем заменяет path, поэтому параллельные записи не мешают друг другу. Временный
+    файл создается с правами 0600, поэтому перед заменой ему назначаются права mode.
+
+    Параметры:
+        path (str): Путь к файлу.
+
+        data (bytes): Содержимое файла.
+
+        mode (int): Права файла; по умолчанию - как у нового файла с учетом umask.
+    """
+    directory, name = os.path.split(path)
+    f = tempfile.NamedTemporaryFile(dir=directory or '.', prefix=f'.{name}.', suffix='.tmp', delete=False)
+    try:
+        with f:
+            f.write(data)
+        os.chmod(f.name, mode)
+        os.replace(f.name, path)
+    except BaseException:
+        try:
+            os.remove(f.name)
+        except OSError:
+            pass
+        raise
+
+
+def walk_files(source, exclude=None):
+    """
+    Перечисляет файлы дерева в порядке обхода с сортировкой имен.
+
+    Параметры:
+        source (str): Корень дерева.
+
+        exclude (str): Каталог, который не обходится (например, выходное дерево внутри исходного).
+
+    Возвращает:
+        generator: Пары из относительного пути (с "/") и полного пути.
+    """
+    exclude = os.path.realpath(exclude) if exclude is not None else None
+    for directory, directories, files in os.walk(source):
+        directories[:] = sorted(name for name in directories
+                                if os.path.realpath(os.path.join(directory, name)) != exclude)
+        for name in sorted(files):
+            full = os.path.join(directory, name)
+            yield os.path.relpath(full, source).replace(os.sep, '/'), full
+
+
+class TreeEncryptor:
+    """
+    Шифрует дерево каталогов в зеркальное выходное дерево.
+
+    Чтение и запись файлов выполняются на пуле потоков, шифрование - на пуле процессов
+    (parallel.ParallelEncoder),
+    так что ввод-вывод одних файлов перекрывается с шифрованием других. Объем файлов в
+    обработке ограничен (ByteBudget): каждый файл занимает в бюджете FOOTPRINT байт на
+    байт содержимого, и обход дерева останавливается, пока записанные файлы не
+    освободят место. Манифест хранит размер, время изменения и SHA-256
+    каждого исходного файла вместе с отпечатком ключа, поэтому повторный запуск
+    пропускает неизмененные файлы, не читая их.
+
+    Атрибуты:
+        enigma (Enigma): Машина Enigma с общим ключом или позициями по умолчанию.
+
+        secret (bytes): Секрет для вывода позиций каждого файла; None - общий ключ.
+
+        results (list): Отчет по файлам: путь, состояние, размер, время.
+    """
+
+    def __init__(self, enigma, config_digest, secret=None, workers=None, io_threads=None, in_flight=IN_FLIGHT,
+                 batch=False):
+        self.enigma = enigma
+        self.secret = secret
+        self.workers = workers or os.cpu_count()
+        self.io_threads = io_threads or 2 * self.workers
+        self.budget = ByteBudget(in_flight)
+        self.batch = batch
+        self.results = []
+        self._config_digest = config_digest
+        self._lock = threading.Lock()
+        self._manifest = {}
+
+    def positions(self, path):
+        """
+        Возвращает позиции роторов для файла.
+        """
+        if self.secret is None:
+            return tuple(rotor.position for rotor in self.enigma.rotors)
+        return derive_positions(self.secret, path, self.enigma.alphabet, len(self.enigma.rotors))
+
+    def key_id(self):
+        """
+        Отпечаток ключа для манифеста: конфигурация, кольца, коммутационная панель и
+        общие позиции роторов или секрет, из которого выводятся позиции файлов.
+        """
+        plugboard = sorted(self.enigma.plugboard.items())
+        rings = [rotor.ring_setting for rotor in self.enigma.rotors]
+        if self.secret is None:
+            key = repr((self.positions(None), rings, plugboard)).encode('utf-8')
+        else:
+            key = repr((rings, plugboard)).encode('utf-8') + self.secret
+        return hashlib.sha256(self._config_digest + key).hexdigest()
+
+    def run(self, source, target, manifest_path=None, report=None):
+        """
+        Шифрует все файлы дерева source в дерево target.
+
+        Параметры:
+            source (str): Исходный каталог.
+
+            target (str): Выходной каталог (создается при необходимости).
+
+            manifest_path (str): Путь к манифесту; None - файл MANIFEST в target.
+
+            report: Функция, вызываемая с записью отчета по каждому файлу.
+
+        Возвращает:
+            dict: Итоги: количество зашифрованных, пропущенных и ошибочных файлов,
+                байты и пропускная способность.
+        """
+        manifest_path = manifest_path or os.path.join(target, MANIFEST)
+        manifest_real = os.path.realpath(manifest_path)
+        os.makedirs(target, exist_ok=True)
+        previous = load_manifest(manifest_path)
+        self._manifest = {}
+        self.results = []
+        key_id = self.key_id()
+        started = time.perf_counter()
+        try:
+            with ParallelEncoder(self.enigma, self.workers) as encoder, ThreadPoolExecutor(self.io_threads) as threads:
+                futures = []
+                for path, full in walk_files(source, exclude=target):
+                    if os.path.realpath(full) == manifest_real:
+                        continue
+                    try:
+                        stat = os.stat(full)
+                    except OSError as e:
+                        self._finish(path, previous.get(path), 'failed', error=str(e), report=report)
+                        continue
+                    entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'key': key_id}
+                    output = os.path.join(target, *path.split('/'))
+                    known = previous.get(path)
+                    if known is not None and os.path.exists(output) and all(
+                            known.get(field) == entry[field] for field in ('size', 'mtime_ns', 'key')):
+                        self._finish(path, dict(known), 'skipped', report=report)
+                        continue
+                    self.budget.acquire(stat.st_size * FOOTPRINT)
+                    futures.append(threads.submit(self._process, encoder, path, full, output, self.positions(path),
+                                                  S_IMODE(stat.st_mode), entry, known, report))
+                for future in futures:
+                    future.result()
+        finally:
+            save_manifest(manifest_path, self._manifest)
+        return self.summary(time.perf_counter() - started)
+
+    def _process(self, encoder, path, full, output, positions, mode, entry, known, report):
+        """
+        Читает, шифрует и записывает один файл с правами исходного (выполняется на пуле потоков).
+        """
+        started = time.perf_counter()
+        try:
+            with open(full, 'rb') as f:
+                data = f.read()
+            entry['sha256'] = hashlib.sha256(data).hexdigest()
+            if known is not None and os.path.exists(output) and known.get('sha256') == entry['sha256'] \
+                    and known.get('key') == entry['key']:
+                # Время изменения другое, содержимое то же
+                self._finish(path, entry, 'skipped', report=report)
+                return
+            text = data.decode('utf-8')
+            encrypt_started = time.perf_counter()
+            encrypted = encoder.submit(positions, text, self.batch).result().encode('utf-8')
+            seconds = time.perf_counter() - encrypt_started
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+            write_atomic(output, encrypted, mode)
+            self._finish(path, entry, 'encrypted', time.perf_counter() - started, seconds, report)
+        except (OSError, UnicodeDecodeError) as e:
+            self._finish(path, known, 'failed', time.perf_counter() - started, error=str(e), report=report)
+        finally:
+            self.budget.release(entry['size'] * FOOTPRINT)
+
+    def _finish(self, path, entry, status, seconds=0.0, encrypt_seconds=0.0, report=None, error=None):
+        """
+        Записывает результат файла в манифест и отчет.
+        """
+        result = {'path': path, 'status': status, 'bytes': entry['size'] if entry else 0,
+                  'seconds': seconds, 'encrypt_seconds': encrypt_seconds}
+        if error is not None:
+            result['error'] = error
+        with self._lock:
+            if entry is not None:
+                self._manifest[path] = entry
+            self.results.append(result)
+            if report is not None:
+                report(result)
+
+    def summary(self, seconds):
+        """
+        Подводит итоги обработки дерева.
+
+        Параметры:
+            seconds (float): Время обработки дерева.
+
+        Возвращает:
+            dict: Количество файлов по состояниям, байты зашифрованных файлов, время
+                и пропускная способность в байтах в секунду.
+        """
+        counts = {'encrypted': 0, 'skipped': 0, 'failed': 0}
+        encrypted = 0
+        for result in self.results:
+            counts[result['status']] += 1
+            if result['status'] == 'encrypted':
+                encrypted += result['bytes']
+        return dict(counts, bytes=encrypted, seconds=seconds,
+                    bytes_per_second=encrypted / seconds if seconds else 0.0)
+
+
+def format_result(result):
+    """
+    Форматирует строку отчета по файлу.
+    """
+    if result['status'] == 'skipped':
+        return f"{result['path']}: без изменений"
+    if result['status'] == 'failed':
+        return f"{result['path']}: ошибка: {result['error']}"
+    rate = result['bytes'] / result['seconds'] / 1e6 if result['seconds'] else 0.0
+    return f"{result['path']}: {result['bytes']} байт за {result['seconds']:.3f} с ({rate:.1f} МБ/с)"
+
+
+def main(argv=None):
+    """
+    Точка входа подкоманды tree: шифрование дерева каталогов.
+
+    Параметры:
+        argv (list): Аргументы командной строки без имени подкоманды.
+    """
+    parser = argparse.ArgumentParser(prog='main.py tree', description='Encrypt a directory tree into a mirrored tree')
+    parser.add_argument('--config', help='Path to configuration file', default='config.json')
+    parser.add_argument('--source', help='Directory with plaintext files', required=True)
+    parser.add_argument('--target', help='Directory for encrypted files', required=True)
+    key = parser.add_mutually_exclusive_group(required=True)
+    key.add_argument('--positions', help='Rotor positions for all files (one letter per rotor)')
+    key.add_argument('--key-file', help='Derive per-file rotor positions from the secret in this file')
+    parser.add_argument('--plugboard', help='Plugboard settings (pairs of letters)', default='')
+    parser.add_argument('--workers', help='Encryption processes', type=int)
+    parser.add_argument('--io-threads', help='Threads reading and writing files', type=int)
+    parser.add_argument('--in-flight', help='Approximate memory for files being processed at once (MB)', type=int,
+                        default=IN_FLIGHT >> 20)
+    parser.add_argument('--manifest', help=f'Manifest file (default: {MANIFEST} in the target directory)')
+    parser.add_argument('--report', help='Write a JSON report with per-file and total throughput to FILE')
+    parser.add_argument('--quiet', help='Print only the totals', action='store_true')
+    parser.add_argument('--batch', help='Use the vectorized NumPy engine', action='store_true')
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    try:
+        with open(args.config, 'rb') as f:
+            digest = config_hash(f.read())
+        secret = None
+        if args.key_file is not None:
+            with open(args.key_file, 'rb') as f:
+                secret = f.read()
+        # С --key-file позиции выводятся для каждого файла
+        positions = args.positions.upper() if args.positions \
+            else config.get('alphabet', ALPHABET)[0] * len(config['rotors'])
+        if len(positions) != len(config['rotors']):
+            raise ValueError(f"Необходимо указать {len(config['rotors'])} начальные позиции роторов.")
+        enigma = create_enigma(config, positions, args.plugboard.upper().split())
+        if not os.path.isdir(args.source):
+            raise ValueError(f"Каталог {args.source} не найден.")
+        encryptor = TreeEncryptor(enigma, digest, secret, args.workers, args.io_threads, args.in_flight << 20,
+                                  args.batch)
+        report = None if args.quiet else lambda result: print(format_result(result), flush=True)
+        summary = encryptor.run(args.source, args.target, args.manifest, report)
+    except (OSError, ValueError) as e:
+        print(f"Ошибка: {e}")
+        sys.exit(1)
+
+    rate = summary['bytes_per_second'] / 1e6
+    print(f"Зашифровано файлов: {summary['encrypted']}, без изменений: {summary['skipped']}, "
+          f"с ошибками: {summary['failed']}; {summary['bytes']} байт за {summary['seconds']:.2f} с ({rate:.1f} МБ/с)")
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({'files': encryptor.results, 'total': summary}, f, ensure_ascii=False, indent=2)
+    if summary['failed']:
+        sys.exit(1)
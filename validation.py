@@ -0,0 +1,129 @@
+import re
+
+from enigma import ALPHABET
+
+# Что делать с символами вне алфавита и списка допустимых:
+#   reject - сообщить о первом таком символе;
+#   strip  - удалить их;
+#   pass   - оставить без изменений (Enigma передает их без шифрования).
+POLICIES = ('reject', 'strip', 'pass')
+
+
+class Normalizer:
+    """
+    Проверка и нормализация текста за один проход на уровне C.
+
+    Вместо поиска каждого символа в строке алфавита текст переводится в верхний
+    регистр, и скомпилированный класс символов [^алфавит] находит первый неизвестный
+    символ (или удаляет все неизвестные) одним проходом. Для потоковой обработки
+    используется feed, позиции при этом отсчитываются от начала потока.
+
+    Атрибуты:
+        alphabet (str): Алфавит машины.
+
+        unknown (str): Политика для неизвестных символов (см. POLICIES).
+
+        allowed (str): Дополнительно допустимые символы вне алфавита.
+
+        upper (bool): Переводить текст в верхний регистр.
+
+        position (int): Количество символов, переданных в feed.
+    """
+
+    def __init__(self, alphabet=ALPHABET, unknown='reject', allowed=' ', upper=True):
+        if unknown not in POLICIES:
+            raise ValueError(f"Неизвестная политика для символов вне алфавита: {unknown}")
+        self.alphabet = alphabet
+        self.unknown = unknown
+        self.allowed = allowed
+        self.upper = upper
+        self.position = 0
+        self._unknown = re.compile('[^' + ''.join(map(re.escape, alphabet + allowed)) + ']')
+
+    def normalize(self, text):
+        """
+        Нормализует текст целиком.
+
+        Параметры:
+            text (str): Текст.
+
+        Возвращает:
+            tuple: Нормализованный текст и позиция первого неизвестного символа в
+                тексте после перевода в верхний регистр (None, если таких нет). При
+                политике reject текст возвращается без удаления символов.
+        """
+        if self.upper:
+            text = text.upper()
+        match = self._unknown.search(text)
+        if match is None:
+            return text, None
+        first = match.start()
+        if self.unknown == 'strip':
+            text = text[:first] + self._unknown.sub('', text[first:])
+        return text, first
+
+    def feed(self, chunk):
+        """
+        Нормализует очередную часть потока.
+
+        Параметры:
+            chunk (str): Часть текста.
+
+        Возвращает:
+            str: Нормализованная часть.
+
+        Исключения:
+            ValueError: При политике reject, если в части есть неизвестный символ;
+                в сообщении указана позиция от начала потока.
+        """
+        if self.unknown == 'pass':
+            self.position += len(chunk)
+            return chunk.upper() if self.upper else chunk
+        text, first = self.normalize(chunk)
+        if first is not None and self.unknown == 'reject':
+            raise ValueError(f"Недопустимый символ в тексте: {text[first]} (позиция {self.position + first})")
+        self.position += len(chunk)
+        return text
+
+
+def normalize_text(text, alphabet=ALPHABET, unknown='reject', allowed=' '):
+    """
+    Переводит текст в верхний регистр и проверяет его за один проход (см. Normalizer).
+
+    Параметры:
+        text (str): Текст.
+
+        alphabet (str): Алфавит машины.
+
+        unknown (str): Политика для символов вне алфавита (см. POLICIES).
+
+        allowed (str): Дополнительно допустимые символы.
+
+    Возвращает:
+        tuple: Нормализованный текст и позиция первого недопустимого символа или None.
+    """
+    return Normalizer(alphabet, unknown, allowed).normalize(text)
+
+
+def normalize_stream(chunks, alphabet=ALPHABET, unknown='reject', allowed=' '):
+    """
+    Нормализует поток частей текста.
+
+    Параметры:
+        chunks: Итерируемый объект с частями текста.
+
+        alphabet (str): Алфавит машины.
+
+        unknown (str): Политика для символов вне алфавита (см. POLICIES).
+
+        allowed (str): Дополнительно допустимые символы.
+
+    Возвращает:
+        generator: Нормализованные части.
+
+    Исключения:
+        ValueError: При политике reject на первом недопустимом символе.
+    """
+    normalizer = Normalizer(alphabet, unknown, allowed)
+    for chunk in chunks:
+        yield normalizer.feed(chunk)
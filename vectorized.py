@@ -0,0 +1,331 @@
+from itertools import accumulate
+
+import numpy as np
+
+from enigma import UTF32, double_step_once, step_positions
+
+
+def letter_lookup(alphabet):
+    """
+    Строит таблицу перевода кодов символов в индексы алфавита.
+
+    Параметры:
+        alphabet (str): Алфавит машины.
+
+    Возвращает:
+        numpy.ndarray: Массив, где по коду символа лежит его индекс в алфавите или -1.
+    """
+    lookup = np.full(max(map(ord, alphabet)) + 1, -1, dtype=np.int16)
+    for i, char in enumerate(alphabet):
+        lookup[ord(char)] = i
+    return lookup
+
+
+def plugboard_array(enigma):
+    """
+    Преобразует коммутационную панель в плотную перестановку индексов.
+
+    Параметры:
+        enigma (Enigma): Машина Enigma.
+
+    Возвращает:
+        numpy.ndarray: Перестановка длины алфавита.
+    """
+    plug = np.arange(len(enigma.alphabet), dtype=np.intp)
+    for a, b in enigma.plugboard.items():
+        plug[a] = b
+    return plug
+
+
+def plugboard_rows(plugboards, size):
+    """
+    Преобразует коммутационные панели пакета машин в матрицу перестановок.
+
+    Параметры:
+        plugboards (list): Словари коммутационных панелей (см. enigma.build_plugboard).
+
+        size (int): Длина алфавита.
+
+    Возвращает:
+        numpy.ndarray: Перестановки формы (машины, size).
+    """
+    rows = np.tile(np.arange(size, dtype=np.intp), (len(plugboards), 1))
+    for row, plugboard in zip(rows, plugboards):
+        row[list(plugboard)] = list(plugboard.values())
+    return rows
+
+
+def rotor_tables(rotor):
+    """
+    Возвращает таблицы прямого и обратного прохода ротора в виде матриц [смещение, индекс].
+
+    Параметры:
+        rotor (Rotor): Ротор.
+
+    Возвращает:
+        tuple: Матрицы прямого и обратного прохода.
+    """
+    size = len(rotor.wiring)
+    forward = np.frombuffer(b''.join(rotor._forward), dtype=np.uint8).reshape(size, size)
+    backward = np.frombuffer(b''.join(rotor._backward), dtype=np.uint8).reshape(size, size)
+    return forward, backward
+
+
+def rotor_positions(enigma, steps):
+    """
+    Вычисляет позиции роторов после каждого из заданных количеств нажатий.
+
+    Параметры:
+        enigma (Enigma): Машина Enigma в начальном состоянии.
+
+        steps (numpy.ndarray): Количества нажатий, отсчитываемые от текущего состояния.
+
+    Возвращает:
+        tuple: Массивы позиций роторов слева направо.
+    """
+    positions = tuple(rotor.position for rotor in enigma.rotors)
+    notches = tuple(rotor.notch for rotor in enigma.rotors)
+    size = len(enigma.alphabet)
+    if enigma.stepping != 'double_step':
+        return step_positions(positions, notches, steps, size, enigma.stepping)
+    sequence = double_step_sequence(positions, notches, int(steps.max(initial=0)), size)
+    return tuple(row[steps] for row in sequence)
+
+
+def double_step_sequence(positions, notches, count, size):
+    """
+    Строит последовательность позиций роторов по правилам double_step.
+
+    Участки, на которых поворачивается только последний ротор, заполняются целиком,
+    пошагово моделируются лишь нажатия с переносом.
+
+    Параметры:
+        positions (tuple): Начальные позиции роторов.
+
+        notches (tuple): Позиции зазоров роторов.
+
+        count (int): Количество нажатий.
+
+        size (int): Количество позиций ротора.
+
+    Возвращает:
+        numpy.ndarray: Позиции роторов формы (количество роторов, count + 1),
+            столбец k - положение после k нажатий.
+    """
+    positions = list(positions)
+    last = len(positions) - 1
+    sequence = np.empty((len(positions), count + 1), dtype=np.intp)
+    sequence[:, 0] = positions
+    filled = 0
+    while filled < count:
+        middle_engaged = any((positions[i] + 1) % size == notches[i] for i in range(1, last))
+        quiet = (notches[last] - 1 - positions[last]) % size if last > 0 else count
+        if not middle_engaged and quiet > 0:
+            jump = min(quiet, count - filled)
+            sequence[:, filled + 1:filled + jump + 1] = np.asarray(positions)[:, None]
+            sequence[last, filled + 1:filled + jump + 1] = (positions[last] + np.arange(1, jump + 1)) % size
+            positions[last] = (positions[last] + jump) % size
+            filled += jump
+        else:
+            double_step_once(positions, notches, size)
+            filled += 1
+            sequence[:, filled] = positions
+    return sequence
+
+
+def message_positions(enigma, starts, steps):
+    """
+    Вычисляет позиции роторов для пакета машин с разными начальными позициями.
+
+    Для правил legacy и odometer позиции считаются по формулам step_positions сразу для
+    всех машин. Для double_step роторы всех машин поворачиваются одновременно, нажатие
+    за нажатием, до наибольшего количества нажатий в пакете.
+
+    Параметры:
+        enigma (Enigma): Машина Enigma, задающая зазоры и правила поворота.
+
+        starts (numpy.ndarray): Начальные позиции роторов, форма (машины, роторы).
+
+        steps (numpy.ndarray): Количества нажатий, форма (машины, ...).
+
+    Возвращает:
+        tuple: Массивы позиций роторов слева направо формы steps.
+    """
+    notches = tuple(rotor.notch for rotor in enigma.rotors)
+    size = len(enigma.alphabet)
+    extra = (1,) * (steps.ndim - 1)
+    if enigma.stepping != 'double_step':
+        positions = tuple(column.reshape(-1, *extra) for column in starts.T)
+        return step_positions(positions, notches, steps, size, enigma.stepping)
+
+    count = int(steps.max(initial=0))
+    positions = list(starts.T.copy())
+    sequence = np.empty((len(positions), len(starts), count + 1), dtype=np.intp)
+    sequence[:, :, 0] = starts.T
+    for k in range(1, count + 1):
+        double_step_rows(positions, notches, size)
+        sequence[:, :, k] = positions
+    rows = np.arange(len(starts)).reshape(-1, *extra)
+    return tuple(row[rows, steps] for row in sequence)
+
+
+def double_step_rows(positions, notches, size):
+    """
+    Поворачивает роторы пакета машин на одно нажатие по правилам double_step
+    (см. enigma.double_step_once).
+
+    Параметры:
+        positions (list): Массивы позиций роторов слева направо (изменяются на месте).
+
+        notches (tuple): Позиции зазоров роторов.
+
+        size (int): Количество позиций ротора.
+    """
+    engaged_right = True
+    for i in range(len(positions) - 1, -1, -1):
+        engaged = (positions[i] + 1) % size == notches[i] if i > 0 else False
+        positions[i] = (positions[i] + (engaged | engaged_right)) % size
+        engaged_right = engaged
+
+
+def encode_indices(enigma, letters, positions):
+    """
+    Кодирует массив индексов букв при заданных позициях роторов для каждой буквы.
+
+    Параметры:
+        enigma (Enigma): Машина Enigma.
+
+        letters (numpy.ndarray): Индексы букв алфавита.
+
+        positions (tuple): Массивы позиций роторов (после поворота) для каждой буквы.
+
+    Возвращает:
+        numpy.ndarray: Индексы закодированных букв.
+    """
+    size = len(enigma.alphabet)
+    plug = plugboard_array(enigma)
+    tables = [rotor_tables(rotor) for rotor in enigma.rotors]
+    offsets = [(pos - rotor.ring_setting) % size for rotor, pos in zip(enigma.rotors, positions)]
+    reflector = np.asarray(enigma.reflector.wiring, dtype=np.intp)
+
+    chars = plug[letters]
+    for (forward, _), offset in zip(reversed(tables), reversed(offsets)):
+        chars = forward[offset, chars]
+    chars = reflector[chars]
+    for (_, backward), offset in zip(tables, offsets):
+        chars = backward[offset, chars]
+    return plug[chars]
+
+
+def encode_text(enigma, text):
+    """
+    Кодирует текст целиком с помощью операций NumPy.
+
+    Сначала вычисляется вся последовательность позиций роторов, затем коммутационная
+    панель, роторы и отражатель применяются к массиву индексов. Символы вне алфавита
+    остаются без изменений и не поворачивают роторы. Результат совпадает с Enigma.encode_text,
+    по окончании роторы находятся в том же положении, что и после скалярного кодирования.
+
+    Параметры:
+        enigma (Enigma): Машина Enigma.
+
+        text (str): Текст для кодирования.
+
+    Возвращает:
+        str: Закодированный текст.
+    """
+    text = text.upper()
+    codes = np.frombuffer(text.encode(UTF32, 'surrogatepass'), dtype=np.uint32)
+    lookup = letter_lookup(enigma.alphabet)
+    indices = np.full(codes.shape, -1, dtype=np.int16)
+    in_range = codes < len(lookup)
+    indices[in_range] = lookup[codes[in_range]]
+    mask = indices >= 0
+    letters = indices[mask].astype(np.intp)
+    if not len(letters):
+        return text
+
+    positions = rotor_positions(enigma, np.arange(1, len(letters) + 1))
+    encoded = encode_indices(enigma, letters, positions)
+    for rotor, pos in zip(enigma.rotors, positions):
+        rotor.position = int(pos[-1])
+
+    alphabet_codes = np.frombuffer(enigma.alphabet.encode(UTF32), dtype=np.uint32)
+    result = codes.copy()
+    result[mask] = alphabet_codes[encoded]
+    return result.tobytes().decode(UTF32, 'surrogatepass')
+
+
+def encode_messages(enigma, texts, positions, plugboards=None, rings=None):
+    """
+    Кодирует пакет коротких сообщений с разными ключами за один проход NumPy.
+
+    Сообщения в верхнем регистре записываются в двумерный массив кодов символов
+    (строка на сообщение), дополненный до длины самого длинного. Номер нажатия для
+    каждой буквы - накопленная сумма маски букв по строке; позиции роторов всех машин
+    вычисляются одновременно (см. message_positions), а коммутационные панели, роторы
+    и отражатель применяются выборками по буквам всех сообщений. Символы вне алфавита
+    и дополнение исключаются маской. Результат каждого сообщения совпадает с
+    Enigma.encode_text на машине с его ключом; состояние enigma не меняется.
+
+    Параметры:
+        enigma (Enigma): Машина Enigma, задающая роторы, отражатель и правила поворота.
+
+        texts (list): Сообщения.
+
+        positions (numpy.ndarray): Начальные позиции роторов, форма (сообщения, роторы).
+
+        plugboards (numpy.ndarray): Перестановки коммутационных панелей, форма
+            (сообщения, длина алфавита); None - панель enigma для всех сообщений.
+
+        rings (numpy.ndarray): Настройки колец, форма (сообщения, роторы); None -
+            кольца enigma для всех сообщений.
+
+    Возвращает:
+        list: Закодированные сообщения в верхнем регистре.
+    """
+    texts = [text.upper() for text in texts]
+    if not texts:
+        return []
+    lengths = np.fromiter(map(len, texts), dtype=np.intp, count=len(texts))
+    # Дополнение кодом вне таблицы letter_lookup маскируется вместе с символами вне алфавита
+    filled = lengths[:, None] > np.arange(lengths.max())
+    codes = np.full(filled.shape, 0xFFFFFFFF, dtype=np.uint32)
+    codes[filled] = np.frombuffer(''.join(texts).encode(UTF32, 'surrogatepass'), dtype=np.uint32)
+    lookup = letter_lookup(enigma.alphabet)
+    indices = np.where(codes < len(lookup), lookup[np.minimum(codes, len(lookup) - 1)], -1)
+    mask = indices >= 0
+
+    steps = np.cumsum(mask, axis=1)
+    starts = np.asarray(positions, dtype=np.intp).reshape(len(texts), len(enigma.rotors))
+    if rings is None:
+        rings = [rotor.ring_setting for rotor in enigma.rotors]
+    rings = np.broadcast_to(np.asarray(rings, dtype=np.intp), starts.shape)
+    size = len(enigma.alphabet)
+    # Таблицы роторов повторены дважды и развернуты в одномерные: смещение строки
+    # позиция - кольцо + size лежит в [1, 2 * size) и не требует взятия остатка
+    shifts = (size - rings) * size
+    states = message_positions(enigma, starts, steps)
+    bases = [(state * size + shift[:, None])[mask] for state, shift in zip(states, shifts.T)]
+    tables = [tuple(np.tile(table, (2, 1)).ravel() for table in rotor_tables(rotor)) for rotor in enigma.rotors]
+    reflector = np.asarray(enigma.reflector.wiring, dtype=np.intp)
+    if plugboards is None:
+        plug = plugboard_array(enigma)
+        chars = plug[indices[mask]]
+    else:
+        rows = np.nonzero(mask)[0] * size
+        plugboards = np.asarray(plugboards, dtype=np.intp).ravel()
+        chars = plugboards[rows + indices[mask]]
+
+    for (forward, _), base in zip(reversed(tables), reversed(bases)):
+        chars = forward[base + chars]
+    chars = reflector[chars]
+    for (_, backward), base in zip(tables, bases):
+        chars = backward[base + chars]
+    chars = plug[chars] if plugboards is None else plugboards[rows + chars]
+
+    alphabet_codes = np.frombuffer(enigma.alphabet.encode(UTF32), dtype=np.uint32)
+    codes[mask] = alphabet_codes[chars]
+    encoded = codes[filled].tobytes().decode(UTF32, 'surrogatepass')
+    bounds = list(accumulate(map(len, texts), initial=0))
+    return [encoded[start:end] for start, end in zip(bounds, bounds[1:])]